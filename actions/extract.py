@@ -3,6 +3,7 @@ import logging
 
 # ETL Modules
 from modules.base.etl_base           import EtlBase
+from modules.base.jdbc_extractor     import JDBCExtractor
 from modules.oracle.mysql             import MySQL
 from modules.teradata.db              import TeradataDB
 from modules.base.constants           import *
@@ -15,8 +16,9 @@ class ExtractActions(EtlBase):
         super(ExtractActions, self).__init__()
         self.teradata          = TeradataDB()
         self.mysql             = MySQL()
-        self.extractDB         = None
-        self.extractors        = { MYSQL:self.mysql }
+        self.extractors        = { MYSQL:self.mysql,
+                                   JDBC_MYSQL:JDBCExtractor(self.mysql),
+                                   JDBC_TERADATA:JDBCExtractor(self.teradata) }
 
     #####################
     # Private Functions #
@@ -35,6 +37,11 @@ class ExtractActions(EtlBase):
         parameters[OUTPUT_FILENAME] = self._readPatternOption(sectionName, OUTPUT_FILENAME, defaultOutputfilename)
         parameters[CHARACTER_SET] = self._readOptionDefault(sectionName, CHARACTER_SET, 'utf8')
         parameters[DELIMITER] = self._readOptionDefault(sectionName, DELIMITER, DEFAULT_DELIMETER)
+        parameters[NEWLINE] = self._readOptionDefault(sectionName, NEWLINE, '\\n')
+        parameters[NULL_STRING] = self._readOptionDefault(sectionName, NULL_STRING, '')
+        parameters[FETCH_SIZE] = self.getSectionParameters(sectionName).getInt(FETCH_SIZE, 1000)
+        if parameters[FETCH_SIZE] <= 0:
+            raise ValueError("The option '%s' in [%s] must be a positive integer: %s" % (FETCH_SIZE, sectionName, parameters[FETCH_SIZE]))
         parameters[COLUMNS] = self._readOptionDefault(sectionName, COLUMNS, None)
         parameters[TARGET_DATE_COLUMN] = self._readOptionDefault(sectionName, TARGET_DATE_COLUMN, None)
         targetDateStr = self._readOptionDefault(sectionName, TARGET_DATE, TODAY)
@@ -48,12 +55,21 @@ class ExtractActions(EtlBase):
             logging.info("parameters['%s']:%s" % (key, parameters[key]))
         return parameters
 
+    def _extractSection(self, section):
+        '''
+        Extract the table of a section to a file. Returns the return code of the extractor
+        '''
+        logging.info("\nStart processing section: %s" % section)
+        parameters = self._readExtractParameters(section)
+        extractDB = self.extractors[parameters[EXTRACTOR]]
+        return extractDB.extractToFile(parameters)
+
     ####################
     # Public Functions #
     ####################
     def simpleExtract(self):
         '''
-        USAGE: etl.py --action=simpleExtract --cfg=<config> --section=<section_pattern>
+        USAGE: etl.py --action=simpleExtract --cfg=<config> --section=<section_pattern> [--parallelism=<N>]
         It will read the options of each section matched <section_pattern> in conf/actions/simpleExtract/<config>.cfg
         EXAMPLE: python2.7 etl.py --action=simpleExtract --cfg=sample/newsletter --section=newsletter*
         '''
@@ -62,14 +78,8 @@ class ExtractActions(EtlBase):
         sectionPattern = self.options.get('section')
         configFile = self.getActionConfigFile(configFilename, SIMPLE_EXTRACT_ACTION)
         sections = self.getSectionsToBeProcessed(configFile, sectionPattern)
-        errSections = []
-        for section in sections:
-            logging.info("\nStart processing section: %s" % section)
-            parameters = self._readExtractParameters(section)
-            self.extractDB = self.extractors[parameters[EXTRACTOR]]
-            returnCode = self.extractDB.extractToFile(parameters)
-            if returnCode != RC_NO_ERROR:
-                errSections.append(section)
+        returnCodes = self.processSections(sections, self._extractSection)
+        errSections = [section for (section, returnCode) in zip(sections, returnCodes) if returnCode != RC_NO_ERROR]
         if not errSections:
             logging.info("\nThe '%s' action finished successfully." % SIMPLE_EXTRACT_ACTION)
             return RC_NO_ERROR
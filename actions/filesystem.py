@@ -80,37 +80,160 @@ class FilesystemActions(EtlBase):
             targetFilename = self._generateNewFilename(targetFilepattern, sourceFilename)
         return os.path.join(targetDir, targetFilename)
 
+    def _copySection(self, section):
+        '''
+        Copy all files of a section. Returns the files which could not be copied
+        '''
+        logging.info("\nStart processing section: %s" % section)
+        # Read parameters for copying files
+        parameters = self._readCopyfileParameters(section)
+
+        # Get files to be copied
+        matchingFiles = self._getMatchingFiles(parameters[SOURCE_DIRECTORY], parameters[FILE_PATTERN])
+        logging.debug("Matched files: %s" % matchingFiles)
+
+        # Copy files one by one
+        notCopiedFiles = []
+        for file in matchingFiles:
+            target = self._generateTargetFilepath(file, parameters[TARGET_DIRECTORY], parameters[TARGET_FILENAME])
+            logging.info("Coping file '%s' to '%s'" % (file, target))
+            try:
+                shutil.copyfile(file, target)
+            except:
+                logging.error("Error happend when copying file '%s'!" % (file))
+                notCopiedFiles.append(file)
+                continue
+            logging.info("The file was copied successfully.")
+        return notCopiedFiles
+
+    def _removeSection(self, section):
+        '''
+        Remove all files of a section. Returns the files which could not be removed
+        '''
+        logging.info("\nStart processing section: %s" % section)
+        # Read parameters for removing files
+        filePattern = self._readPatternMandatoryOption(section, FILE_PATTERN)
+        logging.info("%s : %s" % (FILE_PATTERN, filePattern))
+        targetDir = self._readDirMandatoryOption(section, TARGET_DIRECTORY)
+        logging.info("%s : %s" % (TARGET_DIRECTORY, targetDir))
+        recursiveFlg = self.getSectionParameters(section).getBoolean(RECURSIVE_FLG, False)
+        logging.info("%s : %s" % (RECURSIVE_FLG, recursiveFlg))
+        backDays = self._readOptionDefault(section, DAYS_BACK, 0)
+        logging.info("%s : %s" % (DAYS_BACK, backDays))
+
+        # Get files to be removed
+        matchingFiles = self._getMatchingFiles(targetDir, filePattern, recursiveFlg, backDays)
+        logging.debug("Matched files: %s" % matchingFiles)
+
+        # Copy files one by one
+        notRemovedFiles = []
+        for file in matchingFiles:
+            logging.info("Removing file '%s'" % (file))
+            try:
+                os.unlink(file)
+            except:
+                logging.error("Error happend when removing file '%s'!" % (file))
+                notRemovedFiles.append(file)
+                continue
+            logging.info("The file was removed successfully.")
+        return notRemovedFiles
+
+    def _existsSection(self, section):
+        '''
+        Check if files of a section exist. Returns True if at least one file was found
+        '''
+        logging.info("\nStart processing section: %s" % section)
+        # Read parameters for existsfile action
+        filePattern = self._readPatternMandatoryOption(section, FILE_PATTERN)
+        logging.info("%s : %s" % (FILE_PATTERN, filePattern))
+        targetDir = self._readDirMandatoryOption(section, TARGET_DIRECTORY)
+        logging.info("%s : %s" % (TARGET_DIRECTORY, targetDir))
+        recursiveFlg = self.getSectionParameters(section).getBoolean(RECURSIVE_FLG, False)
+        logging.info("%s : %s" % (RECURSIVE_FLG, recursiveFlg))
+        # find matching files
+        matchingFiles = self._getMatchingFiles(targetDir, filePattern, recursiveFlg)
+        logging.info("Found files: %s" % matchingFiles)
+        return len(matchingFiles) > 0
+
+    def _moveSection(self, section):
+        '''
+        Move all files of a section. Returns the files which could not be moved
+        '''
+        logging.info("\nStart processing section: %s" % section)
+        # Read parameters for moving files
+        parameters = self._readCopyfileParameters(section)
+
+        # Get files to be moved
+        matchingFiles = self._getMatchingFiles(parameters[SOURCE_DIRECTORY], parameters[FILE_PATTERN])
+        logging.debug("Matched files: %s" % matchingFiles)
+
+        # Move files one by one
+        notMovedFiles = []
+        for file in matchingFiles:
+            target = self._generateTargetFilepath(file, parameters[TARGET_DIRECTORY], parameters[TARGET_FILENAME])
+            logging.info("Moving file '%s' to '%s'" % (file, target))
+            try:
+                shutil.move(file, target)
+            except:
+                logging.error("Error happend when moving file '%s'!" % (file))
+                notMovedFiles.append(file)
+                continue
+            logging.info("The file was moved successfully.")
+        return notMovedFiles
+
+    def _createLockfileSection(self, section):
+        '''
+        Create the lock file of a section. Returns the lock file name if it already existed, otherwise None
+        '''
+        logging.info("\nStart processing section: %s" % section)
+        # Read parameters for moving files
+        filename = self._readPatternMandatoryOption(section, FILENAME)
+
+        # Create Lockfile
+        lock = Lockfile(filename)
+        if lock.exists():
+            return filename+'.lock'
+        try:
+            lock.create()
+        except:
+            logging.error("Error happend when creating lock file '%s'!" % (filename+'.lock'))
+            raise
+        logging.info("The lock file '%s.lock' was created successfully." % filename)
+        return None
+
+    def _deleteLockfileSection(self, section):
+        '''
+        Delete the lock file of a section. Returns the lock file name if it did not exist, otherwise None
+        '''
+        logging.info("\nStart processing section: %s" % section)
+        # Read parameters for moving files
+        filename = self._readPatternMandatoryOption(section, FILENAME)
+
+        # Delete Lockfile
+        lock = Lockfile(filename)
+        if not lock.exists():
+            return filename+'.lock'
+        try:
+            lock.delete()
+        except:
+            logging.error("Error happend when deleting lock file '%s'!" % (filename+'.lock'))
+            raise
+        logging.info("The lock file '%s.lock' was deleted successfully." % filename)
+        return None
+
     ####################
     # Public Functions #
     ####################
     def copyfile(self):
         '''
-        USAGE: etl.py --action=copyfile --cfg=<config> --section=<section_pattern>
+        USAGE: etl.py --action=copyfile --cfg=<config> --section=<section_pattern> [--parallelism=<N>]
         It will read the options of each section matched <section_pattern> in conf/actions/copyfile/<config>.cfg
         EXAMPLE: python2.7 etl.py --action=copyfile --cfg=sample_us --section=RDC*
         '''
         sections = self.getSectionsForAction(COPYFILE_ACTION)
         notCopiedFiles = []
-        for section in sections:
-            logging.info("\nStart processing section: %s" % section)
-            # Read parameters for copying files
-            parameters = self._readCopyfileParameters(section)
-
-            # Get files to be copied
-            matchingFiles = self._getMatchingFiles(parameters[SOURCE_DIRECTORY], parameters[FILE_PATTERN])
-            logging.debug("Matched files: %s" % matchingFiles)
-
-            # Copy files one by one
-            for file in matchingFiles:
-                target = self._generateTargetFilepath(file, parameters[TARGET_DIRECTORY], parameters[TARGET_FILENAME])
-                logging.info("Coping file '%s' to '%s'" % (file, target))
-                try:
-                    shutil.copyfile(file, target)
-                except:
-                    logging.error("Error happend when copying file '%s'!" % (file))
-                    notCopiedFiles.append(file)
-                    continue
-                logging.info("The file was copied successfully.")
+        for sectionNotCopiedFiles in self.processSections(sections, self._copySection):
+            notCopiedFiles += sectionNotCopiedFiles
         if not notCopiedFiles:
             logging.info("\nThe '%s' action finished successfully." % COPYFILE_ACTION)
             return RC_NO_ERROR
@@ -120,39 +243,14 @@ class FilesystemActions(EtlBase):
 
     def removefile(self):
         '''
-        USAGE: etl.py --action=removefile --cfg=<config> --section=<section_pattern>
+        USAGE: etl.py --action=removefile --cfg=<config> --section=<section_pattern> [--parallelism=<N>]
         It will read the options of each section matched <section_pattern> in conf/actions/removefile/<config>.cfg
         EXAMPLE: python2.7 etl.py --action=removefile --cfg=sample_us --section=backup
         '''
         sections = self.getSectionsForAction(REMOVEFILE_ACTION)
         notRemovedFiles = []
-        for section in sections:
-            logging.info("\nStart processing section: %s" % section)
-            # Read parameters for removing files
-            filePattern = self._readPatternMandatoryOption(section, FILE_PATTERN)
-            logging.info("%s : %s" % (FILE_PATTERN, filePattern))
-            targetDir = self._readDirMandatoryOption(section, TARGET_DIRECTORY)
-            logging.info("%s : %s" % (TARGET_DIRECTORY, targetDir))
-            recursiveFlgStr = self._readOptionDefault(section, RECURSIVE_FLG, 'false')
-            recursiveFlg = True if str(recursiveFlgStr).lower() == 'true' else False
-            logging.info("%s : %s" % (RECURSIVE_FLG, recursiveFlg))
-            backDays = self._readOptionDefault(section, DAYS_BACK, 0)
-            logging.info("%s : %s" % (DAYS_BACK, backDays))
-
-            # Get files to be removed
-            matchingFiles = self._getMatchingFiles(targetDir, filePattern, recursiveFlg, backDays)
-            logging.debug("Matched files: %s" % matchingFiles)
-
-            # Copy files one by one
-            for file in matchingFiles:
-                logging.info("Removing file '%s'" % (file))
-                try:
-                    os.unlink(file)
-                except:
-                    logging.error("Error happend when removing file '%s'!" % (file))
-                    notRemovedFiles.append(file)
-                    continue
-                logging.info("The file was removed successfully.")
+        for sectionNotRemovedFiles in self.processSections(sections, self._removeSection):
+            notRemovedFiles += sectionNotRemovedFiles
         if not notRemovedFiles:
             logging.info("\nThe '%s' action finished successfully." % REMOVEFILE_ACTION)
             return RC_NO_ERROR
@@ -162,28 +260,14 @@ class FilesystemActions(EtlBase):
 
     def existsfile(self):
         '''
-        USAGE: etl.py --action=existsfile --cfg=<config> --section=<section_pattern>
+        USAGE: etl.py --action=existsfile --cfg=<config> --section=<section_pattern> [--parallelism=<N>]
         It will read the options of each section matched <section_pattern> in conf/actions/existsfile/<config>.cfg
         EXAMPLE: python2.7 etl.py --action=existsfile --cfg=target_data --section=sample_*
         '''
         sections = self.getSectionsForAction(EXISTSFILE_ACTION)
-        ngSections = []
-        for section in sections:
-            logging.info("\nStart processing section: %s" % section)
-            # Read parameters for existsfile action
-            filePattern = self._readPatternMandatoryOption(section, FILE_PATTERN)
-            logging.info("%s : %s" % (FILE_PATTERN, filePattern))
-            targetDir = self._readDirMandatoryOption(section, TARGET_DIRECTORY)
-            logging.info("%s : %s" % (TARGET_DIRECTORY, targetDir))
-            recursiveFlgStr = self._readOptionDefault(section, RECURSIVE_FLG, 'false')
-            recursiveFlg = True if str(recursiveFlgStr).lower() == 'true' else False
-            logging.info("%s : %s" % (RECURSIVE_FLG, recursiveFlg))
-            # find matching files
-            matchingFiles = self._getMatchingFiles(targetDir, filePattern, recursiveFlg)
-            logging.info("Found files: %s" % matchingFiles)
-            # record sections of which file is not found
-            if len(matchingFiles) == 0:
-                ngSections.append(section)
+        founds = self.processSections(sections, self._existsSection)
+        # record sections of which file is not found
+        ngSections = [section for (section, found) in zip(sections, founds) if not found]
         if not ngSections:
             logging.info("All files found.")
             return RC_FILE_EXISTS_OK
@@ -193,32 +277,14 @@ class FilesystemActions(EtlBase):
 
     def movefile(self):
         '''
-        USAGE: etl.py --action=movefile --cfg=<config> --section=<section_pattern>
+        USAGE: etl.py --action=movefile --cfg=<config> --section=<section_pattern> [--parallelism=<N>]
         It will read the options of each section matched <section_pattern> in conf/actions/movefile/<config>.cfg
         EXAMPLE: python2.7 etl.py --action=movefile --cfg=sample_us --section=load
         '''
         sections = self.getSectionsForAction(MOVEFILE_ACTION)
         notMovedFiles = []
-        for section in sections:
-            logging.info("\nStart processing section: %s" % section)
-            # Read parameters for moving files
-            parameters = self._readCopyfileParameters(section)
-
-            # Get files to be moved
-            matchingFiles = self._getMatchingFiles(parameters[SOURCE_DIRECTORY], parameters[FILE_PATTERN])
-            logging.debug("Matched files: %s" % matchingFiles)
-
-            # Move files one by one
-            for file in matchingFiles:
-                target = self._generateTargetFilepath(file, parameters[TARGET_DIRECTORY], parameters[TARGET_FILENAME])
-                logging.info("Moving file '%s' to '%s'" % (file, target))
-                try:
-                    shutil.move(file, target)
-                except:
-                    logging.error("Error happend when moving file '%s'!" % (file))
-                    notMovedFiles.append(file)
-                    continue
-                logging.info("The file was moved successfully.")
+        for sectionNotMovedFiles in self.processSections(sections, self._moveSection):
+            notMovedFiles += sectionNotMovedFiles
         if not notMovedFiles:
             logging.info("\nThe '%s' action finished successfully." % MOVEFILE_ACTION)
             return RC_NO_ERROR
@@ -228,28 +294,12 @@ class FilesystemActions(EtlBase):
 
     def createLockfile(self):
         '''
-        USAGE: etl.py --action=createLockfile --cfg=<config> --section=<section_pattern>
+        USAGE: etl.py --action=createLockfile --cfg=<config> --section=<section_pattern> [--parallelism=<N>]
         It will read the options of each section matched <section_pattern> in conf/actions/createLockfile/<config>.cfg
         EXAMPLE: python2.7 etl.py --action=createLockfile --cfg=sample --section=sample
         '''
         sections = self.getSectionsForAction(CREATE_LOCKFILE_ACTION)
-        lockedFiles = []
-        for section in sections:
-            logging.info("\nStart processing section: %s" % section)
-            # Read parameters for moving files
-            filename = self._readPatternMandatoryOption(section, FILENAME)
-
-            # Create Lockfile
-            lock = Lockfile(filename)
-            if lock.exists():
-                lockedFiles.append(filename+'.lock')
-            else:
-                try:
-                    lock.create()
-                except:
-                    logging.error("Error happend when creating lock file '%s'!" % (filename+'.lock'))
-                    raise
-                logging.info("The lock file '%s.lock' was created successfully." % filename)
+        lockedFiles = [i for i in self.processSections(sections, self._createLockfileSection) if i]
         if not lockedFiles:
             logging.info("Created all lock files successfully.")
             return RC_NO_ERROR
@@ -259,28 +309,12 @@ class FilesystemActions(EtlBase):
 
     def deleteLockfile(self):
         '''
-        USAGE: etl.py --action=deleteLockfile --cfg=<config> --section=<section_pattern>
+        USAGE: etl.py --action=deleteLockfile --cfg=<config> --section=<section_pattern> [--parallelism=<N>]
         It will read the options of each section matched <section_pattern> in conf/actions/deleteLockfile/<config>.cfg
         EXAMPLE: python2.7 etl.py --action=deleteLockfile --cfg=sample --section=sample
         '''
         sections = self.getSectionsForAction(DELETE_LOCKFILE_ACTION)
-        notExistedFiles = []
-        for section in sections:
-            logging.info("\nStart processing section: %s" % section)
-            # Read parameters for moving files
-            filename = self._readPatternMandatoryOption(section, FILENAME)
-
-            # Delete Lockfile
-            lock = Lockfile(filename)
-            if lock.exists():
-                try:
-                    lock.delete()
-                except:
-                    logging.error("Error happend when deleting lock file '%s'!" % (filename+'.lock'))
-                    raise
-                logging.info("The lock file '%s.lock' was deleted successfully." % filename)
-            else:
-                notExistedFiles.append(filename+'.lock')
+        notExistedFiles = [i for i in self.processSections(sections, self._deleteLockfileSection) if i]
         if not notExistedFiles:
             logging.info("Deleted all lock files successfully.")
             return RC_NO_ERROR
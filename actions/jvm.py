@@ -0,0 +1,54 @@
+# Standard Python Modules
+import logging
+import os
+import time
+
+# ETL Modules
+from modules.base.constants import *
+from modules.base.etl_base import EtlBase
+from modules.base.jvm import JVMManager
+
+class JvmActions(EtlBase):
+    '''
+    JVM related actions
+    '''
+    def __init__(self):
+        super(JvmActions, self).__init__()
+
+    ####################
+    # Public Functions #
+    ####################
+    def createJvmArchive(self):
+        '''
+        USAGE: etl.py --action=createJvmArchive
+        Creates the class data sharing archive ([JVM] cds_archive in conf/modules/jdbc.cfg) of the JDBC driver classes.
+        The following runs start the JVM with -Xshare:auto -XX:SharedArchiveFile=<cds_archive>.
+        Run it again after the JDK or the driver jars have been changed. Requires JDK 10 or later.
+        '''
+        jvmManager  = JVMManager()
+        archiveFile = jvmManager.getArchiveFile()
+        if not archiveFile:
+            logging.error("cds_archive is not set in [JVM] of conf/modules/jdbc.cfg")
+            return RC_ERROR
+        archiveDirectory = os.path.dirname(archiveFile)
+        if archiveDirectory and not os.path.exists(archiveDirectory):
+            os.makedirs(archiveDirectory)
+        classListFile = "%s.classlist" % (archiveFile)
+
+        # 1. The classes loaded by the JVM with the drivers
+        logging.info("Writing the class list '%s'..." % (classListFile))
+        jvmManager.writeClassList(classListFile)
+
+        # 2. The archive of these classes
+        start = time.time()
+        (stdin, stdout, stderr, returnCode) = self._executeOsCommand(jvmManager.getArchiveDumpCommand(classListFile), logLevel=logging.INFO)
+        for line in stdout + stderr:
+            logging.debug(line)
+        if returnCode != 0 or not os.path.isfile(archiveFile):
+            for line in stderr:
+                logging.error(line)
+            logging.error("The CDS archive could not be created. Return Code is %s" % (returnCode))
+            return RC_ERROR
+        os.unlink(classListFile)
+        logging.info("The CDS archive '%s' was created in %.1f seconds (%d bytes)." % (archiveFile, time.time() - start, os.path.getsize(archiveFile)))
+        return RC_NO_ERROR
@@ -9,6 +9,7 @@ from modules.teradata.db              import TeradataDB
 from modules.teradata.fastload        import Fastload
 from modules.teradata.tpt             import TPT
 from modules.base.constants           import *
+import modules.base.run_metrics as run_metrics
 
 class LoadActions(EtlBase):
     ###############
@@ -21,9 +22,6 @@ class LoadActions(EtlBase):
         self.teradata          = TeradataDB()
         self.mysql             = MySQL()
 
-        self.loader = None
-        self.targetDB = None
-
         self.loaders = {TBUILD   : self.tpt,
                         FASTLOAD : self.fastload}
 
@@ -49,47 +47,56 @@ class LoadActions(EtlBase):
             logging.info("parameters['%s']:%s" % (key, parameters[key]))
         return parameters
 
+    def _loadSection(self, section):
+        '''
+        Load all files of a section. Returns the files which could not be loaded
+        '''
+        logging.info("\nStart processing section: %s" % section)
+        # Read parameters for loading
+        parameters = self._readLoadParameters(section)
+
+        # Get files to be loaded
+        matchingFiles = self._getMatchingFiles(parameters[SOURCE_DIRECTORY], parameters[FILE_PATTERN])
+        if parameters[MODE] == MODE_FULL and len(set([i.split('.')[0] for i in matchingFiles])) > 1:
+            msg = "More than one source data found. FULL mode allows only one data file or 2 files set for lob type!"
+            raise Exception(msg)
+
+        # Load files one by one
+        notLoadedFiles = []
+        for file in matchingFiles:
+            logging.info("\nStart loading file: '%s'" % file)
+            loader = self.loaders[parameters[LOADER]]
+            parameters[FILENAME] = os.path.basename(file)
+            run_metrics.add(METRIC_BYTES_READ, os.path.getsize(file))
+            returnCode = loader.loadFromFile(parameters)
+            if returnCode != RC_NO_ERROR:
+                logging.error("'%s' failed with return code %s." % (parameters[LOADER], returnCode))
+                notLoadedFiles.append(file)
+                continue
+            logging.info("The file '%s' was loaded by '%s' successfully." % (file, parameters[LOADER]))
+            # Delete source data file and directory for lob data
+            os.unlink(file)
+            logging.info("The source data file '%s' was removed." % (file))
+            if (file.split('.')[-1].lower() == 'lob'):
+                columnFilesDir = file + '_dir'
+                self._removeWorkDirectory(columnFilesDir)
+                logging.info("The lob data directory '%s' was removed." % (columnFilesDir))
+        return notLoadedFiles
+
     ####################
     # Public Functions #
     ####################
     def simpleLoad(self):
         '''
-        USAGE: etl.py --action=simpleLoad --cfg=<config> --section=<section_pattern>
+        USAGE: etl.py --action=simpleLoad --cfg=<config> --section=<section_pattern> [--parallelism=<N>]
         It will read the options of each section matched <section_pattern> in conf/actions/simpleLoad/<config>.cfg
         EXAMPLE: python2.7 etl.py --action=simpleLoad --cfg=sample --section=newsletter*
         '''
         sections = self.getSectionsForAction(SIMPLE_LOAD_ACTION)
 
         notLoadedFiles = []
-        for section in sections:
-            logging.info("\nStart processing section: %s" % section)
-            # Read parameters for loading
-            parameters = self._readLoadParameters(section)
-
-            # Get files to be loaded
-            matchingFiles = self._getMatchingFiles(parameters[SOURCE_DIRECTORY], parameters[FILE_PATTERN])
-            if parameters[MODE] == MODE_FULL and len(set([i.split('.')[0] for i in matchingFiles])) > 1:
-                msg = "More than one source data found. FULL mode allows only one data file or 2 files set for lob type!"
-                raise Exception(msg)
-
-            # Load files one by one
-            for file in matchingFiles:
-                logging.info("\nStart loading file: '%s'" % file)
-                self.loader = self.loaders[parameters[LOADER]]
-                parameters[FILENAME] = os.path.basename(file)
-                returnCode = self.loader.loadFromFile(parameters)
-                if returnCode != RC_NO_ERROR:
-                    logging.error("'%s' failed with return code %s." % (parameters[LOADER], returnCode))
-                    notLoadedFiles.append(file)
-                    continue
-                logging.info("The file '%s' was loaded by '%s' successfully." % (file, parameters[LOADER]))
-                # Delete source data file and directory for lob data
-                os.unlink(file)
-                logging.info("The source data file '%s' was removed." % (file))
-                if (file.split('.')[-1].lower() == 'lob'):
-                    columnFilesDir = file + '_dir'
-                    self._removeWorkDirectory(columnFilesDir)
-                    logging.info("The lob data directory '%s' was removed." % (columnFilesDir))
+        for sectionNotLoadedFiles in self.processSections(sections, self._loadSection):
+            notLoadedFiles += sectionNotLoadedFiles
 
         if not notLoadedFiles:
             logging.info("\nThe '%s' action finished successfully." % SIMPLE_LOAD_ACTION)
@@ -40,6 +40,18 @@ class SampleActions(EtlBase):
         logging.info("Processing finished by SampleModule.")
         return returnCode
 
+    def _processSampleSection(self, section):
+        '''
+        Process one section for sample action (Called for each section by processSections)
+        '''
+        logging.info("\nStart processing section: %s" % section)
+        parameters = self._readSampleParameters(section)
+        returnCode = self._processSample(parameters)
+        if returnCode != RC_NO_ERROR:
+            logging.error("The process module failed with return code %s." % (returnCode))
+        logging.info("The process module completed successfully.")
+        return returnCode
+
     ####################
     # Public Functions #
     ####################
@@ -54,15 +66,9 @@ class SampleActions(EtlBase):
         sectionPattern = self.options.get('section')
         configFile = self.getActionConfigFile(configFilename, SAMPLE_ACTION)
         sections = self.getSectionsToBeProcessed(configFile, sectionPattern)
-        errSections = []
-        for section in sections:
-            logging.info("\nStart processing section: %s" % section)
-            parameters = self._readSampleParameters(section)
-            returnCode = self._processSample(parameters)
-            if returnCode != RC_NO_ERROR:
-                logging.error("The process module failed with return code %s." % (returnCode))
-                errSections.append(section)
-            logging.info("The process module completed successfully.")
+        # The processSections function is in modules/base/etl_base.py (sections run concurrently with --parallelism)
+        returnCodes = self.processSections(sections, self._processSampleSection)
+        errSections = [section for (section, returnCode) in zip(sections, returnCodes) if returnCode != RC_NO_ERROR]
         if not errSections:
             logging.info("\nThe '%s' action finished successfully." % (SAMPLE_ACTION))
             return RC_NO_ERROR
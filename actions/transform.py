@@ -5,6 +5,8 @@ import os
 # ETL Modules
 from modules.base.constants import *
 from modules.base.etl_base import EtlBase
+from modules.base.profiler import Profiler
+import modules.base.run_metrics as run_metrics
 from modules.transformations.file_transformations import FileTransformations
 
 class TransformActions(EtlBase):
@@ -70,19 +72,46 @@ class TransformActions(EtlBase):
         '''
         for transformationName in parameters[TRANSFORMATION_NAMES]:
             transformationMethod = getattr(self.fileTransformations, transformationName)
-            returnCode = transformationMethod(file, parameters)
+            with Profiler().phase('transformation %s' % (transformationName)):
+                returnCode = transformationMethod(file, parameters)
             if returnCode != RC_NO_ERROR:
                 logging.error("Transformation '%s' failed with return code %s." % (transformationName, returnCode))
                 return returnCode
             logging.info("Transformation '%s' completed successfully." % (transformationName))
         return RC_NO_ERROR
 
+    def _transformSection(self, section):
+        '''
+        Transform all files of a section. Returns the files which could not be transformed
+        '''
+        logging.info("\nStart processing section: %s" % section)
+        # Read parameters for transforming
+        parameters = self._readTransformParameters(section)
+
+        # Get files to be transformed
+        matchingFiles = self._getMatchingFiles(parameters[SOURCE_DIRECTORY], parameters[FILE_PATTERN])
+        logging.info("matchded files: %s" % matchingFiles)
+
+        # Transform files one by one
+        notLoadedFiles = []
+        for file in matchingFiles:
+            logging.info("\nStart transforming file: '%s'" % file)
+            run_metrics.add(METRIC_BYTES_READ, os.path.getsize(file))
+            returnCode = self._transformFile(file, parameters)
+            if returnCode != RC_NO_ERROR:
+                logging.error("Transform failed with return code %s." % (returnCode))
+                notLoadedFiles.append(file)
+                continue
+            run_metrics.add(METRIC_BYTES_WRITTEN, os.path.getsize(file))
+            logging.info("The file '%s' was transformed successfully." % (file))
+        return notLoadedFiles
+
     ####################
     # Public Functions #
     ####################
     def transform(self):
         '''
-        USAGE: etl.py --action=transform --cfg=<config> --section=<section_pattern>
+        USAGE: etl.py --action=transform --cfg=<config> --section=<section_pattern> [--parallelism=<N>]
         It will read the options of each section matched <section_pattern> in conf/actions/transform/<config>.cfg
         '''
         self._validateOptions(['cfg','section'],{})
@@ -91,24 +120,8 @@ class TransformActions(EtlBase):
         configFile = self.getActionConfigFile(configFilename, TRANSFORM_ACTION)
         sections = self.getSectionsToBeProcessed(configFile, sectionPattern)
         notLoadedFiles = []
-        for section in sections:
-            logging.info("\nStart processing section: %s" % section)
-            # Read parameters for transforming
-            parameters = self._readTransformParameters(section)
-
-            # Get files to be transformed
-            matchingFiles = self._getMatchingFiles(parameters[SOURCE_DIRECTORY], parameters[FILE_PATTERN])
-            logging.info("matchded files: %s" % matchingFiles)
-
-            # Transform files one by one
-            for file in matchingFiles:
-                logging.info("\nStart transforming file: '%s'" % file)
-                returnCode = self._transformFile(file, parameters)
-                if returnCode != RC_NO_ERROR:
-                    logging.error("Transform failed with return code %s." % (returnCode))
-                    notLoadedFiles.append(file)
-                    continue
-                logging.info("The file '%s' was transformed successfully." % (file))
+        for sectionNotLoadedFiles in self.processSections(sections, self._transformSection):
+            notLoadedFiles += sectionNotLoadedFiles
 
         if not notLoadedFiles:
             logging.info("\nThe '%s' action finished successfully." % TRANSFORM_ACTION)
@@ -1,18 +1,23 @@
 #!/usr/bin/env python2.7
 from subprocess               import Popen
-from ConfigParser             import SafeConfigParser
-from modules.base.exceptions  import FileConfigMissing,MandatoryOptionMissing
-from modules.base.jdbc        import JDBC
-from modules.base.lockfile    import Lockfile
+from modules.base.action_registry import ActionRegistry
+from modules.base.config_snapshot import ConfigSnapshot,SnapshotConfigParser
+from modules.base.jvm         import JVMManager
+from modules.base.log_context import ContextFilter
 from modules.base.options     import Options
+from modules.base.pipeline    import Pipeline
+from modules.base.profiler    import Profiler
+from modules.base.run_metrics import RunMetrics
+from modules.base.statement_stats import StatementStats
+from modules.base.server      import EtlClient,EtlServer,RequestLogHandler
+import modules.base.parallel    as parallel
 
 import datetime
-import inspect
 import logging
 import os.path
 import re
+import signal
 import sys
-import traceback
 import uuid
 
 ###########################################################################
@@ -20,37 +25,39 @@ import uuid
 # Language : Python2.7.x                                                  #
 # Purpose  : Create a lightweight python script that can be reused easily #
 ###########################################################################
-def _findCallableActions(aClass, classDescription, validActions):
-    for name, data in inspect.getmembers(aClass):
-        if re.match('_',name):
-            continue
-        func = getattr(aClass, name, None)
-        if callable(func):
-            validActions[name] = (func,classDescription)
-    return validActions
-
 def  _readApplicationConfigurationFiles():
     '''
     This function is responsible for initially reading the configuration information for the application
     '''
-    configParser = SafeConfigParser()
+    configParser = SnapshotConfigParser()
     configParser.read('conf/globals.cfg')
     return configParser
 
-def _convertToCamelcase(value):
-    def camelcase():
-        yield str.capitalize
-        while True:
-           yield str.capitalize
-
-    c = camelcase()
-    return "".join(c.next()(x) if x else '_' for x in value.split("_"))
+def _raiseKeyboardInterrupt(signum, frame):
+    '''
+    Stop the etl.py --serve daemon the same way as Ctrl-C does
+    '''
+    raise KeyboardInterrupt()
 
 def main():
     options = Options()
 
+    # Time the phases of the run and profile the action (see modules/base/profiler.py)
+    if (options.get('profile') == True):
+        Profiler().enable()
+
     # Read global configuration file
-    configParser    = _readApplicationConfigurationFiles()
+    with Profiler().phase('config'):
+        configParser = _readApplicationConfigurationFiles()
+
+    # Keep the parsed configuration files for the next run (see modules/base/config_snapshot.py)
+    if configParser.has_option('files', 'CONFIG_CACHE_FILE'):
+        ConfigSnapshot().configure(configParser.get('files', 'CONFIG_CACHE_FILE'))
+
+    # Submit the action to the etl.py --serve daemon, which prints the log of the action and returns its return code
+    if (options.get('client') == True):
+        args = [i for i in sys.argv[1:] if i != '--client']
+        sys.exit(EtlClient(configParser.get('server', 'SOCKET_FILE')).submit(args))
 
     #####################
     # Configure logging #
@@ -67,120 +74,118 @@ def main():
         os.makedirs(log_directory)
 
     # Determine the log file name
+    runName = options.get('action')
+    if (options.get('pipeline') != None):
+        runName = "pipeline-%s" % (options.get('pipeline'))
+    elif (options.get('serve') == True):
+        runName = 'serve'
     current_date = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
+    runId        = str(uuid.uuid4())
     if os.access(log_directory, os.W_OK):
-        logFilename = "%s/etl-%s.%s_%s.log" % (log_directory, options.get('action'), current_date, str(uuid.uuid4()))
+        logFilename = "%s/etl-%s.%s_%s.log" % (log_directory, runName, current_date, runId)
     else:
-        logFilename = "work/etl-%s.%s_%s.log" % (options.get('action'), current_date, str(uuid.uuid4()))
+        logFilename = "work/etl-%s.%s_%s.log" % (runName, current_date, runId)
 
     # define a handler which writes INFO messages or higher
+    # (records are tagged with the section name while a section is processed)
     console_log = logging.StreamHandler()
     console_log.setLevel(logging.INFO)
+    console_log.addFilter(ContextFilter())
+    console_log.setFormatter(logging.Formatter('%(section)s%(message)s'))
 
     # define a handler which writes DEBUG messages or higher
     file_log = logging.FileHandler(filename=logFilename)
     file_log.setLevel(logging.DEBUG)
-    file_format = logging.Formatter('%(asctime)s [%(levelname)-7s] (%(filename)s,%(lineno)d) %(message)s')
+    file_log.addFilter(ContextFilter())
+    file_format = logging.Formatter('%(asctime)s [%(levelname)-7s] (%(filename)s,%(lineno)d) %(section)s%(message)s')
     file_log.setFormatter(file_format)
 
+    # define a handler which sends the INFO messages of a request to the etl.py --client which submitted it
+    request_log = RequestLogHandler()
+    request_log.setLevel(logging.INFO)
+    request_log.addFilter(ContextFilter())
+    request_log.setFormatter(logging.Formatter('%(section)s%(message)s'))
+
     logging.getLogger().addHandler(console_log)
     logging.getLogger().addHandler(file_log)
+    if (options.get('serve') == True):
+        logging.getLogger().addHandler(request_log)
     logging.getLogger().setLevel(logging.DEBUG)
 
     ############################
     # Dynamically Load Modules #
     ############################
-    actionLabels = {'actions.py':'General Actions'}
-    validActions = {}
-    modules      = {}
-    for file in os.listdir('actions'):
-        if (file.strip().endswith('.py') and file.strip() != '__init__.py'):
-            # Dynamically Load the Module
-            moduleName    = file.split('.py')[0]
-            className     = "%sActions" % (_convertToCamelcase(moduleName))
-            modulePath    = "actions.%s" % (moduleName)
-            _temp = __import__(modulePath, globals(), locals(), ['object'], -1)
-
-            # Dynamically get an instance of the given class
-            classInstance = getattr(_temp, className)()
-
-            # Find all executable actions
-            validActions = _findCallableActions(classInstance, moduleName, validActions)
+    # Only the module of the requested action is imported (see modules/base/action_registry.py)
+    manifestFile = None
+    if configParser.has_option('files', 'ACTION_MANIFEST_FILE'):
+        manifestFile = configParser.get('files', 'ACTION_MANIFEST_FILE')
+    registry = ActionRegistry(manifestFile)
+
+    # Determine the JC_JOBID Environment Value
+    if (os.environ.has_key('JC_JOBID')):
+       jcJobId = os.environ['JC_JOBID']
+    else:
+       jcJobId = ''
+
+    # Record the metrics of each processed section in <logfile>.metrics.json and the run history database
+    historyDb = None
+    if configParser.has_option('files', 'RUN_HISTORY_DB'):
+        historyDb = configParser.get('files', 'RUN_HISTORY_DB')
+    RunMetrics().configure("%s.metrics.json" % (logFilename), historyDb, jobnet_name, jcJobId, runId)
+
+    # Write the JDBC statements slower than SLOW_QUERY_THRESHOLD of conf/modules/jdbc.cfg to <logfile>.slow_queries.log
+    StatementStats().configure("%s.slow_queries.log" % (logFilename))
+
+    # Run as a daemon until it is stopped (SIGTERM or Ctrl-C)
+    if (options.get('serve') == True):
+        signal.signal(signal.SIGTERM, _raiseKeyboardInterrupt)
+        server = EtlServer(configParser.get('server', 'SOCKET_FILE'), registry, configParser.getint('server', 'WORKERS'))
+        # Start the JVM before the first request instead of during it (see modules/base/jvm.py)
+        try:
+            JVMManager().start()
+        except ImportError:
+            logging.warn("JPype is not installed, the daemon can not execute JDBC queries.")
+        try:
+            returnCode = server.serveForever()
+        except KeyboardInterrupt:
+            returnCode = 0
+        StatementStats().writeReport(logFilename)
+        logging.info("The daemon has finished. Return Code is %s" % (returnCode))
+        sys.exit(returnCode)
 
     # Validate if the action is valid. Print valid actions if no valid action is found
-    if (options.get('action') not in validActions):
+    if (options.get('pipeline') == None and registry.hasAction(options.get('action')) == False):
         logging.warn("%s is not a valid action. Please specify an action from the list below" % (options.get('action')))
-        actions = validActions.keys()
 
         # Group All Actions by their class descriptions
-        actionsByClass = {}
-        for action in actions:
-            classDescription = validActions[action][1]
-            if (actionsByClass.has_key(classDescription) == True):
-               tmp = actionsByClass[classDescription]
-               tmp.append(action)
-               actionsByClass[classDescription] = tmp
-            else:
-               actionsByClass[classDescription] = [action]
-
+        actionsByClass = registry.getActionsByModule()
         for classDesc in actionsByClass:
             print "\n%s" % (classDesc)
             print "----------------------"
-            actions = actionsByClass[classDesc]
-            actions.sort()
-            for action in actions:
+            for action in actionsByClass[classDesc]:
                print action
         sys.exit(197)
 
-    # Determine the JC_JOBID Environment Value
-    if (os.environ.has_key('JC_JOBID')):
-       jcJobId = os.environ['JC_JOBID']
-    else:
-       jcJobId = ''
-
-    # Check if a lock file exists, exit if it does
-    lockfile = Lockfile(options.get('action'))
-    if (lockfile.exists() == True):
-       logging.warn('Action is currently running!')
-       sys.exit(198)
-
-    # Log the start of the process
-    msg = "Starting the '%s' action" % (options.get('action'))
-    logging.debug(msg)
-
-    # Call the requested action, if an error occurs, log the error and send an email
+    # Call the requested action (or all steps of the requested pipeline)
     try:
-       func       = validActions[options.get('action')][0]
-       returnCode = func()
-    except FileConfigMissing as fcm:
-       logging.error(fcm)
-       returnCode = 101
-    except MandatoryOptionMissing as mom:
-       logging.error(mom)
-       returnCode = 102
-    except Exception,e:
-       logging.error(e)
-       exc_type, exc_value, exc_traceback = sys.exc_info()
-       tb                                 = traceback.extract_tb(exc_traceback)
-       formattedTb                        = traceback.format_list(tb)
-       # All traceback concatenate for output
-       tbOutputLine = ''
-       for line in formattedTb:
-           tbOutputLine = tbOutputLine + line
-       logging.error(tbOutputLine)
-       if (lockfile.exists() == True):
-           lockfile.delete()
-       returnCode = 199  #TODO: make this look up the specific action's section and see if a different return code is defined
+       if (options.get('pipeline') != None):
+           returnCode = Profiler().run(Pipeline(registry).run, options.get('pipeline'))
+       else:
+           returnCode = Profiler().run(registry.runAction, options.get('action'))
 
     finally:
-       # Close all JDBC connections
-       JDBC()
+       # Close all JDBC connections (the JDBC module is only loaded when the action used a database)
+       parallel.closeAllConnections()
+       # Write <logfile>.prof and <logfile>.profile.txt if --profile is given
+       Profiler().writeReport(logFilename)
+       # Write <logfile>.statements.txt if a JDBC statement was executed
+       StatementStats().writeReport(logFilename)
        msg = "Logfile = '%s'" % (logFilename)
        logging.info(msg)
        msg = "JC_JOBID = '%s'" % (jcJobId)
        logging.info(msg)
 
-    msg = "The action '%s' has finished. Return Code is %s" % (options.get('action'), returnCode)
+    msg = "The action '%s' has finished. Return Code is %s" % (runName, returnCode)
     logging.info(msg)
 
     sys.exit(returnCode)
@@ -0,0 +1,206 @@
+from ConfigParser import RawConfigParser
+import ast
+import logging
+import os
+import sys
+import traceback
+import uuid
+
+from modules.base.constants   import *
+from modules.base.exceptions  import FileConfigMissing,MandatoryOptionMissing
+from modules.base.lockfile    import Lockfile
+from modules.base.profiler    import Profiler
+import modules.base.etl_util as etl_util
+
+class ActionRegistry(object):
+    '''
+    A registry of the actions which are defined in the actions directory
+
+    Every public function of a "<Module>Actions" class in actions/<module>.py is an action.
+    The mapping "action name -> (module name, class name)" is kept in a manifest file,
+    so only the module of the requested action has to be imported and instantiated.
+    The manifest is rebuilt automatically when a module in the actions directory changes.
+
+    Manifest file format:
+        [sources]
+        <module name>=<modification time of actions/<module>.py>
+
+        [actions]
+        <action name>=<module name>|<class name>
+    '''
+    SECTION_SOURCES = 'sources'
+    SECTION_ACTIONS = 'actions'
+
+    def __init__(self, manifestFile=None, actionsDirectory='actions'):
+        self.actionsDirectory = os.path.join(etl_util.get_app_root_path(), actionsDirectory)
+        self.manifestFile     = manifestFile
+        self._actions         = None
+
+    #####################
+    # Private Functions #
+    #####################
+    def _convertToCamelcase(self, value):
+        return "".join(x.capitalize() if x else '_' for x in value.split("_"))
+
+    def _getClassName(self, moduleName):
+        return "%sActions" % (self._convertToCamelcase(moduleName))
+
+    def _getModuleSources(self):
+        '''
+        Returns a dictionary of "module name -> modification time" for all modules in the actions directory
+        '''
+        sources = {}
+        for file in os.listdir(self.actionsDirectory):
+            if (file.strip().endswith('.py') and file.strip() != '__init__.py'):
+                moduleName = file.split('.py')[0]
+                sources[moduleName] = repr(os.path.getmtime(os.path.join(self.actionsDirectory, file)))
+        return sources
+
+    def _scanModule(self, moduleName):
+        '''
+        Finds all public functions of the action class without importing the module
+        '''
+        className  = self._getClassName(moduleName)
+        modulePath = os.path.join(self.actionsDirectory, moduleName + '.py')
+        with open(modulePath, 'r') as f:
+            tree = ast.parse(f.read(), modulePath)
+        for node in tree.body:
+            if isinstance(node, ast.ClassDef) and node.name == className:
+                return [i.name for i in node.body if isinstance(i, ast.FunctionDef) and not i.name.startswith('_')]
+        logging.warn("The class '%s' could not be found in '%s'" % (className, modulePath))
+        return []
+
+    def _readManifest(self, sources):
+        '''
+        Returns the actions in the manifest file, or None if the manifest file is missing or out of date
+        '''
+        if not self.manifestFile or not os.path.isfile(self.manifestFile):
+            return None
+        manifest = RawConfigParser()
+        manifest.optionxform = str
+        try:
+            manifest.read(self.manifestFile)
+            if dict(manifest.items(self.SECTION_SOURCES)) != sources:
+                logging.debug("The action manifest '%s' is out of date." % (self.manifestFile))
+                return None
+            actions = {}
+            for (actionName, value) in manifest.items(self.SECTION_ACTIONS):
+                (moduleName, className) = value.split('|')
+                actions[actionName] = (moduleName, className)
+        except Exception, e:
+            logging.debug("The action manifest '%s' could not be read: %s" % (self.manifestFile, e))
+            return None
+        return actions
+
+    def _writeManifest(self, sources, actions):
+        '''
+        Writes the manifest file. The file is replaced atomically, because several processes may rebuild it at the same time
+        '''
+        if not self.manifestFile:
+            return
+        manifest = RawConfigParser()
+        manifest.optionxform = str
+        manifest.add_section(self.SECTION_SOURCES)
+        for moduleName in sorted(sources):
+            manifest.set(self.SECTION_SOURCES, moduleName, sources[moduleName])
+        manifest.add_section(self.SECTION_ACTIONS)
+        for actionName in sorted(actions):
+            manifest.set(self.SECTION_ACTIONS, actionName, "%s|%s" % actions[actionName])
+        tmpFile = "%s.%s" % (self.manifestFile, str(uuid.uuid4()))
+        try:
+            manifestDirectory = os.path.dirname(self.manifestFile)
+            if manifestDirectory and not os.path.exists(manifestDirectory):
+                os.makedirs(manifestDirectory)
+            with open(tmpFile, 'w') as f:
+                manifest.write(f)
+            os.rename(tmpFile, self.manifestFile)
+            logging.debug("The action manifest '%s' was rebuilt." % (self.manifestFile))
+        except (IOError, OSError), e:
+            logging.debug("The action manifest '%s' could not be written: %s" % (self.manifestFile, e))
+            if os.path.exists(tmpFile):
+                os.unlink(tmpFile)
+
+    ####################
+    # Public Functions #
+    ####################
+    def getActions(self):
+        '''
+        Returns a dictionary of "action name -> (module name, class name)"
+        '''
+        if self._actions is not None:
+            return self._actions
+        sources = self._getModuleSources()
+        actions = self._readManifest(sources)
+        if actions is None:
+            actions = {}
+            for moduleName in sources:
+                className = self._getClassName(moduleName)
+                for actionName in self._scanModule(moduleName):
+                    actions[actionName] = (moduleName, className)
+            self._writeManifest(sources, actions)
+        self._actions = actions
+        return self._actions
+
+    def getActionsByModule(self):
+        '''
+        Returns a dictionary of "module name -> sorted list of action names"
+        '''
+        actionsByModule = {}
+        for (actionName, (moduleName, className)) in self.getActions().iteritems():
+            actionsByModule.setdefault(moduleName, []).append(actionName)
+        for moduleName in actionsByModule:
+            actionsByModule[moduleName].sort()
+        return actionsByModule
+
+    def hasAction(self, actionName):
+        return actionName in self.getActions()
+
+    def loadAction(self, actionName):
+        '''
+        Imports the module of the action, creates an instance of the action class and returns the action function
+        '''
+        (moduleName, className) = self.getActions()[actionName]
+        modulePath    = "actions.%s" % (moduleName)
+        with Profiler().phase('import'):
+            _temp     = __import__(modulePath, globals(), locals(), ['object'], 0)
+        classInstance = getattr(_temp, className)()
+        return getattr(classInstance, actionName)
+
+    def runAction(self, actionName):
+        '''
+        Runs the action and returns its return code. Errors raised by the action are logged and converted to return codes
+        '''
+        # Check if a lock file exists, do not run the action if it does
+        lockfile = Lockfile(actionName)
+        if (lockfile.exists() == True):
+           logging.warn('Action is currently running!')
+           return RC_ACTION_IS_RUNNING
+
+        # Log the start of the process
+        msg = "Starting the '%s' action" % (actionName)
+        logging.debug(msg)
+
+        # Call the requested action, if an error occurs, log the error
+        try:
+           func       = self.loadAction(actionName)
+           returnCode = func()
+        except FileConfigMissing as fcm:
+           logging.error(fcm)
+           returnCode = RC_FILE_CONFIG_MISSING
+        except MandatoryOptionMissing as mom:
+           logging.error(mom)
+           returnCode = RC_MANDATORY_OPTION_MISSING
+        except Exception,e:
+           logging.error(e)
+           exc_type, exc_value, exc_traceback = sys.exc_info()
+           tb                                 = traceback.extract_tb(exc_traceback)
+           formattedTb                        = traceback.format_list(tb)
+           # All traceback concatenate for output
+           tbOutputLine = ''
+           for line in formattedTb:
+               tbOutputLine = tbOutputLine + line
+           logging.error(tbOutputLine)
+           if (lockfile.exists() == True):
+               lockfile.delete()
+           returnCode = RC_UNEXPECTED_ERROR  #TODO: make this look up the specific action's section and see if a different return code is defined
+        return returnCode
@@ -0,0 +1,177 @@
+#!/usr/bin/env python2.7
+from ConfigParser import RawConfigParser, SafeConfigParser
+from collections import OrderedDict
+import cPickle
+import logging
+import os
+import threading
+import uuid
+
+import modules.base.etl_util as etl_util
+
+class ConfigSnapshotFactory(type):
+    '''
+    '''
+    _instances = {}
+    def __call__(cls, *args, **kwargs):
+        if cls not in cls._instances:
+            cls._instances[cls] = super(ConfigSnapshotFactory, cls).__call__(*args, **kwargs)
+        return cls._instances[cls]
+
+class ConfigSnapshot(object):
+    '''
+    The parsed contents of the configuration files, shared by the whole process
+
+    Each file is parsed only once per (modification time, size). The parsed contents
+    (defaults, sections) must never be modified; SnapshotConfigParser copies them into its own dictionaries.
+    With configure(cacheFile) the parsed files under conf/ are also kept in a pickle file,
+    so the next process does not have to parse them again.
+    Files outside of conf/ (e.g. password files) are never written to the cache file.
+    '''
+    __metaclass__ = ConfigSnapshotFactory
+    def __init__(self):
+        self._lock          = threading.Lock()
+        self._files         = {}
+        self._cacheFile     = None
+        self._diskCache     = None
+        self._confDirectory = os.path.join(etl_util.get_app_root_path(), 'conf') + os.sep
+
+    #####################
+    # Private Functions #
+    #####################
+    def _parse(self, path):
+        '''
+        Parse a file and return (defaults, sections). The option names are not transformed by optionxform yet
+        '''
+        parser = RawConfigParser(dict_type=OrderedDict)
+        parser.optionxform = str
+        with open(path) as f:
+            parser.readfp(f, path)
+        sections = OrderedDict()
+        for section in parser.sections():
+            sections[section] = OrderedDict((k, v) for (k, v) in parser._sections[section].iteritems() if k != '__name__')
+        return (OrderedDict(parser.defaults()), sections)
+
+    def _loadDiskCache(self):
+        self._diskCache = {}
+        if not self._cacheFile or not os.path.isfile(self._cacheFile):
+            return
+        try:
+            with open(self._cacheFile, 'rb') as f:
+                self._diskCache = cPickle.load(f)
+        except Exception, e:
+            logging.debug("The configuration cache '%s' could not be read: %s" % (self._cacheFile, e))
+
+    def _writeDiskCache(self):
+        '''
+        The cache file is replaced atomically, because several processes may write it at the same time
+        '''
+        tmpFile = "%s.%s" % (self._cacheFile, str(uuid.uuid4()))
+        try:
+            cacheDirectory = os.path.dirname(self._cacheFile)
+            if cacheDirectory and not os.path.exists(cacheDirectory):
+                os.makedirs(cacheDirectory)
+            with open(tmpFile, 'wb') as f:
+                cPickle.dump(self._diskCache, f, cPickle.HIGHEST_PROTOCOL)
+            os.rename(tmpFile, self._cacheFile)
+        except (IOError, OSError), e:
+            logging.debug("The configuration cache '%s' could not be written: %s" % (self._cacheFile, e))
+            if os.path.exists(tmpFile):
+                os.unlink(tmpFile)
+
+    ####################
+    # Public Functions #
+    ####################
+    def configure(self, cacheFile):
+        '''
+        Keep the parsed configuration files in cacheFile (None: no cache file)
+        '''
+        with self._lock:
+            self._cacheFile = cacheFile
+            self._diskCache = None
+
+    def get(self, filename):
+        '''
+        Returns the parsed contents (defaults, sections) of the file, or None if the file can not be read
+        '''
+        path = os.path.abspath(filename)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        key = (stat.st_mtime, stat.st_size)
+        with self._lock:
+            entry = self._files.get(path)
+            if entry is not None and entry[0] != key:
+                entry = None
+            cacheable = self._cacheFile is not None and path.startswith(self._confDirectory)
+            if cacheable:
+                if self._diskCache is None:
+                    self._loadDiskCache()
+                if entry is None and path in self._diskCache and self._diskCache[path][0] == key:
+                    entry = self._diskCache[path]
+            if entry is None:
+                try:
+                    entry = (key, self._parse(path))
+                except IOError:
+                    return None
+            self._files[path] = entry
+            # also files which were parsed before configure() was called (e.g. conf/globals.cfg)
+            if cacheable and (path not in self._diskCache or self._diskCache[path][0] != key):
+                self._diskCache[path] = entry
+                self._writeDiskCache()
+            return entry[1]
+
+class SnapshotConfigParser(SafeConfigParser):
+    '''
+    A SafeConfigParser which reads the files from the ConfigSnapshot instead of parsing them again
+
+    read() gives the same result as SafeConfigParser.read(): the options of each file are added to
+    the sections that were read before, and later files overwrite the options of earlier files.
+    generation is increased on every change, so values derived from the configuration can be cached per generation.
+    '''
+    def __init__(self, *args, **kwargs):
+        SafeConfigParser.__init__(self, *args, **kwargs)
+        self.generation = 0
+
+    def add_section(self, section):
+        self.generation += 1
+        SafeConfigParser.add_section(self, section)
+
+    def set(self, section, option, value=None):
+        self.generation += 1
+        SafeConfigParser.set(self, section, option, value)
+
+    def remove_option(self, section, option):
+        self.generation += 1
+        return SafeConfigParser.remove_option(self, section, option)
+
+    def remove_section(self, section):
+        self.generation += 1
+        return SafeConfigParser.remove_section(self, section)
+
+    def readfp(self, fp, filename=None):
+        self.generation += 1
+        SafeConfigParser.readfp(self, fp, filename)
+
+    def read(self, filenames):
+        self.generation += 1
+        if isinstance(filenames, basestring):
+            filenames = [filenames]
+        readOk = []
+        for filename in filenames:
+            parsed = ConfigSnapshot().get(filename)
+            if parsed is None:
+                continue
+            (defaults, sections) = parsed
+            for (option, value) in defaults.iteritems():
+                self._defaults[self.optionxform(option)] = value
+            for (section, options) in sections.iteritems():
+                if section not in self._sections:
+                    self._sections[section] = self._dict()
+                    self._sections[section]['__name__'] = section
+                current = self._sections[section]
+                for (option, value) in options.iteritems():
+                    current[self.optionxform(option)] = value
+            readOk.append(filename)
+        return readOk
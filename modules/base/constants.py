@@ -8,6 +8,24 @@ KEY_DATABASE = 'database'
 ###################
 MYSQL                               = 'mysql'
 SQLSERVER                           = 'sqlserver'
+JDBC_MYSQL                          = 'jdbc_mysql'
+JDBC_TERADATA                       = 'jdbc_teradata'
+
+####################
+# Fetch Strategies #
+####################
+FETCH_FIXED                         = 'fixed'   # setFetchSize(fetch_size)
+FETCH_STREAM                        = 'stream'  # MySQL: one row at a time (setFetchSize(Integer.MIN_VALUE))
+FETCH_CURSOR                        = 'cursor'  # MySQL: server side cursor (useCursorFetch=true), fetch_size rows at a time
+MYSQL_STREAMING_FETCH_SIZE          = -2147483648
+
+###################
+# Driver Backends #
+###################
+DRIVER_BACKEND_JDBC                 = 'jdbc'       # JPype/JDBC (default)
+DRIVER_BACKEND_MYSQLDB              = 'mysqldb'    # MySQLdb (C client)
+DRIVER_BACKEND_PYMYSQL              = 'pymysql'    # PyMySQL (pure Python)
+DRIVER_BACKEND_TERADATA             = 'teradata'   # teradata.tdodbc (Teradata ODBC driver)
 
 ################
 # Loader Names #
@@ -44,6 +62,7 @@ SECTION_FILES                       = "files"
 SECTION_GENERATE_REPORT             = 'GENERATE_REPORT'
 SECTION_JDBC                        = 'jdbc'
 SECTION_MAIL_DEFAULT                = 'MAIL_DEFAULT'
+SECTION_METADATA_CACHE              = 'METADATA_CACHE'
 SECTION_OS_COMMANDS                 = 'os_commands'
 SECTION_SEND_EMAIL                  = 'send_email'
 SECTION_ETL_SCRIPTS                 = 'etl_scripts'
@@ -54,6 +73,7 @@ SECTION_TERADATA_DATABASES          = 'teradata_databases'
 SECTION_TERADATA_USERS              = 'teradata_users'
 SECTION_TARGET_FILE_CONFIGURATION   = 'target_file_configuration'
 SECTION_SERVERS                     = 'servers'
+SECTION_SERVER                      = 'server'
 SECTION_RED_TERADATA                = 'red_teradata.cf'  # TODO: Remove this completely in the future
 
 ######################################
@@ -67,6 +87,7 @@ OPTION_PROXY_COMMAND                       = 'proxy_command'# TODO: REMOVE, Depr
 FASTLOAD_COMMAND                    = 'fastload_command'
 GPG_COMMAND                         = 'gpg_command'
 MYSQL_COMMAND                       = 'mysql_command'
+MYSQL_METADATA_CACHE                = 'mysql_metadata_cache'
 PROXY_COMMAND                       = 'proxy_command'
 
 
@@ -86,6 +107,7 @@ PASSWORD_TERADATA_DIRECTORY         = 'password_teradata_directory'
 ##############################
 # Configuration File Options #
 ##############################
+ACTION                              = 'action'
 ACTUAL_DATABASE                     = 'actual_database'
 ADD_HEADER                          = 'add_header'
 ADDITIONAL_CONDITIONS               = 'additional_conditions'
@@ -118,6 +140,7 @@ COLUMN_TYPE                         = 'column_type'
 CONNECT                             = 'connect'
 CONSUMER                            = 'consumer'
 CONSUME_METHOD                      = 'consume_method'
+CONTINUE_ON_ERROR                   = 'continue_on_error'
 COUNTRY_SHEET                       = 'countrySheet'
 COUNTRY_PREFIX                      = 'countryPrefix'
 COUNTRY_ROW                         = 'countryRow'
@@ -141,6 +164,7 @@ DELIMITER                           = 'delimiter'
 DEVELOPMENT_SERVERS                 = 'development_servers'
 DIRECTORY_CONFIG_DATA               = 'conf/data/'
 DRIVER                              = 'driver'
+DRIVER_BACKEND                      = 'driver_backend'
 EMPTY_STRING                        = 'emptyString'
 ENCLOSED_BY                         = 'enclosed_by'
 ENDING_COLUMN                       = 'ending_column'
@@ -149,6 +173,8 @@ END_DATE                            = 'end_date'
 END_POSITION                        = 'end_position'
 ENV_DBNAME                          = 'env_dbname'
 EXTRACTOR                           = 'extractor'
+FETCH_SIZE                          = 'fetch_size'
+FETCH_STRATEGY                      = 'fetch_strategy'
 FIELDS                              = 'fields'
 FIELDS_NUM                          = 'fields_num'
 FROMADDRESS                         = 'from_address'
@@ -197,6 +223,7 @@ OUTLOOK_USERNAME                    = 'outlook_username'
 OUTPUT_DIRECTORY                    = 'output_dir'
 OUTPUT_FILE                         = 'output_file'
 OUTPUT_FILENAME                     = 'output_filename'
+PARALLELISM                         = 'parallelism'
 PARAMETERS_DIRECTORY                = 'parameters_directory'
 PREFIX_LENGTH_MAPPINGS              = 'prefix_length_mappings'
 PRIMARY_INDEX                       = 'primary_index'
@@ -213,6 +240,7 @@ MAX_LENGTH                          = 'max_length'
 MAX_LENGTH_MAPPINGS                 = 'max_length_mappings'
 MESSAGE_PARSER                      = 'message_parser'
 MODE                                = 'mode'
+NEWLINE                             = 'newline'
 NEW_STRING                          = 'new_string'
 NULL_STRING                         = 'null_string'
 NUMBERCOLUMNS                       = 'numberColumns'
@@ -314,6 +342,7 @@ TIMEOUT                             = 'timeout'
 TIMEZONE                            = 'timezone'
 TMP_TABLE                           = 'tmp_table'
 TOADDRESS                           = 'to_address'
+TTL                                 = 'ttl'
 TODAY                               = 'today'
 YESTERDAY                           = 'yesterday'
 TRANSFORMATION_NAMES                = 'transformation_names'
@@ -430,6 +459,16 @@ RC_NETWORK_CONNECTION_ERROR    = 110
 RC_NETWORK_AUTHORIZATION_ERROR = 111
 RC_NETWORK_DOWNLOAD_ERROR      = 112
 
+########################################
+# Action Return Codes (used by etl.py) #
+########################################
+RC_FILE_CONFIG_MISSING         = 101
+RC_MANDATORY_OPTION_MISSING    = 102
+RC_SERVER_NOT_AVAILABLE        = 196
+RC_INVALID_ACTION              = 197
+RC_ACTION_IS_RUNNING           = 198
+RC_UNEXPECTED_ERROR            = 199
+
 ###################################
 # executeBteq Action Return Codes #
 ###################################
@@ -448,6 +487,19 @@ UV_COUNT = 'uv_count'
 DELETE_COUNT = 'delete_count'
 INSERT_COUNT = 'insert_count'
 
+##########################################################
+# Run Metrics Counters (see modules/base/run_metrics.py) #
+##########################################################
+METRIC_BYTES_READ      = 'bytes_read'
+METRIC_BYTES_WRITTEN   = 'bytes_written'
+METRIC_ROWS_READ       = 'rows_read'
+METRIC_ROWS_EXTRACTED  = 'rows_extracted'
+METRIC_ROWS_LOADED     = 'rows_loaded'
+METRIC_ROWS_DELETED    = 'rows_deleted'
+METRIC_ROWS_FETCHED    = 'rows_fetched'
+METRIC_JDBC_STATEMENTS = 'jdbc_statements'
+METRIC_JDBC_SECONDS    = 'jdbc_seconds'
+
 #########################
 # Bteq Return Codes #
 #########################
@@ -5,9 +5,11 @@ import os.path
 from datetime import datetime, timedelta
 
 # ETL Code
-from   modules.base.jdbc            import JDBC
+from   modules.base.jdbc            import JDBC, readFetchDefaults, readAsyncWorkers
+from   modules.base.native_db       import NativeDB
 from   modules.base.etl_base       import EtlBase
 from   modules.base.constants       import *
+from   modules.base.parallel        import QueryExecutor
 
 class Database(EtlBase):
     '''
@@ -20,10 +22,62 @@ class Database(EtlBase):
     #####################
     # Private Functions #
     #####################
+    def _getFetchStrategy(self, section, fetch, fetchStrategy=None, fetchSize=None):
+        '''
+        Returns (fetch strategy, fetch size) of a query
+            strategy: fetchStrategy argument > fetch_strategy in [section] > [FETCH] FETCH_STRATEGY in jdbc.cfg
+            size    : fetchSize argument > fetch_size in [section] > [FETCH] FETCH_SIZE in jdbc.cfg > fetch argument
+        '''
+        (strategy, size) = readFetchDefaults()
+        if self.config.has_option(section, FETCH_STRATEGY) and self.config.get(section, FETCH_STRATEGY):
+            strategy = self.config.get(section, FETCH_STRATEGY)
+        if self.config.has_option(section, FETCH_SIZE) and self.config.get(section, FETCH_SIZE):
+            size = self.config.getint(section, FETCH_SIZE)
+        if fetchStrategy:
+            strategy = fetchStrategy
+        if fetchSize:
+            size = fetchSize
+        if size is None:
+            size = fetch
+        return (strategy, size)
+
+    def _getDriverBackend(self, section):
+        '''
+        Returns driver_backend of [section]: jdbc (default), or a native DB-API driver (see NativeDB)
+        '''
+        if self.config.has_option(section, DRIVER_BACKEND) and self.config.get(section, DRIVER_BACKEND):
+            return self.config.get(section, DRIVER_BACKEND)
+        return DRIVER_BACKEND_JDBC
+
+    def _connect(self, section, url, driver, username, password, isolation=''):
+        '''
+        Returns the connection of the current thread through the driver backend of [section]:
+        a JDBC object, or a NativeDB object with the same execute() and the same result shapes
+        '''
+        backend = self._getDriverBackend(section)
+        if backend == DRIVER_BACKEND_JDBC:
+            return JDBC(url, driver, username, password, isolation)
+        return NativeDB(url, backend, username, password, isolation)
 
     ####################
     # Public Functions #
     ####################
+    def callAsync(self, func, *args, **kwargs):
+        '''
+        Run func(*args, **kwargs) (e.g. self.getTableDefinition) on the QueryExecutor and return a Future
+
+        Independent queries overlap their round-trips instead of adding them up:
+            futures     = [db.callAsync(db.hasTable, database, table) for table in tables]
+            existences  = gather(futures)    # modules.base.parallel.gather
+        '''
+        return QueryExecutor(readAsyncWorkers()).submit(func, *args, **kwargs)
+
+    def executeSqlAsync(self, *args, **kwargs):
+        '''
+        Run executeSql(*args, **kwargs) on the QueryExecutor and return a Future of the result set
+        '''
+        return self.callAsync(self.executeSql, *args, **kwargs)
+
     def getPrimaryKey(self, database, table):
         '''
         Get the Primary Key for a given table
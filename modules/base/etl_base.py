@@ -1,6 +1,4 @@
-from ConfigParser import SafeConfigParser
 from subprocess import Popen, PIPE
-from dateutil.relativedelta import relativedelta
 import datetime
 import fnmatch
 import logging
@@ -9,27 +7,37 @@ import os
 import re
 import sys
 import shutil
+import time
 import uuid
 import codecs
-import jpype
-import csv
-import posixfile
 
+from modules.base.config_snapshot import SnapshotConfigParser
 from modules.base.exceptions     import FileConfigMissing,MandatoryOptionMissing
 from modules.base.constants      import *
 from modules.base.environment    import Environment
 from modules.base.options        import Options
+from modules.base.profiler       import Profiler
+from modules.base.run_metrics    import RunMetrics
+from modules.base.section_parameters import SectionParameters
 import modules.base.etl_util    as etl_util
+import modules.base.log_context as log_context
+import modules.base.parallel    as parallel
+import modules.base.run_metrics as run_metrics
 
 class EtlBase(object):
     def __init__(self):
         self.options = Options()
-        self.config = SafeConfigParser()
-        self.config.read(os.path.join(etl_util.get_app_root_path(), 'conf/globals.cfg'))
+        # The files are parsed only once per process (see modules/base/config_snapshot.py)
+        self.config = SnapshotConfigParser()
+        with Profiler().phase('config'):
+            self.config.read(os.path.join(etl_util.get_app_root_path(), 'conf/globals.cfg'))
         env = Environment(self.config)
         self.environment   = env.environment
         self.environmentId = env.environmentId
         self._persistentParams = {}
+        # SectionParameters per section name, valid for one generation of self.config
+        self._sectionParameters           = {}
+        self._sectionParametersGeneration = None
 
     #####################
     # Private Functions #
@@ -126,8 +134,8 @@ class EtlBase(object):
         msg = "Executing command [%s]" % (cmdStrMsg)
         logging.log(logLevel, msg)
 
-        # Prepare the environment for the subprocess
-        myEnv = os.environ
+        # Prepare the environment for the subprocess (a copy, sections may run commands concurrently)
+        myEnv = os.environ.copy()
         for envVar in extraEnvVariables:
             myEnv[envVar] = extraEnvVariables[envVar]
 
@@ -149,8 +157,14 @@ class EtlBase(object):
            return (p, stdinFilePath, stdoutFilePath, stderrFilePath)
 
         # Wait till process is finished
-        returnCode = p.wait()
+        cmdName = os.path.basename(cmdStr.split()[0])
+        start   = time.time()
+        with Profiler().phase('os command %s' % (cmdName)):
+            returnCode = p.wait()
         logging.log(logLevel, "Command Return Code is %s" % (returnCode))
+        metrics = run_metrics.getSectionMetrics()
+        if metrics is not None:
+            metrics.addSubprocess(cmdName, time.time() - start, returnCode)
 
         # Create stdin array
         stdinFile  = open(stdinFilePath  ,'r')
@@ -177,6 +191,16 @@ class EtlBase(object):
 
         return (stdin, stdout, stderr, p.returncode)
 
+    def _getParallelism(self):
+        '''
+        Number of sections that are processed concurrently (--parallelism, default 1)
+        '''
+        parallelism = self.readOptionFromCmd(PARALLELISM, 1)
+        if not self._isInteger(parallelism) or int(parallelism) < 1:
+            msg = "The option '%s' must be a positive integer. [%s=%s]" % (PARALLELISM, PARALLELISM, parallelism)
+            raise Exception(msg)
+        return int(parallelism)
+
     def _isInteger(self, variable):
         try:
             int(variable)
@@ -201,14 +225,21 @@ class EtlBase(object):
         else:
             (matchingFiles, matchingDirectories) = self._getMatchingFilesAndDirectories(sourceDir, filePattern)
         if not backDays:
+            self._addMatchedFilesMetrics(matchingFiles)
             return matchingFiles
         returnFiles = []
         for file in matchingFiles:
             modifiedTime = datetime.datetime.fromtimestamp(os.path.getmtime(file))
             if datetime.datetime.now() - modifiedTime > datetime.timedelta(days=int(backDays)):
                 returnFiles.append(file)
+        self._addMatchedFilesMetrics(returnFiles)
         return returnFiles
 
+    def _addMatchedFilesMetrics(self, files):
+        metrics = run_metrics.getSectionMetrics()
+        if metrics is not None:
+            metrics.addFiles(files)
+
     def _getMatchingDirectories(self, sourceDir, filePattern):
         (matchingFiles,matchingDirectories) =self._getMatchingFilesAndDirectories(sourceDir, filePattern)
         return matchingDirectories
@@ -396,7 +427,8 @@ class EtlBase(object):
            raise FileConfigMissing(msg)
         msg = "Reading configuration file '%s' " % (fileConfigPath)
         logging.info(msg)
-        self.config.read(fileConfigPath)
+        with Profiler().phase('config'):
+            self.config.read(fileConfigPath)
 
     def _readFilesToBeProcessed(self):
         '''
@@ -426,7 +458,8 @@ class EtlBase(object):
            raise FileConfigMissing(msg)
         msg = "Reading configuration file '%s' " % (tableConfigPath)
         logging.info(msg)
-        self.config.read(tableConfigPath)
+        with Profiler().phase('config'):
+            self.config.read(tableConfigPath)
 
     def readOptionFromCmd(self, keyName, defaultValue):
         if self.options.hasKey(keyName) and self.options.get(keyName) != None:
@@ -452,58 +485,16 @@ class EtlBase(object):
         # 1. Check if the option was supplied on the command line
         # 2. Check if exists in the config file
         # 3. set it to the default
-        #if hasattr(self.options, option) and getattr(self.options, option) != None and canOverride:
-        section = self._getActualSectionName(section)
-        if self.options.hasKey(option) and self.options.get(option) != None and canOverride:
-           optionValue = self.options.get(option)
-           msg         = "The option '%s' set to '%s', via command line argument" % (option, optionValue)
-        elif (self.config.has_option(section, option) == False or not self.config.get(section, option)):
-           optionValue = defaultValue
-           msg         = "The option '%s' is set to the default value of '%s'" % (option, optionValue)
-        else:
-           optionValue = self.config.get(section, option)
-           msg = "The option '%s' is set to the value of '%s', via configuration file section [%s]" % (option, optionValue, section)
-        # Log what happened if requested
-        if (logMessage):
-           logging.debug(msg)
-        #convert the string read from the cfg file into a int
-        try:
-            optionValueConverted = int(optionValue)
-        except:
-            optionValueConverted = optionValue
-        return optionValueConverted
+        return self.getSectionParameters(section).get(option, defaultValue, logMessage, canOverride)
 
     def _readMandatoryOption(self, section, option, logMessage = True):
-        section = self._getActualSectionName(section)
-        if (self.config.has_option(section, option) == False):
-           msg = "The mandatory option '%s' is missing from the section [%s]" % (option, section)
-           raise MandatoryOptionMissing(msg)
-        else:
-           optionValue = self.config.get(section, option)
-           if (logMessage):
-               msg = "The option '%s' in [%s] is set to '%s'" % (option, section, optionValue)
-               logging.debug(msg)
-        #convert the string read from the cfg file into a int
-        try:
-            optionValueConverted = int(optionValue)
-        except:
-            optionValueConverted = optionValue
-        return optionValueConverted
+        return self.getSectionParameters(section).getMandatory(option, logMessage)
 
     def _readOptionDefault(self, section, option, defaultValue):
-        section = self._getActualSectionName(section)
-        if self.config.has_option(section, option):
-            optionValue = self._readOption(section, option, defaultValue)
-        else:
-            optionValue = self._readOption(SECTION_DEFAULT, option, defaultValue)
-        return optionValue
+        return self.getSectionParameters(section).getDefault(option, defaultValue)
 
     def _readMandatoryOptionDefault(self, section, option):
-        optionValue = self._readOptionDefault(section, option, None)
-        if optionValue is None:
-            msg = "The mandatory option '%s' is missing from the section [%s]" % (option, section)
-            raise MandatoryOptionMissing(msg)
-        return optionValue
+        return self.getSectionParameters(section).getMandatoryDefault(option)
 
     def _readDirOption(self, section, option, defaultValue, checkDefault=True):
         if checkDefault:
@@ -759,6 +750,7 @@ class EtlBase(object):
         DB values    :jpype.java.lang.Integer
         Python values:long
         """
+        import jpype
         if ele is None:
             ele2 = None
         elif isinstance(ele, unicode):
@@ -909,6 +901,7 @@ class EtlBase(object):
         Reads from the parameter file, according to the ML_JOBNET_NAME environment parameter
         The OPTIONAL environment flag 'THREAD', if set, allows to distinguish several processes that run concurrently in the same jobnet
         '''
+        import csv
         jobname = os.getenv('ML_JOBNET_NAME') + os.getenv('THREAD', '')
 
         if jobname is not None:
@@ -948,6 +941,8 @@ class EtlBase(object):
         Writes to the parameter file, according to the ML_JOBNET_NAME environment parameter
         The OPTIONAL environment flag 'THREAD', if set, allows to distinguish several processes that run concurrently in the same jobnet
         '''
+        import csv
+        import posixfile
         jobname = os.getenv('ML_JOBNET_NAME') + os.getenv('THREAD', '')
 
         if jobname is not None:
@@ -1045,11 +1040,30 @@ class EtlBase(object):
         folderName = os.path.join('modules', folderName)
         return self.getConfigFile(folderName, fileName)
 
+    def getSectionParameters(self, section):
+        '''
+        Returns the SectionParameters of the section (see modules/base/section_parameters.py).
+        The object is created once per section and reused until self.config is changed
+        '''
+        if self._sectionParametersGeneration != self.config.generation:
+            self._sectionParameters           = {}
+            self._sectionParametersGeneration = self.config.generation
+        parameters = self._sectionParameters.get(section)
+        if parameters is None:
+            defaultParameters = None
+            if section != SECTION_DEFAULT:
+                defaultParameters = self.getSectionParameters(SECTION_DEFAULT)
+            actualSection = self._getActualSectionName(section)
+            parameters    = SectionParameters(self.config, self.options, section, actualSection, defaultParameters)
+            self._sectionParameters[section] = parameters
+        return parameters
+
     def getSectionsToBeProcessed(self, configFile, sectionPattern):
         '''
         Get all section names in configFile matched the sectionPattern
         '''
-        self.config.read(configFile)
+        with Profiler().phase('config'):
+            self.config.read(configFile)
         allSections = self.config.sections()
         matchedSections = []
         for section in allSections:
@@ -1068,6 +1082,37 @@ class EtlBase(object):
         configFile = self.getActionConfigFile(configFilename, actionName)
         return self.getSectionsToBeProcessed(configFile, sectionPattern)
 
+    def processSections(self, sections, processSection):
+        '''
+        Call processSection(section) for each section and return the results in the order of the sections.
+        With --parallelism N (N > 1) the sections are processed by N worker threads.
+        Log records written while a section is processed are tagged with the section name,
+        and the metrics of each section are recorded (see modules/base/run_metrics.py).
+        '''
+        action = self.options.get('action')
+        def _processSection(section):
+            previousSection = log_context.getContext('section')
+            previousMetrics = log_context.getContext('metrics')
+            metrics         = run_metrics.SectionMetrics(action, section)
+            log_context.setContext('section', section)
+            log_context.setContext('metrics', metrics)
+            try:
+                result = processSection(section)
+            except:
+                RunMetrics().finishSection(metrics, 'error')
+                raise
+            finally:
+                log_context.setContext('section', previousSection)
+                log_context.setContext('metrics', previousMetrics)
+            RunMetrics().finishSection(metrics, 'finished', result)
+            return result
+
+        parallelism = self._getParallelism()
+        if parallelism <= 1 or len(sections) <= 1:
+            return [_processSection(section) for section in sections]
+        logging.info("Processing %s sections with %s worker threads." % (len(sections), min(parallelism, len(sections))))
+        return parallel.runInParallel(_processSection, sections, parallelism)
+
     def substitutePatternString(self, origStr):
         '''
         Substitute patterns in origStr
@@ -1085,8 +1130,11 @@ class EtlBase(object):
         firstDay = datetime.date(day=1, month=today.month, year=today.year)
         lastDayOfLastMonth = firstDay - oneDay
         lastMonthStr = lastDayOfLastMonth.strftime(PYTHON_DATE_FORMAT['YYYYMM'])
-        dayOfNextMonth = today + relativedelta(months=1)
-        nextMonthStr = dayOfNextMonth.strftime(PYTHON_DATE_FORMAT['YYYYMM'])
+        nextMonthStr = ''
+        if '<NEXT_MONTH>' in origStr:
+            from dateutil.relativedelta import relativedelta
+            dayOfNextMonth = today + relativedelta(months=1)
+            nextMonthStr = dayOfNextMonth.strftime(PYTHON_DATE_FORMAT['YYYYMM'])
         newStr = origStr.replace('<TODAY>', todayStr).replace('<YESTERDAY>', yesterdayStr).replace('<RANDOM>', rndString).replace('<NEXT_MONTH>', nextMonthStr).replace('<THIS_MONTH>', thisMonthStr).replace('<LAST_MONTH>', lastMonthStr)
         logging.debug("newStr: %s" % (newStr))
         return newStr
@@ -1169,7 +1217,8 @@ class EtlBase(object):
         logging.info("Using template file: '%s'" % templateFile)
         # Generate file body
         try:
-            fileBody = open(templateFile,'r').read() % parameters
+            with Profiler().phase('template'):
+                fileBody = open(templateFile,'r').read() % parameters
         except:
             logging.error("Error happened when trying to creating file body!")
             raise
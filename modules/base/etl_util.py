@@ -96,3 +96,27 @@ def add_date_from_yyyymmdd(date_string, add_days):
 
     calc_date_string = calc_date.strftime('%Y%m%d')
     return calc_date_string
+
+def count_lines(file_path, block_size=1024 * 1024):
+    """
+    Counts the lines of a file without reading the whole file into memory.
+
+    Args:
+        file_path: a file path
+        block_size: the number of bytes read at once
+
+    Returns:
+        the number of lines
+    """
+    lines = 0
+    last_block = ''
+    with open(file_path, 'rb') as f:
+        block = f.read(block_size)
+        while block:
+            lines += block.count('\n')
+            last_block = block
+            block = f.read(block_size)
+    # the last line may have no line feed
+    if last_block and not last_block.endswith('\n'):
+        lines += 1
+    return lines
@@ -20,3 +20,30 @@ class ReleaseTableMissing(Exception):
 
      def __str__(self):
         return repr(self.value)
+
+# Used in modules/base/jdbc.py
+class JDBCPoolExhausted(Exception):
+     def __init__(self, value):
+        self.value   = value
+        self.message = value
+
+     def __str__(self):
+        return repr(self.value)
+
+# Used in modules/base/parallel.py
+class QueryTimeout(Exception):
+     def __init__(self, value):
+        self.value   = value
+        self.message = value
+
+     def __str__(self):
+        return repr(self.value)
+
+# Used in modules/base/native_db.py
+class NativeDriverMissing(Exception):
+     def __init__(self, value):
+        self.value   = value
+        self.message = value
+
+     def __str__(self):
+        return repr(self.value)
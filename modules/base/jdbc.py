@@ -1,43 +1,292 @@
-import os
-from ConfigParser import SafeConfigParser
-import jpype
+import hashlib
+import itertools
 import logging
+import sys
 import thread
+import threading
+import time
 
-import etl_util
+from modules.base.constants import FETCH_FIXED, FETCH_STREAM, FETCH_CURSOR, MYSQL_STREAMING_FETCH_SIZE
+from modules.base.exceptions import JDBCPoolExhausted
+from modules.base.jvm import JVMManager, PATH_JDBC_CFG, readJdbcConfig
+from modules.base.profiler import Profiler
+from modules.base.statement_stats import StatementStats
 import modules.r10_jdbc as jaydebeapi
 
-# Allow to have an external test_jdbc.cfg for local platform development
-PATH_JDBC_CFG = os.path.join(os.path.expanduser("~"), '.etl', 'jdbc.cfg')
-if not os.path.isfile(PATH_JDBC_CFG):
-    PATH_JDBC_CFG = os.path.join(etl_util.get_app_root_path(), 'conf', 'modules', 'jdbc.cfg')
+def _attachThread():
+    '''
+    A connection may be used by another thread than the one which created it,
+    and every thread which calls into the JVM must be attached to it
+    '''
+    jpype = sys.modules.get('jpype')
+    if jpype is not None and jpype.isJVMStarted() and not jpype.isThreadAttachedToJVM():
+        jpype.attachThreadToJVM()
+
+class ConnectionPool(object):
+    '''
+    Idle JDBC connections, shared by all threads of the process
+
+    Pool Key:
+        (connect, driver, user, sha1 of password, isolation)
+
+    [POOL] in jdbc.cfg
+        MAX_CONNECTIONS : max. number of open connections (idle + borrowed) per pool key
+        IDLE_TIMEOUT    : idle connections are closed after this number of seconds
+        BORROW_TIMEOUT  : max. number of seconds to wait for a connection when MAX_CONNECTIONS are borrowed
+        VALIDATION_QUERY: executed before an idle connection is reused ('': no validation)
+        STATEMENT_CACHE_SIZE: max. number of prepared statements kept open per connection (see r10_jdbc Connection)
+    '''
+    def __init__(self, maxConnections=8, idleTimeout=300, borrowTimeout=600, validationQuery='SELECT 1'):
+        self.maxConnections  = maxConnections
+        self.idleTimeout     = idleTimeout
+        self.borrowTimeout   = borrowTimeout
+        self.validationQuery = validationQuery
+        self._condition      = threading.Condition()
+        # pool key -> list of (JDBC object, time it was given back), the most recently used one last
+        self._idle           = {}
+        # pool key -> number of open connections (idle + borrowed)
+        self._open           = {}
+        self._statistics     = {'created': 0, 'reused': 0, 'invalid': 0, 'evicted': 0, 'waits': 0, 'closed': 0}
+
+    #####################
+    # Private Functions #
+    #####################
+    def _close(self, key, jdbc):
+        '''
+        Close a connection which was already removed from the idle list (called without the lock)
+        '''
+        try:
+            if hasattr(jdbc.conn, 'statement_cache_info'):
+                logging.debug("Prepared statement cache of the closed JDBC connection: %s" % (jdbc.conn.statement_cache_info()))
+            jdbc._close()
+        except Exception, e:
+            logging.debug("Error happened when closing a pooled JDBC connection: %s" % (e))
+        with self._condition:
+            self._open[key] -= 1
+            self._statistics['closed'] += 1
+            self._condition.notifyAll()
+
+    def _takeExpired(self):
+        '''
+        Remove the connections which were idle longer than idleTimeout (called with the lock)
+        '''
+        expired = []
+        limit   = time.time() - self.idleTimeout
+        for (key, idle) in self._idle.iteritems():
+            while idle and idle[0][1] < limit:
+                expired.append((key, idle.pop(0)[0]))
+        self._statistics['evicted'] += len(expired)
+        return expired
+
+    def _validate(self, jdbc):
+        if not self.validationQuery:
+            return True
+        try:
+            with Profiler().phase('jdbc validate'):
+                cursor = jdbc.conn.cursor()
+                cursor.execute(self.validationQuery)
+                cursor.fetchall()
+                cursor.close()
+            return True
+        except Exception, e:
+            logging.debug("The pooled JDBC connection is not valid any more: %s" % (e))
+            return False
+
+    ####################
+    # Public Functions #
+    ####################
+    def borrow(self, key, create):
+        '''
+        Returns an idle connection of the pool key, or a new connection made by create()
+        '''
+        deadline = time.time() + self.borrowTimeout
+        while True:
+            jdbc       = None
+            mustCreate = False
+            with self._condition:
+                expired = self._takeExpired()
+                idle    = self._idle.get(key)
+                if idle:
+                    jdbc = idle.pop()[0]
+                elif self._open.get(key, 0) < self.maxConnections:
+                    self._open[key] = self._open.get(key, 0) + 1
+                    mustCreate      = True
+                elif not expired:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        msg = "No JDBC connection to %s for %s available after %s seconds (MAX_CONNECTIONS=%s)" % (key[0], key[2], self.borrowTimeout, self.maxConnections)
+                        raise JDBCPoolExhausted(msg)
+                    self._statistics['waits'] += 1
+                    self._condition.wait(remaining)
+                    continue
+            for (expiredKey, expiredJdbc) in expired:
+                self._close(expiredKey, expiredJdbc)
+            if mustCreate:
+                try:
+                    jdbc = create()
+                except Exception:
+                    with self._condition:
+                        self._open[key] -= 1
+                        self._condition.notifyAll()
+                    raise
+                with self._condition:
+                    self._statistics['created'] += 1
+                return jdbc
+            if jdbc is not None:
+                if self._validate(jdbc):
+                    with self._condition:
+                        self._statistics['reused'] += 1
+                    return jdbc
+                with self._condition:
+                    self._statistics['invalid'] += 1
+                self._close(key, jdbc)
+            # the connection was invalid or expired connections were closed: try again
+
+    def giveBack(self, key, jdbc):
+        '''
+        Return a borrowed connection to the pool. An open transaction is rolled back
+        '''
+        try:
+            jdbc._reset()
+        except Exception, e:
+            logging.debug("The JDBC connection could not be reset, it is closed: %s" % (e))
+            self._close(key, jdbc)
+            return
+        with self._condition:
+            self._idle.setdefault(key, []).append((jdbc, time.time()))
+            self._condition.notifyAll()
+
+    def closeIdle(self):
+        '''
+        Close all idle connections (the borrowed connections are not affected)
+        '''
+        with self._condition:
+            idle = []
+            for (key, connections) in self._idle.iteritems():
+                idle += [(key, connection[0]) for connection in connections]
+            self._idle = {}
+        for (key, jdbc) in idle:
+            self._close(key, jdbc)
+
+    def getStatistics(self):
+        '''
+        Returns the counters (created, reused, invalid, evicted, waits, closed) and the number of open and idle connections
+        '''
+        with self._condition:
+            statistics         = dict(self._statistics)
+            statistics['open'] = sum(self._open.values())
+            statistics['idle'] = sum([len(idle) for idle in self._idle.values()])
+        return statistics
+
+def readFetchDefaults():
+    '''
+    Returns (fetch strategy, fetch size or None) of [FETCH] in jdbc.cfg
+    '''
+    config_parser = readJdbcConfig()
+    strategy  = FETCH_FIXED
+    fetchSize = None
+    if config_parser.has_option('FETCH', 'FETCH_STRATEGY') and config_parser.get('FETCH', 'FETCH_STRATEGY'):
+        strategy = config_parser.get('FETCH', 'FETCH_STRATEGY')
+    if config_parser.has_option('FETCH', 'FETCH_SIZE') and config_parser.get('FETCH', 'FETCH_SIZE'):
+        fetchSize = config_parser.getint('FETCH', 'FETCH_SIZE')
+    return (strategy, fetchSize)
+
+def readAsyncWorkers():
+    '''
+    Returns the number of worker threads of the QueryExecutor ([POOL] ASYNC_WORKERS in jdbc.cfg)
+    '''
+    config_parser = readJdbcConfig()
+    if config_parser.has_option('POOL', 'ASYNC_WORKERS') and config_parser.get('POOL', 'ASYNC_WORKERS'):
+        return config_parser.getint('POOL', 'ASYNC_WORKERS')
+    return 4
+
+def enableStatementStats(config_parser):
+    '''
+    Report the timings of all statements to the StatementStats, with the slow query threshold
+    and COUNT_CHARS of [STATEMENT_STATS] in jdbc.cfg
+    '''
+    threshold  = None
+    countChars = False
+    if config_parser.has_option('STATEMENT_STATS', 'SLOW_QUERY_THRESHOLD') and config_parser.get('STATEMENT_STATS', 'SLOW_QUERY_THRESHOLD'):
+        threshold = config_parser.getfloat('STATEMENT_STATS', 'SLOW_QUERY_THRESHOLD')
+    if config_parser.has_option('STATEMENT_STATS', 'COUNT_CHARS') and config_parser.get('STATEMENT_STATS', 'COUNT_CHARS'):
+        countChars = config_parser.getboolean('STATEMENT_STATS', 'COUNT_CHARS')
+    StatementStats().setSlowQueryThreshold(threshold)
+    StatementStats().countChars = countChars
+    jaydebeapi.set_statement_listener(StatementStats().record, countChars)
+
+def getStatementFetchSize(driver, strategy, fetchSize):
+    '''
+    Returns the fetch size which is set on the statement for the fetch strategy
+        fixed : fetchSize rows per round-trip
+        stream: MySQL only, the rows are streamed one by one instead of being buffered in the JVM.
+                No other statement can be executed on the connection until the result set is closed
+        cursor: MySQL only, a server side cursor (useCursorFetch=true in the URL) with fetchSize rows per round-trip
+    '''
+    if strategy not in (FETCH_FIXED, FETCH_STREAM, FETCH_CURSOR):
+        raise ValueError("Unknown fetch strategy '%s' (%s, %s or %s)" % (strategy, FETCH_FIXED, FETCH_STREAM, FETCH_CURSOR))
+    if strategy == FETCH_STREAM:
+        if 'mysql' in driver:
+            return MYSQL_STREAMING_FETCH_SIZE
+        logging.debug("The fetch strategy '%s' is not supported by %s, '%s' is used." % (strategy, driver, FETCH_FIXED))
+    return fetchSize
 
 class JDBCFactory(type):
     '''
     This class is factory for JDBC objects
 
     JDBCObj
-        a dictionary of JDBC objects
+        a dictionary of the JDBC objects borrowed by each thread
 
         JDBCObj Key:
-            (connect, driver, user, password, isolation)
+            (pool key, thread id)  pool key: (connect, driver, user, sha1 of password, isolation)
 
         JDBCObj Value:
             a JDBC object
 
+    A thread keeps the JDBC objects it got until it calls JDBC() without arguments.
+    They are then given back to the ConnectionPool and may be reused by any thread.
+
     Usage of JDBC
       Usage1: The isolation remains default.
         JDBC(connect, driver, user, password)
-        In this case, JDBCObj Key is (connect, driver, user, password, '')
+        In this case, the pool key is (connect, driver, user, sha1 of password, '')
 
       Usage2: The isolation is set with a specified isolation.
         JDBC(connect, driver, user, password, isolation)
-        In this case, JDBCObj Key is (connect, driver, user, password, isolation)
+        In this case, the pool key is (connect, driver, user, sha1 of password, isolation)
+
+      Usage3: Give back all JDBC objects of the current thread to the pool
+        JDBC()
+
+      Usage4: Close all idle connections of the pool (e.g. when the process ends)
+        JDBC.closePool()
+
+      Usage5: Give back the JDBC objects of the current thread which have no open cursor
+        JDBC.releaseUnused()
     '''
 
     def __init__(self, *args):
         type.__init__(self, *args)
         self.JDBCObj = {}
+        self._pool   = None
+        self._lock   = threading.Lock()
+
+    def _getPool(self):
+        with self._lock:
+            if self._pool is None:
+                config_parser = readJdbcConfig()
+                parameters = {}
+                for (option, default) in (('MAX_CONNECTIONS', 8), ('IDLE_TIMEOUT', 300), ('BORROW_TIMEOUT', 600)):
+                    if config_parser.has_option('POOL', option):
+                        parameters[option] = config_parser.getint('POOL', option)
+                    else:
+                        parameters[option] = default
+                validationQuery = 'SELECT 1'
+                if config_parser.has_option('POOL', 'VALIDATION_QUERY'):
+                    validationQuery = config_parser.get('POOL', 'VALIDATION_QUERY')
+                self._pool = ConnectionPool(parameters['MAX_CONNECTIONS'], parameters['IDLE_TIMEOUT'], parameters['BORROW_TIMEOUT'], validationQuery)
+            return self._pool
 
     def __call__(self, connect='', driver='', user='', password='',isolation=''):
         '''
@@ -56,31 +305,58 @@ class JDBCFactory(type):
         Returns:
             a JDBC object
         '''
-        #Close all JDBC connections
+        #Give back all JDBC connections of the current thread
         curThreadId=thread.get_ident()
         if connect=='':
-            for args in self.JDBCObj:
-                logging.debug("Current Thread Id: %s" % curThreadId)
-                logging.debug("JDBC obj belongs to: %s" % args[5])
-                if curThreadId != args[5]:
-                    logging.debug("Skip closing JDBC obj which created in other thread.")
+            _attachThread()
+            # keys() returns a copy, other threads may add connections at the same time
+            for args in self.JDBCObj.keys():
+                if curThreadId != args[1]:
                     continue
-                try:
-                    logging.debug("Now closing JDBC obj.")
-                    self.JDBCObj[args].conn.close()
-                except Exception,e:
-                    logging.error("error happened when closing the JDBC connection!")
-                    raise
-            self.JDBCObj = {}
+                logging.debug("Now giving back JDBC obj to the pool.")
+                self._getPool().giveBack(args[0], self.JDBCObj.pop(args))
             return
 
-        #Get a connection which would be created newly or already exists.
-        args = (connect, driver, user, password, isolation, curThreadId)
+        #Get a connection which would be borrowed from the pool or created newly.
+        poolKey = (connect, driver, user, hashlib.sha1(str(password)).hexdigest(), isolation)
+        args    = (poolKey, curThreadId)
         if not args in self.JDBCObj:
-            logging.debug("Creating a new JDBC connection.")
-            self.JDBCObj[args] = type.__call__(self, connect, driver, user, password,isolation)
+            _attachThread()
+            def create():
+                logging.debug("Creating a new JDBC connection.")
+                return type.__call__(self, connect, driver, user, password,isolation)
+            self.JDBCObj[args] = self._getPool().borrow(poolKey, create)
         return self.JDBCObj[args]
 
+    def releaseUnused(self):
+        '''
+        Give back the JDBC objects of the current thread which have no open cursor,
+        e.g. before the thread waits for other threads which borrow from the same pool
+        '''
+        curThreadId=thread.get_ident()
+        _attachThread()
+        for args in self.JDBCObj.keys():
+            if curThreadId != args[1] or self.JDBCObj[args].hasOpenCursors():
+                continue
+            logging.debug("Now giving back unused JDBC obj to the pool.")
+            self._getPool().giveBack(args[0], self.JDBCObj.pop(args))
+
+    def closePool(self):
+        '''
+        Give back the JDBC objects of the current thread and close all idle connections
+        '''
+        self()
+        if self._pool is None:
+            return
+        _attachThread()
+        self._pool.closeIdle()
+        logging.debug("JDBC pool statistics: %s" % (self._pool.getStatistics()))
+
+    def getPoolStatistics(self):
+        if self._pool is None:
+            return {}
+        return self._pool.getStatistics()
+
 class JDBC:
     '''
     This class is JDBC Connection
@@ -103,26 +379,19 @@ class JDBC:
     '''
     __metaclass__ = JDBCFactory
     def __init__(self, connect, driver, user, password,isolation=''):
-        config_parser = SafeConfigParser()
-        config_parser.read(PATH_JDBC_CFG)
-        # since it is impossible to call jpype.isThreadAttachedToJVM() before jpype.startJVM()
-        # we won't check if JVM is started.
-        classpath = config_parser.get("JVM", "classpath")
-        javaHome  = config_parser.get("JVM", "java_home")
-        if (javaHome[0] != '/'):
-            javaHome = "%s/%s" % (etl_util.get_app_root_path(), javaHome)
-
-        args='-Djava.class.path=%s' % classpath
-        try:
-            os.environ['JAVA_HOME'] = javaHome
-            jvm_path                = jpype.getDefaultJVMPath()
-        except TypeError:
-            logging.error("failed to get default JVM path")
-            raise
-        if (jpype.isJVMStarted() == False):
-            jpype.startJVM(jvm_path, args)
+        config_parser = readJdbcConfig()
+        # The JVM is started with the options of [JVM] in jdbc.cfg by the first connection (see modules/base/jvm.py)
+        JVMManager().start()
         logging.debug("Connecting with %s to %s with user %s" % (driver, connect, user))
-        self.conn = jaydebeapi.connect(driver, connect, user, password)
+        with Profiler().phase('jdbc connect'):
+            self.conn = jaydebeapi.connect(driver, connect, user, password)
+        if config_parser.has_option('POOL', 'STATEMENT_CACHE_SIZE'):
+            self.conn.statement_cache_size = config_parser.getint('POOL', 'STATEMENT_CACHE_SIZE')
+        enableStatementStats(config_parser)
+        if config_parser.has_option('FETCH', 'DECIMAL_MODE') and config_parser.get('FETCH', 'DECIMAL_MODE'):
+            jaydebeapi.set_decimal_mode(config_parser.get('FETCH', 'DECIMAL_MODE'))
+        if config_parser.has_option('FETCH', 'LOB_INLINE_SIZE') and config_parser.get('FETCH', 'LOB_INLINE_SIZE'):
+            jaydebeapi.set_lob_inline_size(config_parser.getint('FETCH', 'LOB_INLINE_SIZE'))
 
         #set isolation level
         if isolation!='':
@@ -143,23 +412,67 @@ class JDBC:
     # TODO: DEPRECATED - Will be removed after all references fixed
     def _execute(self, sql, parameters=None):
         curs = self.conn.cursor()
-        curs.execute(sql, parameters)
+        with Profiler().phase('jdbc execute'):
+            curs.execute(sql, parameters)
         return curs
 
     ####################
     # Public Functions #
     ####################
-    def execute(self, sql, parameters=None):
+    def execute(self, sql, parameters=None, fetchSize=None):
+        '''
+        fetchSize: set on the statement before it is executed (see getStatementFetchSize)
+        '''
         curs = self.conn.cursor()
-        curs.execute(sql, parameters)
+        with Profiler().phase('jdbc execute'):
+            curs.execute(sql, parameters, fetchSize)
         return curs
 
     def insert(self, sql, parameters=None):
         #connection.prepareStatement
         cursor = self.conn.cursor()
-        cursor.executeInsert(sql,parameters)
-        print dir(self.conn)
+        insertId = cursor.executeInsert(sql,parameters)
         cursor.close()
+        return insertId
+
+    def bulkInsert(self, sql, rows, batchSize=1000, autoCommit=False):
+        '''
+        Executes a parameterized statement (e.g. INSERT INTO t VALUES (?, ?)) for every row,
+        batchSize rows per addBatch/executeBatch round-trip.
+
+        Args:
+            rows: an iterable of parameter sequences (may be a generator)
+            autoCommit: False: each batch is committed, and a failed batch is rolled back
+                        True : the driver commits every statement
+
+        Returns:
+            a list of (rows sent, rows updated) per batch
+        '''
+        jconn              = self.conn.jconn
+        previousAutoCommit = jconn.getAutoCommit()
+        jconn.setAutoCommit(autoCommit)
+        cursor      = self.conn.cursor()
+        batchCounts = []
+        rows        = iter(rows)
+        try:
+            while True:
+                batch = list(itertools.islice(rows, batchSize))
+                if not batch:
+                    break
+                with Profiler().phase('jdbc execute'):
+                    cursor.executemany(sql, batch)
+                    if not autoCommit:
+                        self.conn.commit()
+                batchCounts.append((len(batch), cursor.rowcount))
+                logging.debug("Batch %d: %d rows sent, %d rows updated" % (len(batchCounts), len(batch), cursor.rowcount))
+        except Exception:
+            if not autoCommit:
+                self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            jconn.setAutoCommit(previousAutoCommit)
+        return batchCounts
 
     def _commit(self):
         self.conn.commit()
@@ -173,5 +486,17 @@ class JDBC:
     def _getConnection(self):
         return self.conn
 
+    def hasOpenCursors(self):
+        return self.conn.has_open_cursors()
+
+    def _reset(self):
+        '''
+        Roll back an open transaction before the connection is given back to the pool
+        '''
+        jconn = self.conn.jconn
+        if not jconn.getAutoCommit():
+            jconn.rollback()
+            jconn.setAutoCommit(True)
+
     def _setAutoCommit(self, autoCommit):
         self.conn.jconn.setAutoCommit(autoCommit)
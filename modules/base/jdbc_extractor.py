@@ -0,0 +1,170 @@
+#!/usr/bin/env python2.7
+import io
+import logging
+import os.path
+import shutil
+import uuid
+
+from modules.base.constants   import *
+from modules.base.profiler    import Profiler
+import modules.base.run_metrics as run_metrics
+from modules.r10_jdbc.dbapi2  import LobStream
+
+class JDBCExtractor(object):
+    '''
+    Extracts a table through JDBC into a delimited file (extractor=jdbc_mysql or extractor=jdbc_teradata)
+
+    The rows are read with fetchmany(fetch_size) and written through a buffered writer,
+    so only one block of rows is held in memory. The values are cleaned in Python
+    the same way as the SQL of MySQL.createExtractSql does (except for the binary columns
+    other than binary(16), which the mysql command writes as raw bytes):
+        NULL                 -> null_string ('' by default)
+        \\0                   -> removed
+        tab, line feed, \\r   -> ' '
+        binary(16)           -> lowercase UUID with hyphens (BINARY columns of 16 bytes)
+        other binary columns -> hex digits (BINARY, VARBINARY, LONGVARBINARY and BLOB columns)
+        BIT/BOOLEAN          -> 1 or 0
+        DECIMAL/NUMERIC      -> all digits, without exponent (the cursor reads them as strings,
+                                whatever [FETCH] DECIMAL_MODE is)
+    The format of a column is decided once from its SQL type, not from its values.
+    The database object must implement _executeCursor(database, sql) and getExtractTableName(database, table)
+    (MySQL and TeradataDB).
+    '''
+    WRITE_BUFFER_SIZE = 1024 * 1024
+
+    # unicode.translate() table of the control characters
+    CONTROL_CHARACTERS = {0: None, 9: u' ', 10: u' ', 13: u' '}
+
+    # java.sql.Types of the columns which are written as hex digits: BINARY, VARBINARY, LONGVARBINARY, BLOB
+    BINARY_SQL_TYPES   = (-2, -3, -4, 2004)
+    SQL_TYPE_BINARY    = -2
+    # java.sql.Types of the columns which are written with all their digits: DECIMAL, NUMERIC
+    DECIMAL_SQL_TYPES  = (3, 2)
+
+    # Column formats
+    FORMAT_TEXT        = 'text'
+    FORMAT_BINARY      = 'binary'
+    FORMAT_UUID        = 'uuid'
+    FORMAT_DECIMAL     = 'decimal'
+
+    def __init__(self, database):
+        self.database = database
+
+    #####################
+    # Private Functions #
+    #####################
+    def _createSql(self, parameters):
+        tableName = self.database.getExtractTableName(parameters[DATABASE], parameters[TABLE])
+        columns   = '*'
+        if parameters.get(COLUMNS):
+            columns = ','.join([column.strip() for column in parameters[COLUMNS].split(',')])
+        if (not parameters.get(TARGET_DATE_COLUMN)):
+            logging.info("Extract in FULL mode, all records will be extracted.")
+            whereClause = ""
+        else:
+            dateColumn  = parameters[TARGET_DATE_COLUMN]
+            whereClause = "WHERE CAST(%s AS DATE) >= DATE '%s' AND CAST(%s AS DATE) <= DATE '%s'" % (dateColumn, parameters[START_DATE], dateColumn, parameters[END_DATE])
+        return "SELECT %s FROM %s %s" % (columns, tableName, whereClause)
+
+    def _getColumnFormats(self, cursor):
+        '''
+        Returns the format of each column of the result set, from its SQL type (Cursor._columnTypes)
+        '''
+        formats     = []
+        description = cursor.description
+        for (index, sqlType) in enumerate(cursor._columnTypes):
+            if sqlType == self.SQL_TYPE_BINARY and description[index][4] == 16:
+                # binary(16): written as a UUID, the same as MySQL.createExtractSql does
+                formats.append(self.FORMAT_UUID)
+            elif sqlType in self.BINARY_SQL_TYPES:
+                formats.append(self.FORMAT_BINARY)
+            elif sqlType in self.DECIMAL_SQL_TYPES:
+                formats.append(self.FORMAT_DECIMAL)
+            else:
+                formats.append(self.FORMAT_TEXT)
+        return formats
+
+    def _formatValue(self, value, nullString, columnFormat):
+        if value is None:
+            return nullString
+        if isinstance(value, bool):
+            # BIT(1)/BOOLEAN, the same as the mysql command writes them
+            return u'1' if value else u'0'
+        if columnFormat == self.FORMAT_DECIMAL:
+            return unicode(value)
+        if isinstance(value, float):
+            # repr() keeps all digits, str() rounds to 12
+            return unicode(repr(value))
+        if isinstance(value, LobStream):
+            value = value.read()
+        if columnFormat == self.FORMAT_UUID and len(value) == 16:
+            return unicode(uuid.UUID(bytes=value))
+        if columnFormat in (self.FORMAT_BINARY, self.FORMAT_UUID):
+            # BINARY/VARBINARY/BLOB columns are returned as str, even if their bytes happen to be UTF-8
+            return unicode(value.encode('hex'))
+        if isinstance(value, str):
+            value = value.decode('utf8')
+        elif not isinstance(value, unicode):
+            value = unicode(value)
+        return value.translate(self.CONTROL_CHARACTERS)
+
+    ####################
+    # Public Functions #
+    ####################
+    def writeQueryToFile(self, databaseKey, sql, outputFile, delimiter=DELIMETER_TAB, newline='\n', characterSet='utf8', nullString='', fetch=1000):
+        '''
+        Streams the result of the query into outputFile. Returns (rows, bytes) written
+        '''
+        delimiter  = delimiter.decode('utf8')
+        newline    = newline.decode('utf8')
+        nullString = nullString.decode('utf8')
+        formatValue = self._formatValue
+        rowCount    = 0
+        cursor      = self.database._executeCursor(databaseKey, sql, fetch=fetch, fetchSize=fetch)
+        try:
+            with io.open(outputFile, 'w', encoding=characterSet, buffering=self.WRITE_BUFFER_SIZE, newline='') as f:
+                if (cursor._rs is None):
+                    return (0, 0)
+                # DECIMAL/NUMERIC as their digits: a double keeps about 15 of them
+                cursor.set_decimal_mode('string')
+                columnFormats = self._getColumnFormats(cursor)
+                records = cursor.fetchmany(fetch)
+                while records:
+                    lines = []
+                    for record in records:
+                        lines.append(delimiter.join([formatValue(value, nullString, columnFormat) for (value, columnFormat) in zip(record, columnFormats)]))
+                    lines.append(u'')
+                    f.write(newline.join(lines))
+                    rowCount += len(records)
+                    records = cursor.fetchmany(fetch)
+        finally:
+            cursor.close()
+        return (rowCount, os.path.getsize(outputFile))
+
+    def extractToFile(self, parameters):
+        '''
+        Same interface as MySQL.extractToFile: extracts the table of a simpleExtract section
+        '''
+        parameters[OUTPUT_FILE] = os.path.join(parameters[TARGET_DIRECTORY], parameters[OUTPUT_FILENAME])
+        parameters[WORK_FILE]   = parameters[OUTPUT_FILE] + '_' + str(uuid.uuid4())
+        sql = self._createSql(parameters)
+        logging.info("Now extracting through JDBC...")
+        try:
+            with Profiler().phase('jdbc extract'):
+                (rowCount, byteCount) = self.writeQueryToFile(parameters[DATABASE], sql, parameters[WORK_FILE],
+                                                              parameters[DELIMITER].decode('string_escape'),
+                                                              parameters.get(NEWLINE, '\\n').decode('string_escape'),
+                                                              parameters[CHARACTER_SET],
+                                                              parameters.get(NULL_STRING, ''),
+                                                              parameters.get(FETCH_SIZE, 1000))
+        except Exception, e:
+            logging.error("Extract failed: %s" % (e))
+            if os.path.exists(parameters[WORK_FILE]):
+                os.unlink(parameters[WORK_FILE])
+            return RC_ERROR
+        run_metrics.add(METRIC_BYTES_WRITTEN, byteCount)
+        run_metrics.add(METRIC_ROWS_EXTRACTED, rowCount)
+        # Rename to target output file
+        shutil.move(parameters[WORK_FILE], parameters[OUTPUT_FILE])
+        logging.info("The extract file %s was created (%d rows)." % (parameters[OUTPUT_FILE], rowCount))
+        return RC_NO_ERROR
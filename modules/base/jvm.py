@@ -0,0 +1,173 @@
+#!/usr/bin/env python2.7
+import logging
+import os
+import threading
+import time
+
+from modules.base.config_snapshot import SnapshotConfigParser
+from modules.base.profiler        import Profiler
+import modules.base.etl_util as etl_util
+
+# Allow to have an external test_jdbc.cfg for local platform development
+PATH_JDBC_CFG = os.path.join(os.path.expanduser("~"), '.etl', 'jdbc.cfg')
+if not os.path.isfile(PATH_JDBC_CFG):
+    PATH_JDBC_CFG = os.path.join(etl_util.get_app_root_path(), 'conf', 'modules', 'jdbc.cfg')
+
+def readJdbcConfig():
+    '''
+    Returns the parsed jdbc.cfg. The file is only parsed again when it was changed (see ConfigSnapshot),
+    so the pool, [FETCH] and [STATEMENT_STATS] settings follow the file; the [JVM] settings are kept
+    by JVMManager, they can not be changed after the start anyway
+    '''
+    config_parser = SnapshotConfigParser()
+    config_parser.read(PATH_JDBC_CFG)
+    return config_parser
+
+def _toAbsolutePath(path):
+    # If the path starts with a / it will be treated as a absolute path
+    if path and path[0] != '/':
+        return os.path.join(etl_util.get_app_root_path(), path)
+    return path
+
+class JVMManagerFactory(type):
+    '''
+    '''
+    _instances = {}
+    def __call__(cls, *args, **kwargs):
+        if cls not in cls._instances:
+            cls._instances[cls] = super(JVMManagerFactory, cls).__call__(*args, **kwargs)
+        return cls._instances[cls]
+
+class JVMManager(object):
+    '''
+    Starts the JVM of the process (once) with the options of [JVM] in jdbc.cfg
+
+        java_home, classpath  : the JRE and the JDBC driver jars
+        initial_heap, max_heap: -Xms/-Xmx, e.g. 64m
+        gc                    : one garbage collector option, e.g. -XX:+UseSerialGC
+        options               : more JVM options, separated by spaces
+        system_properties     : <name>=<value> pairs separated by spaces, passed as -D<name>=<value>
+        cds_archive           : class data sharing archive of the driver classes (JDK 10 or later),
+                                created by etl.py --action=createJvmArchive and used with -Xshare:auto
+        drivers               : the driver classes which are loaded into the archive
+
+    The JVM is started by the first JDBC connection, or at the start of etl.py --serve.
+    '''
+    __metaclass__ = JVMManagerFactory
+
+    def __init__(self):
+        self._lock      = threading.Lock()
+        self._settings  = None
+        self.startTime  = None
+
+    #####################
+    # Private Functions #
+    #####################
+    def _readSettings(self):
+        # read once per process: the JVM can only be started once
+        if self._settings is not None:
+            return self._settings
+        config = readJdbcConfig()
+        def get(option, default=''):
+            if config.has_option('JVM', option):
+                return config.get('JVM', option).strip()
+            return default
+        settings = {}
+        settings['java_home']         = _toAbsolutePath(get('java_home'))
+        settings['classpath']         = get('classpath')
+        settings['initial_heap']      = get('initial_heap')
+        settings['max_heap']          = get('max_heap')
+        settings['gc']                = get('gc')
+        settings['options']           = get('options').split()
+        settings['system_properties'] = get('system_properties').split()
+        settings['cds_archive']       = _toAbsolutePath(get('cds_archive'))
+        settings['drivers']           = [i.strip() for i in get('drivers').split(',') if i.strip()]
+        self._settings = settings
+        return settings
+
+    def _getJVMPath(self):
+        import jpype
+        os.environ['JAVA_HOME'] = self._readSettings()['java_home']
+        try:
+            return jpype.getDefaultJVMPath()
+        except TypeError:
+            logging.error("failed to get default JVM path")
+            raise
+
+    ####################
+    # Public Functions #
+    ####################
+    def getArgs(self, classDataSharing=True):
+        '''
+        Returns the list of JVM options
+        '''
+        settings = self._readSettings()
+        args = ['-Djava.class.path=%s' % (settings['classpath'])]
+        if settings['initial_heap']:
+            args.append('-Xms%s' % (settings['initial_heap']))
+        if settings['max_heap']:
+            args.append('-Xmx%s' % (settings['max_heap']))
+        if settings['gc']:
+            args.append(settings['gc'])
+        args += settings['options']
+        args += ['-D%s' % (i) for i in settings['system_properties']]
+        if classDataSharing and settings['cds_archive']:
+            if os.path.isfile(settings['cds_archive']):
+                args += ['-Xshare:auto', '-XX:SharedArchiveFile=%s' % (settings['cds_archive'])]
+            else:
+                logging.debug("The CDS archive '%s' does not exist (etl.py --action=createJvmArchive creates it)." % (settings['cds_archive']))
+        return args
+
+    def isStarted(self):
+        import jpype
+        return jpype.isJVMStarted()
+
+    def start(self, extraArgs=None, classDataSharing=True):
+        '''
+        Start the JVM if it is not running yet. Returns True if it was started by this call
+        '''
+        # jpype is loaded on the first connection, so actions without a database do not pay for it
+        import jpype
+        with self._lock:
+            if jpype.isJVMStarted():
+                return False
+            jvmPath = self._getJVMPath()
+            args    = self.getArgs(classDataSharing) + (extraArgs or [])
+            logging.debug("Starting the JVM %s with %s" % (jvmPath, ' '.join(args)))
+            start = time.time()
+            with Profiler().phase('jvm start'):
+                jpype.startJVM(jvmPath, *args)
+            self.startTime = time.time() - start
+            logging.info("The JVM was started in %.3f seconds." % (self.startTime))
+            return True
+
+    def writeClassList(self, classListFile):
+        '''
+        Start the JVM with -XX:DumpLoadedClassList, load the driver classes and shut the JVM down.
+        The JVM can not be started again in this process afterwards
+        '''
+        import jpype
+        settings = self._readSettings()
+        if not self.start(['-Xshare:off', '-XX:DumpLoadedClassList=%s' % (classListFile)], classDataSharing=False):
+            raise RuntimeError("The JVM is already running, the class list can only be written by a new process")
+        jpype.JClass('java.sql.DriverManager')
+        for driver in settings['drivers']:
+            logging.debug("Loading %s" % (driver))
+            jpype.JClass(driver)
+        # the class list is complete when the JVM has exited
+        jpype.shutdownJVM()
+
+    def getArchiveDumpCommand(self, classListFile):
+        '''
+        Returns the java command which creates the CDS archive from the class list (JDK 10 or later)
+        '''
+        settings = self._readSettings()
+        if not settings['cds_archive']:
+            raise ValueError("cds_archive is not set in [JVM] of %s" % (PATH_JDBC_CFG))
+        java = os.path.join(settings['java_home'], 'bin', 'java')
+        args = [java, '-Xshare:dump', '-XX:SharedClassListFile=%s' % (classListFile),
+                '-XX:SharedArchiveFile=%s' % (settings['cds_archive']), '-cp', settings['classpath']] + settings['options']
+        return ' '.join(args)
+
+    def getArchiveFile(self):
+        return self._readSettings()['cds_archive']
@@ -0,0 +1,51 @@
+#!/usr/bin/env python2.7
+import logging
+import threading
+
+# Values which belong to the work the current thread is doing (e.g. the section being processed)
+_context = threading.local()
+
+def getContext(key, default=None):
+    '''
+    Get a value of the current thread's context
+    '''
+    return _values().get(key, default)
+
+def setContext(key, value):
+    '''
+    Set a value in the current thread's context. None removes the value
+    '''
+    if value is None:
+        _values().pop(key, None)
+    else:
+        _values()[key] = value
+
+def copyContext():
+    '''
+    Returns a copy of the current thread's context, to be handed over to a worker thread
+    '''
+    return dict(_values())
+
+def restoreContext(values):
+    '''
+    Replace the current thread's context with the values returned by copyContext()
+    '''
+    _context.values = dict(values)
+
+def _values():
+    if not hasattr(_context, 'values'):
+        _context.values = {}
+    return _context.values
+
+class ContextFilter(logging.Filter):
+    """
+    This class adds the section of the current thread to each log record.
+    Use %(section)s in the format string; it is '[<section>] ' while a section is processed and '' otherwise.
+    """
+    def filter(self, record):
+        section = getContext('section')
+        record.section = "[%s] " % (section) if section else ''
+        # blank separator lines make no sense between the records of concurrent sections
+        if section and isinstance(record.msg, basestring):
+            record.msg = record.msg.lstrip('\n')
+        return True
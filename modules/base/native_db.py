@@ -0,0 +1,418 @@
+#!/usr/bin/env python2.7
+import datetime
+import decimal
+import importlib
+import logging
+import re
+import time
+import weakref
+
+from modules.base.constants        import *
+from modules.base.exceptions       import NativeDriverMissing
+from modules.base.jdbc             import JDBCFactory, enableStatementStats
+from modules.base.jvm              import readJdbcConfig
+from modules.base.profiler         import Profiler
+from modules.base.statement_stats  import StatementStats
+import modules.r10_jdbc as jaydebeapi
+
+JDBC_URL_PATTERN = re.compile(r'^jdbc:(\w+)://([^/:?,]+)(?::(\d+))?/?([^?]*)')
+
+# java.sql.Types of the columns which NativeCursor._columnTypes reports (the other columns are None)
+SQL_TYPE_BIT            = -7
+SQL_TYPE_BINARY         = -2
+SQL_TYPE_VARBINARY      = -3
+SQL_TYPE_LONGVARBINARY  = -4
+SQL_TYPE_DECIMAL        = 3
+
+# String literals and quoted names, ? markers and % characters of a statement, for the format paramstyle
+QMARK_PATTERN    = re.compile(r"('(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"|`[^`]*`)|(\?)|(%)")
+
+def parseJdbcUrl(url):
+    '''
+    Returns {'host', 'port', 'database'} of a JDBC URL
+        jdbc:mysql://<host>:<port>/<schema>?<options>
+        jdbc:teradata://<host>/CHARSET=UTF8,DATABASE=<database>,DBS_PORT=<port>
+    '''
+    match = JDBC_URL_PATTERN.match(url)
+    if match is None:
+        raise ValueError("Unsupported JDBC URL '%s'" % (url))
+    (subprotocol, host, port, path) = match.groups()
+    database = path or None
+    if '=' in path:
+        # Teradata: the connection parameters follow the host
+        parameters = dict([parameter.split('=', 1) for parameter in path.split(',') if '=' in parameter])
+        database   = parameters.get('DATABASE')
+        port       = port or parameters.get('DBS_PORT')
+    return {'host': host, 'port': port, 'database': database}
+
+def _toQmarkFormat(sql):
+    def replace(match):
+        if match.group(1):
+            return match.group(1).replace('%', '%%')
+        if match.group(2):
+            return '%s'
+        return '%%'
+    return QMARK_PATTERN.sub(replace, sql)
+
+class NativeDriver(object):
+    '''
+    A DB-API 2.0 driver module which can be used instead of JDBC (driver_backend=<name>)
+    The module is imported by the first connection, so it is only needed where it is configured.
+    '''
+    moduleName   = None
+    isolationSql = None
+
+    def __init__(self, name):
+        self.name    = name
+        self._module = None
+
+    def load(self):
+        if self._module is None:
+            try:
+                self._module = importlib.import_module(self.moduleName)
+            except ImportError, e:
+                raise NativeDriverMissing("driver_backend=%s needs the Python module %s (%s)" % (self.name, self.moduleName, e))
+        return self._module
+
+    def getParamstyle(self):
+        return self.load().paramstyle
+
+    def connect(self, location, user, password):
+        raise NotImplementedError
+
+    def cursor(self, conn, streaming=False):
+        '''
+        streaming: the rows are read one by one from the server instead of being buffered (fetch_strategy=stream)
+        '''
+        return conn.cursor()
+
+    def getColumnTypes(self, cursor):
+        '''
+        Returns the java.sql.Types of the binary columns of the executed statement (None for the other columns),
+        with the DB-API BINARY type object of the module
+        '''
+        binary = getattr(self.load(), 'BINARY', None)
+        columnTypes = []
+        for column in cursor.description:
+            if binary is not None and column[1] == binary:
+                columnTypes.append(SQL_TYPE_LONGVARBINARY)
+            else:
+                columnTypes.append(None)
+        return columnTypes
+
+class MySQLdbDriver(NativeDriver):
+    moduleName   = 'MySQLdb'
+    isolationSql = 'SET SESSION TRANSACTION ISOLATION LEVEL %s'
+
+    # FIELD_TYPE of the MySQL protocol -> java.sql.Types of the binary character set (as Connector/J reports them)
+    BINARY_FIELD_TYPES = {254: SQL_TYPE_BINARY, 253: SQL_TYPE_VARBINARY, 15: SQL_TYPE_VARBINARY,
+                          249: SQL_TYPE_LONGVARBINARY, 250: SQL_TYPE_LONGVARBINARY, 251: SQL_TYPE_LONGVARBINARY, 252: SQL_TYPE_LONGVARBINARY}
+    FIELD_TYPE_BIT     = 16
+    # FIELD_TYPE DECIMAL and NEWDECIMAL
+    DECIMAL_FIELD_TYPES = (0, 246)
+    BINARY_FLAG        = 128
+
+    def _isBinary(self, cursor, index):
+        # MySQLdb returns the columns with BINARY_FLAG as str
+        return bool(cursor.description_flags[index] & self.BINARY_FLAG)
+
+    def connect(self, location, user, password):
+        module = self.load()
+        conn = module.connect(host=location['host'], port=int(location['port'] or 3306), user=user, passwd=password,
+                              db=location['database'] or '', charset='utf8', use_unicode=True)
+        # The same as Connector/J
+        conn.autocommit(True)
+        return conn
+
+    def cursor(self, conn, streaming=False):
+        if streaming:
+            cursors = importlib.import_module('%s.cursors' % (self.moduleName))
+            return conn.cursor(cursors.SSCursor)
+        return conn.cursor()
+
+    def getColumnTypes(self, cursor):
+        columnTypes = []
+        for (index, column) in enumerate(cursor.description):
+            if column[1] == self.FIELD_TYPE_BIT:
+                columnTypes.append(SQL_TYPE_BIT)
+            elif column[1] in self.DECIMAL_FIELD_TYPES:
+                columnTypes.append(SQL_TYPE_DECIMAL)
+            elif column[1] in self.BINARY_FIELD_TYPES and self._isBinary(cursor, index):
+                columnTypes.append(self.BINARY_FIELD_TYPES[column[1]])
+            else:
+                columnTypes.append(None)
+        return columnTypes
+
+class PyMySQLDriver(MySQLdbDriver):
+    moduleName   = 'pymysql'
+
+    # character set number of binary strings
+    BINARY_CHARSET = 63
+
+    def _isBinary(self, cursor, index):
+        return cursor._result.fields[index].charsetnr == self.BINARY_CHARSET
+
+    def connect(self, location, user, password):
+        module = self.load()
+        return module.connect(host=location['host'], port=int(location['port'] or 3306), user=user, password=password,
+                              database=location['database'], charset='utf8', use_unicode=True, autocommit=True)
+
+class TeradataDriver(NativeDriver):
+    moduleName   = 'teradata.tdodbc'
+    isolationSql = 'SET SESSION CHARACTERISTICS AS TRANSACTION ISOLATION LEVEL %s'
+
+    def connect(self, location, user, password):
+        module     = self.load()
+        parameters = {'system': location['host'], 'username': user, 'password': password,
+                      'autoCommit': True, 'transactionMode': 'TERA', 'charset': 'UTF8'}
+        if location['database']:
+            parameters['database'] = location['database']
+        return module.connect(**parameters)
+
+NATIVE_DRIVERS = {
+    DRIVER_BACKEND_MYSQLDB : MySQLdbDriver(DRIVER_BACKEND_MYSQLDB),
+    DRIVER_BACKEND_PYMYSQL : PyMySQLDriver(DRIVER_BACKEND_PYMYSQL),
+    DRIVER_BACKEND_TERADATA: TeradataDriver(DRIVER_BACKEND_TERADATA),
+}
+
+def getNativeDriver(name):
+    if name not in NATIVE_DRIVERS:
+        raise ValueError("Unknown driver_backend '%s' (%s)" % (name, ', '.join([DRIVER_BACKEND_JDBC] + sorted(NATIVE_DRIVERS))))
+    return NATIVE_DRIVERS[name]
+
+def _decimalToString(value):
+    return format(value, 'f')
+
+# Converters of decimal.Decimal per decimal mode (see r10_jdbc.dbapi2.set_decimal_mode)
+DECIMAL_CONVERTERS = {'double': float, 'decimal': None, 'string': _decimalToString}
+
+class NativeCursor(object):
+    '''
+    A cursor of a native driver which returns the same values as r10_jdbc.Cursor:
+        rows               -> Rows (read by index or column name)
+        DATETIME/TIMESTAMP -> 'YYYY-MM-DD HH:MM:SS[.ffffff]'
+        DATE               -> 'YYYY-MM-DD'
+        DECIMAL/NUMERIC    -> float, decimal.Decimal or str ([FETCH] DECIMAL_MODE in jdbc.cfg)
+        BIT(1)             -> bool
+    _columnTypes holds the java.sql.Types of the binary, BIT and DECIMAL columns (see NativeDriver.getColumnTypes).
+    fetchall_columns returns lists (no NumPy arrays). The statements are reported to the StatementStats.
+    '''
+    def __init__(self, cursor, driver):
+        self._cursor      = cursor
+        self._driver      = driver
+        self._paramstyle  = driver.getParamstyle()
+        self._rs          = None
+        self._rowClass    = None
+        self._columnNames = []
+        self._columnTypes = []
+        # indexes of the BIT(1) columns, which the drivers return as one byte
+        self._bitColumns  = []
+        self._converters  = {datetime.datetime: str, datetime.date: str, bytearray: str}
+        self.set_decimal_mode(jaydebeapi.get_decimal_mode())
+        self._countChars  = StatementStats().countChars
+        self._operation   = None
+        self._closed      = False
+        self.description  = None
+        self.rowcount     = -1
+        self.lastrowid    = None
+
+    #####################
+    # Private Functions #
+    #####################
+    def _report(self):
+        operation = self._operation
+        self._operation = None
+        if operation is not None:
+            StatementStats().record(operation, 0.0, self._executeTime, self._fetchTime, self._rowsFetched, self._charsFetched)
+
+    def _fetchRows(self, fetch):
+        start = time.time()
+        try:
+            rows = fetch()
+        finally:
+            self._fetchTime += time.time() - start
+        converters = self._converters
+        rowClass   = self._rowClass
+        countChars = self._countChars
+        result     = []
+        chars      = 0
+        for row in rows:
+            values = []
+            for v in row:
+                converter = converters.get(type(v))
+                if converter is not None:
+                    v = converter(v)
+                if countChars and isinstance(v, basestring):
+                    chars += len(v)
+                values.append(v)
+            for index in self._bitColumns:
+                if values[index] is not None:
+                    values[index] = values[index] != '\x00'
+            result.append(rowClass(values))
+        self._rowsFetched  += len(result)
+        self._charsFetched += chars
+        return result
+
+    ####################
+    # Public Functions #
+    ####################
+    def execute(self, operation, parameters=None):
+        self._report()
+        self._operation    = operation
+        self._executeTime  = 0.0
+        self._fetchTime    = 0.0
+        self._rowsFetched  = 0
+        self._charsFetched = 0
+        sql = operation
+        if parameters is not None and self._paramstyle in ('format', 'pyformat'):
+            # The statements are written for JDBC, with ? markers
+            sql = _toQmarkFormat(operation)
+        start = time.time()
+        try:
+            if parameters is None:
+                self._cursor.execute(sql)
+            else:
+                self._cursor.execute(sql, tuple(parameters))
+        finally:
+            self._executeTime = time.time() - start
+        self.rowcount  = self._cursor.rowcount
+        self.lastrowid = getattr(self._cursor, 'lastrowid', None)
+        if self._cursor.description:
+            self.description  = self._cursor.description
+            self._columnNames = [column[0] for column in self.description]
+            self._rowClass    = jaydebeapi.row_class(self._columnNames)
+            self._columnTypes = self._driver.getColumnTypes(self._cursor)
+            self._bitColumns  = [index for (index, sqlType) in enumerate(self._columnTypes) if sqlType == SQL_TYPE_BIT and self.description[index][4] == 1]
+            self._rs          = self._cursor
+        else:
+            self.description  = None
+            self._columnTypes = []
+            self._bitColumns  = []
+            self._rs          = None
+
+    def fetchone(self):
+        def fetch():
+            row = self._cursor.fetchone()
+            if row is None:
+                return []
+            return [row]
+        rows = self._fetchRows(fetch)
+        if rows:
+            return rows[0]
+        return None
+
+    def fetchmany(self, size=None, convertToHash=False):
+        if size is None:
+            size = self.arraysize
+        rows = self._fetchRows(lambda: self._cursor.fetchmany(size))
+        if convertToHash:
+            return [row.as_dict() for row in rows]
+        return rows
+
+    def fetchall(self, convertToHash=False):
+        rows = self._fetchRows(self._cursor.fetchall)
+        if convertToHash:
+            return [row.as_dict() for row in rows]
+        return rows
+
+    def fetchall_columns(self, size=None, convertToHash=False):
+        rows = self.fetchall()
+        columns = [list(column) for column in zip(*rows)] if rows else [[] for name in self._columnNames]
+        if convertToHash:
+            return dict(zip(self._columnNames, columns))
+        return columns
+
+    def set_decimal_mode(self, mode):
+        '''
+        How the DECIMAL/NUMERIC values of this cursor are returned, whatever the mode of the process is
+        '''
+        if mode not in DECIMAL_CONVERTERS:
+            raise ValueError("Unknown decimal mode '%s' (%s)" % (mode, ', '.join(sorted(DECIMAL_CONVERTERS))))
+        if DECIMAL_CONVERTERS[mode] is None:
+            self._converters.pop(decimal.Decimal, None)
+        else:
+            self._converters[decimal.Decimal] = DECIMAL_CONVERTERS[mode]
+
+    def close(self):
+        self._report()
+        self._rs     = None
+        self._closed = True
+        self._cursor.close()
+
+    arraysize = 1
+
+class NativeDB(object):
+    '''
+    A connection of a native Python DB-API 2.0 driver with the interface of JDBC (execute, _execute,
+    _commit, _rollback, _close), selected with driver_backend=<name> in the database section:
+        mysqldb : MySQLdb (C client)
+        pymysql : PyMySQL (pure Python)
+        teradata: teradata.tdodbc (Teradata ODBC driver)
+
+    No JVM is started and the values are read without a JNI call per cell. The host, port and database
+    are taken from the JDBC URL (see parseJdbcUrl). NativeDB objects are borrowed per thread from their
+    own ConnectionPool, like JDBC objects:
+        NativeDB(connect, driver backend, user, password, isolation)
+        NativeDB()              give back the connections of the current thread
+        NativeDB.closePool()    close all idle connections
+    The isolation is set with the same SQL as JDBC does.
+    '''
+    __metaclass__ = JDBCFactory
+    def __init__(self, connect, driver, user, password, isolation=''):
+        config_parser = readJdbcConfig()
+        enableStatementStats(config_parser)
+        if config_parser.has_option('FETCH', 'DECIMAL_MODE') and config_parser.get('FETCH', 'DECIMAL_MODE'):
+            jaydebeapi.set_decimal_mode(config_parser.get('FETCH', 'DECIMAL_MODE'))
+        self.driver = getNativeDriver(driver)
+        location    = parseJdbcUrl(connect)
+        logging.debug("Connecting with %s to %s:%s/%s with user %s" % (driver, location['host'], location['port'], location['database'], user))
+        with Profiler().phase('native connect'):
+            self.conn = self.driver.connect(location, user, password)
+        self._cursors = weakref.WeakSet()
+
+        #set isolation level
+        if isolation!='':
+            self._execute(self.driver.isolationSql % isolation).close()
+
+    #####################
+    # Private Functions #
+    #####################
+    def _execute(self, sql, parameters=None):
+        return self.execute(sql, parameters)
+
+    ####################
+    # Public Functions #
+    ####################
+    def execute(self, sql, parameters=None, fetchSize=None):
+        '''
+        fetchSize: MYSQL_STREAMING_FETCH_SIZE streams the rows (fetch_strategy=stream), other sizes are the fetchmany() default
+        '''
+        streaming = fetchSize == MYSQL_STREAMING_FETCH_SIZE
+        curs = NativeCursor(self.driver.cursor(self.conn, streaming), self.driver)
+        self._cursors.add(curs)
+        if fetchSize > 0:
+            curs.arraysize = fetchSize
+        with Profiler().phase('native execute'):
+            curs.execute(sql, parameters)
+        return curs
+
+    def _commit(self):
+        self.conn.commit()
+
+    def _rollback(self):
+        self.conn.rollback()
+
+    def _close(self):
+        self.conn.close()
+
+    def _getConnection(self):
+        return self.conn
+
+    def hasOpenCursors(self):
+        return len([curs for curs in self._cursors if not curs._closed]) > 0
+
+    def _reset(self):
+        '''
+        The connections are in autocommit mode, a rollback only ends a transaction started with BEGIN
+        '''
+        self.conn.rollback()
@@ -1,7 +1,9 @@
-from ConfigParser             import SafeConfigParser
 from optparse                 import OptionParser
 import sys
 
+from modules.base.config_snapshot import SnapshotConfigParser
+import modules.base.log_context as log_context
+
 class OptionsFactory(type):
     '''
     '''
@@ -12,40 +14,75 @@ class OptionsFactory(type):
         return cls._instances[cls]
 
 class Options(object):
+    '''
+    Command line options of etl.py
+
+    The options can be replaced for the current thread (and the worker threads it starts) with bind(),
+    e.g. the etl.py --serve daemon runs every request with the options sent by the client.
+    '''
     __metaclass__ = OptionsFactory
     def __init__(self):
+        parser  = self._createParser()
+        (options, args) = parser.parse_args()
+        self._options   = vars(options)
+
+    #######################
+    #  Private Functions  #
+    #######################
+    def _createParser(self):
         parser  = OptionParser()
-        self.config  = SafeConfigParser()
+        self.config  = SnapshotConfigParser()
         section      = 'option_parser_options'
 
         # Read the global configuration file
+        # Format: <name>_option=--<name>|<help message>[|<optparse action, e.g. store_true>]
         self.config.read('./conf/optionparser_options.cfg')
         options = self.config.options(section)
         for opt in options:
             optValue           = self.config.get(section, opt)
-            (longOpt, helpMsg) = optValue.split('|')
-            parser.add_option(longOpt, help=helpMsg)
-        (options, args) = parser.parse_args()
-        self._options   = vars(options)
+            optParts           = optValue.split('|')
+            (longOpt, helpMsg) = optParts[0:2]
+            if len(optParts) > 2:
+                parser.add_option(longOpt, help=helpMsg, action=optParts[2])
+            else:
+                parser.add_option(longOpt, help=helpMsg)
+        return parser
 
-    #######################
-    #  Private Functions  #
-    #######################
+    def _getOptions(self):
+        return log_context.getContext('options', self._options)
 
     ######################
     #  Public Functions  #
     ######################
+    def parse(self, args):
+        '''
+        Parse a list of command line arguments and return the options as a dictionary.
+        Raises ValueError if the arguments are invalid
+        '''
+        try:
+            (options, args) = self._createParser().parse_args(args)
+        except SystemExit:
+            raise ValueError("Invalid command line arguments: %s" % (args))
+        return vars(options)
+
+    def bind(self, options):
+        '''
+        Use the options dictionary for the current thread (and the worker threads it starts). None restores the command line options
+        '''
+        log_context.setContext('options', options)
+
     def get(self,optKey):
         optVal = None
-        if optKey in self._options.keys():
-           optVal = self._options[optKey]
+        options = self._getOptions()
+        if optKey in options:
+           optVal = options[optKey]
         return optVal
 
     def hasKey(self, optKey):
-        if optKey in self._options.keys():
+        if optKey in self._getOptions():
            return True
         return False
 
     def set(self, optKey, optVal):
-        self._options[optKey] = optVal
+        self._getOptions()[optKey] = optVal
         return True
@@ -0,0 +1,274 @@
+#!/usr/bin/env python2.7
+import Queue
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from modules.base.exceptions  import QueryTimeout
+import modules.base.log_context as log_context
+
+def releaseThreadConnections():
+    '''
+    Give back the JDBC connections of the current thread to the pool, so other threads can reuse them
+    '''
+    jdbcModule = sys.modules.get('modules.base.jdbc')
+    if jdbcModule is None:
+        return
+    try:
+        jdbcModule.JDBC()
+        nativeModule = sys.modules.get('modules.base.native_db')
+        if nativeModule is not None:
+            nativeModule.NativeDB()
+    except Exception, e:
+        logging.error("Error happened when giving back the JDBC connections of the thread: %s" % (e))
+
+def releaseUnusedThreadConnections():
+    '''
+    Give back the connections of the current thread which have no open cursor, e.g. before it waits for
+    the QueryExecutor, whose workers borrow from the same pools
+    '''
+    for (moduleName, className) in (('modules.base.jdbc', 'JDBC'), ('modules.base.native_db', 'NativeDB')):
+        module = sys.modules.get(moduleName)
+        if module is None:
+            continue
+        try:
+            getattr(module, className).releaseUnused()
+        except Exception, e:
+            logging.error("Error happened when giving back the unused connections of the thread: %s" % (e))
+
+def releaseThreadResources():
+    '''
+    Give back the JDBC connections of the current thread and detach it from the JVM.
+    Must be called by every worker thread before it ends, because JDBC connections are borrowed per thread.
+    '''
+    if sys.modules.get('modules.base.jdbc') is None:
+        return
+    releaseThreadConnections()
+    jpype = sys.modules.get('jpype')
+    if jpype is not None and jpype.isJVMStarted() and jpype.isThreadAttachedToJVM():
+        jpype.detachThreadFromJVM()
+
+def closeAllConnections():
+    '''
+    Stop the QueryExecutor, give back the JDBC connections of the current thread and close all idle connections of the pool
+    '''
+    QueryExecutor.shutdown()
+    jdbcModule = sys.modules.get('modules.base.jdbc')
+    if jdbcModule is None:
+        return
+    jdbcModule.JDBC.closePool()
+    nativeModule = sys.modules.get('modules.base.native_db')
+    if nativeModule is not None:
+        nativeModule.NativeDB.closePool()
+
+class Future(object):
+    '''
+    The result of a call submitted to the QueryExecutor
+    '''
+    def __init__(self):
+        self._done    = threading.Event()
+        self._result  = None
+        self._excInfo = None
+
+    def _setResult(self, result):
+        self._result = result
+        self._done.set()
+
+    def _setException(self, excInfo):
+        self._excInfo = excInfo
+        self._done.set()
+
+    def done(self):
+        return self._done.isSet()
+
+    def wait(self, timeout=None):
+        '''
+        Wait until the call has finished. Returns False if the timeout has expired
+
+        The connections of the waiting thread without an open cursor are given back to the pool first,
+        otherwise parallel sections which wait here could hold all MAX_CONNECTIONS the workers need.
+        '''
+        if not self._done.isSet():
+            releaseUnusedThreadConnections()
+        # wait with a timeout, so that KeyboardInterrupt can still be handled by the waiting thread
+        start = time.time()
+        while not self._done.isSet():
+            if timeout is not None and time.time() - start >= timeout:
+                return False
+            self._done.wait(1 if timeout is None else min(1, timeout))
+        return True
+
+    def exception(self, timeout=None):
+        if not self.wait(timeout):
+            raise QueryTimeout("The call has not finished within %s seconds" % (timeout))
+        return self._excInfo[1] if self._excInfo else None
+
+    def result(self, timeout=None):
+        '''
+        The return value of the call. The exception of the call is raised again (with its traceback)
+        '''
+        if not self.wait(timeout):
+            raise QueryTimeout("The call has not finished within %s seconds" % (timeout))
+        if self._excInfo:
+            (excType, excValue, excTraceback) = self._excInfo
+            raise excType, excValue, excTraceback
+        return self._result
+
+class QueryExecutor(object):
+    '''
+    A bounded pool of worker threads which run calls (e.g. queries) concurrently and return Futures
+
+    Usage:
+        futures = [QueryExecutor(4).submit(db.getTableDefinition, schema, table) for table in tables]
+        definitions = gather(futures)
+
+    The pool is created by the first QueryExecutor(workers) call and shared by the whole process.
+    Each worker thread is attached to the JVM once and borrows its own JDBC connections (see JDBCFactory);
+    they are given back to the pool after each call. The context of the submitting thread (section, metrics)
+    is copied to the call. A call submitted by a worker thread runs at once in that thread, so waiting for
+    futures inside a submitted call can not block all workers.
+    '''
+    _instance = None
+    _lock     = threading.Lock()
+
+    def __new__(cls, workers=4):
+        with cls._lock:
+            if cls._instance is None:
+                instance = object.__new__(cls)
+                instance._start(workers)
+                cls._instance = instance
+            return cls._instance
+
+    def __init__(self, workers=4):
+        pass
+
+    #####################
+    # Private Functions #
+    #####################
+    def _start(self, workers):
+        self.workers  = workers
+        self._tasks   = Queue.Queue()
+        self._threads = []
+        for i in xrange(workers):
+            worker = threading.Thread(target=self._work, name="query-%s" % (i + 1))
+            worker.daemon = True
+            worker.start()
+            self._threads.append(worker)
+
+    def _run(self, future, context, func, args, kwargs):
+        log_context.restoreContext(context)
+        try:
+            future._setResult(func(*args, **kwargs))
+        except Exception:
+            future._setException(sys.exc_info())
+
+    def _work(self):
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+                try:
+                    self._run(*task)
+                finally:
+                    # the next call may be run by another worker with the same connections
+                    releaseThreadConnections()
+                    log_context.restoreContext({})
+        finally:
+            releaseThreadResources()
+
+    ####################
+    # Public Functions #
+    ####################
+    def submit(self, func, *args, **kwargs):
+        '''
+        Call func(*args, **kwargs) in a worker thread and return a Future of its result
+        '''
+        future = Future()
+        if threading.current_thread() in self._threads:
+            self._run(future, log_context.copyContext(), func, args, kwargs)
+        else:
+            self._tasks.put((future, log_context.copyContext(), func, args, kwargs))
+        return future
+
+    @classmethod
+    def shutdown(cls):
+        '''
+        Stop the worker threads after the submitted calls have finished
+        '''
+        with cls._lock:
+            instance      = cls._instance
+            cls._instance = None
+        if instance is None:
+            return
+        for worker in instance._threads:
+            instance._tasks.put(None)
+        for worker in instance._threads:
+            while worker.isAlive():
+                worker.join(1)
+
+def gather(futures, timeout=None):
+    '''
+    Wait for all futures and return their results in the order of futures.
+    If a call has raised an exception, the first one is raised again after all calls have finished
+    '''
+    start = time.time()
+    for future in futures:
+        remaining = None if timeout is None else max(0, timeout - (time.time() - start))
+        if not future.wait(remaining):
+            raise QueryTimeout("The calls have not finished within %s seconds" % (timeout))
+    for future in futures:
+        if future._excInfo:
+            logging.error("".join(traceback.format_exception(*future._excInfo)))
+    return [future.result() for future in futures]
+
+def runInParallel(func, items, parallelism):
+    '''
+    Call func(item) for each item using <parallelism> worker threads and return the results in the order of items.
+    The context of the calling thread (see log_context) is copied to the worker threads.
+    If func raises an exception, no more items are started and the first exception is raised again
+    after all running calls have finished.
+    '''
+    context  = log_context.copyContext()
+    tasks    = Queue.Queue()
+    results  = [None] * len(items)
+    errors   = []
+    for (index, item) in enumerate(items):
+        tasks.put((index, item))
+
+    def _worker():
+        log_context.restoreContext(context)
+        try:
+            while not errors:
+                try:
+                    (index, item) = tasks.get_nowait()
+                except Queue.Empty:
+                    break
+                try:
+                    results[index] = func(item)
+                except Exception:
+                    logging.error(traceback.format_exc())
+                    errors.append(sys.exc_info())
+                finally:
+                    # the next item may be processed by another worker with the same connections
+                    releaseThreadConnections()
+        finally:
+            releaseThreadResources()
+
+    workers = []
+    for i in xrange(min(parallelism, len(items))):
+        worker = threading.Thread(target=_worker, name="worker-%s" % (i + 1))
+        worker.daemon = True
+        worker.start()
+        workers.append(worker)
+    for worker in workers:
+        # join with a timeout, so that KeyboardInterrupt can still be handled by the main thread
+        while worker.isAlive():
+            worker.join(1)
+
+    if errors:
+        (excType, excValue, excTraceback) = errors[0]
+        raise excType, excValue, excTraceback
+    return results
@@ -0,0 +1,105 @@
+import logging
+
+from modules.base.config_snapshot import SnapshotConfigParser
+from modules.base.constants   import *
+from modules.base.etl_base    import EtlBase
+from modules.base.exceptions  import FileConfigMissing,MandatoryOptionMissing
+
+class Pipeline(EtlBase):
+    '''
+    Runs several actions one after another in the same process
+
+    USAGE: etl.py --pipeline=<pipeline>
+    The steps are the sections of conf/pipelines/<pipeline>.cfg, in the order they are written in the file.
+    Every step needs the option 'action'. All other options of a step (cfg, section, mode, ...) are used
+    like command line options while the step is running.
+    All steps share the Options, Environment and JDBC objects, so the JVM is started and each
+    database logon is done only once for the whole pipeline.
+    '''
+    def __init__(self, registry):
+        super(Pipeline, self).__init__()
+        self.registry = registry
+
+    #####################
+    # Private Functions #
+    #####################
+    def _readSteps(self, pipelineName):
+        '''
+        Read all steps of the pipeline as a list of (step name, step options)
+        '''
+        configFile = self.getConfigFile('pipelines', pipelineName)
+        stepConfig = SnapshotConfigParser()
+        # keep the case of the option names (e.g. --filePatterns)
+        stepConfig.optionxform = str
+        stepConfig.read(configFile)
+        steps = []
+        for stepName in stepConfig.sections():
+            stepOptions = dict(stepConfig.items(stepName))
+            if not stepOptions.get(ACTION):
+                msg = "The mandatory option '%s' is missing from the step [%s]" % (ACTION, stepName)
+                raise MandatoryOptionMissing(msg)
+            steps.append((stepName, stepOptions))
+        logging.info("Pipeline '%s' steps: %s" % (pipelineName, [i[0] for i in steps]))
+        return steps
+
+    def _runStep(self, stepName, stepOptions):
+        '''
+        Run the action of the step with the step options set as command line options
+        '''
+        originalOptions = {}
+        for key in stepOptions:
+            if key == CONTINUE_ON_ERROR:
+                continue
+            originalOptions[key] = self.options.get(key)
+            self.options.set(key, stepOptions[key])
+        try:
+            return self.registry.runAction(stepOptions[ACTION])
+        finally:
+            # Restore the options for the next step
+            for key in originalOptions:
+                self.options.set(key, originalOptions[key])
+
+    ####################
+    # Public Functions #
+    ####################
+    def run(self, pipelineName):
+        '''
+        Run all steps of the pipeline. Stops at the first failed step unless the step has continue_on_error=true.
+        Returns the return code of the first failed step, or RC_NO_ERROR
+        '''
+        try:
+            steps = self._readSteps(pipelineName)
+        except FileConfigMissing as fcm:
+            logging.error(fcm)
+            return RC_FILE_CONFIG_MISSING
+        except MandatoryOptionMissing as mom:
+            logging.error(mom)
+            return RC_MANDATORY_OPTION_MISSING
+
+        returnCode  = RC_NO_ERROR
+        stepResults = []
+        for (stepName, stepOptions) in steps:
+            actionName = stepOptions[ACTION]
+            logging.info("\nStart pipeline step [%s]: action '%s'" % (stepName, actionName))
+            if not self.registry.hasAction(actionName):
+                logging.error("'%s' is not a valid action." % (actionName))
+                stepReturnCode = RC_INVALID_ACTION
+            else:
+                stepReturnCode = self._runStep(stepName, stepOptions)
+            logging.info("The step [%s] (action '%s') has finished. Return Code is %s" % (stepName, actionName, stepReturnCode))
+            stepResults.append((stepName, actionName, stepReturnCode))
+            if stepReturnCode == RC_NO_ERROR:
+                continue
+            if returnCode == RC_NO_ERROR:
+                returnCode = stepReturnCode
+            if str(stepOptions.get(CONTINUE_ON_ERROR, '')).strip().lower() != 'true':
+                logging.error("The pipeline '%s' was stopped because the step [%s] failed." % (pipelineName, stepName))
+                break
+
+        # Output the return code of each step
+        logging.info("\nPipeline '%s' results:" % (pipelineName))
+        for (stepName, actionName, stepReturnCode) in stepResults:
+            logging.info("[%s] %s: Return Code is %s" % (stepName, actionName, stepReturnCode))
+        for (stepName, stepOptions) in steps[len(stepResults):]:
+            logging.info("[%s] %s: skipped" % (stepName, stepOptions[ACTION]))
+        return returnCode
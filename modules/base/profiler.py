@@ -0,0 +1,110 @@
+#!/usr/bin/env python2.7
+from contextlib import contextmanager
+import logging
+import threading
+import time
+
+class ProfilerFactory(type):
+    '''
+    '''
+    _instances = {}
+    def __call__(cls, *args, **kwargs):
+        if cls not in cls._instances:
+            cls._instances[cls] = super(ProfilerFactory, cls).__call__(*args, **kwargs)
+        return cls._instances[cls]
+
+class Profiler(object):
+    '''
+    Wall-clock timings of named phases of a run (etl.py --profile)
+
+    Usage:
+        with Profiler().phase('jdbc execute'):
+            ...
+    Phases are only timed after enable() was called, otherwise phase() does nothing.
+    Phases may be nested (e.g. 'help table' contains 'jdbc execute') and may run in several threads.
+    '''
+    __metaclass__ = ProfilerFactory
+    def __init__(self):
+        self.enabled  = False
+        self._lock    = threading.Lock()
+        self._phases  = {}
+        self._profile = None
+
+    #####################
+    # Private Functions #
+    #####################
+    def _record(self, name, elapsed):
+        with self._lock:
+            if name not in self._phases:
+                # [count, total seconds, max seconds]
+                self._phases[name] = [0, 0.0, 0.0]
+            timing     = self._phases[name]
+            timing[0] += 1
+            timing[1] += elapsed
+            timing[2]  = max(timing[2], elapsed)
+
+    ####################
+    # Public Functions #
+    ####################
+    def enable(self):
+        self.enabled = True
+
+    @contextmanager
+    def phase(self, name):
+        '''
+        Time the code in the with block as the phase <name>
+        '''
+        if not self.enabled:
+            yield
+            return
+        start = time.time()
+        try:
+            yield
+        finally:
+            self._record(name, time.time() - start)
+
+    def run(self, func, *args):
+        '''
+        Call func(*args), with cProfile if the profiler is enabled.
+        Only the calling thread is profiled by cProfile (the phase timings include all threads)
+        '''
+        if not self.enabled:
+            return func(*args)
+        import cProfile
+        self._profile = cProfile.Profile()
+        start = time.time()
+        try:
+            return self._profile.runcall(func, *args)
+        finally:
+            self._record('total', time.time() - start)
+
+    def getPhases(self):
+        '''
+        Returns a list of (phase name, count, total seconds, max seconds), the slowest phase first
+        '''
+        with self._lock:
+            phases = [(name, timing[0], timing[1], timing[2]) for (name, timing) in self._phases.iteritems()]
+        return sorted(phases, key=lambda i: i[2], reverse=True)
+
+    def writeReport(self, baseFilename, entries=30):
+        '''
+        Write the cProfile data to <baseFilename>.prof and a summary of the phases to <baseFilename>.profile.txt
+        '''
+        if not self.enabled:
+            return
+        import pstats
+        import StringIO
+        summaryFile = "%s.profile.txt" % (baseFilename)
+        with open(summaryFile, 'w') as f:
+            f.write("%-40s %8s %12s %12s\n" % ('phase', 'count', 'total[s]', 'max[s]'))
+            for (name, count, total, maximum) in self.getPhases():
+                f.write("%-40s %8d %12.3f %12.3f\n" % (name, count, total, maximum))
+            if self._profile is not None:
+                profileFile = "%s.prof" % (baseFilename)
+                self._profile.dump_stats(profileFile)
+                stream = StringIO.StringIO()
+                stats  = pstats.Stats(self._profile, stream=stream)
+                stats.sort_stats('cumulative').print_stats(entries)
+                f.write("\n%s" % (stream.getvalue()))
+                logging.info("Profile = '%s'" % (profileFile))
+        logging.info("Profile summary = '%s'" % (summaryFile))
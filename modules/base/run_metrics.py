@@ -0,0 +1,171 @@
+#!/usr/bin/env python2.7
+import datetime
+import json
+import logging
+import os
+import threading
+import time
+
+import modules.base.log_context as log_context
+
+class RunMetricsFactory(type):
+    '''
+    '''
+    _instances = {}
+    def __call__(cls, *args, **kwargs):
+        if cls not in cls._instances:
+            cls._instances[cls] = super(RunMetricsFactory, cls).__call__(*args, **kwargs)
+        return cls._instances[cls]
+
+class SectionMetrics(object):
+    '''
+    Metrics of one section processed by an action (see EtlBase.processSections)
+
+    counters: e.g. bytes_read, bytes_written, rows_extracted, rows_loaded, et_count, uv_count
+    '''
+    def __init__(self, action, section):
+        self.action       = action
+        self.section      = section
+        self.startTime    = datetime.datetime.now()
+        self.endTime      = None
+        self.status       = None
+        self.result       = None
+        self.counters     = {}
+        self.matchedFiles = []
+        self.subprocesses = []
+        self._start       = time.time()
+        self._duration    = None
+        # the counters are also updated by the threads of the QueryExecutor
+        self._lock        = threading.Lock()
+
+    ####################
+    # Public Functions #
+    ####################
+    def add(self, key, value):
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def addFiles(self, files):
+        self.matchedFiles += files
+
+    def addSubprocess(self, command, duration, returnCode):
+        self.subprocesses.append({'command': command, 'duration': round(duration, 3), 'return_code': returnCode})
+
+    def finish(self, status, result=None):
+        self.endTime   = datetime.datetime.now()
+        self._duration = time.time() - self._start
+        self.status    = status
+        self.result    = result
+
+    def toDict(self):
+        return {'action'        : self.action,
+                'section'       : self.section,
+                'start_time'    : self.startTime.strftime('%Y-%m-%d %H:%M:%S.%f'),
+                'end_time'      : self.endTime.strftime('%Y-%m-%d %H:%M:%S.%f') if self.endTime else None,
+                'duration'      : round(self._duration, 3) if self._duration is not None else None,
+                'status'        : self.status,
+                'result'        : self.result,
+                'matched_files' : self.matchedFiles,
+                'counters'      : self.counters,
+                'subprocesses'  : self.subprocesses}
+
+def getSectionMetrics():
+    '''
+    Returns the metrics of the section processed by the current thread, or None
+    '''
+    return log_context.getContext('metrics')
+
+def add(key, value):
+    '''
+    Add value to the counter <key> of the section processed by the current thread (ignored outside of a section)
+    '''
+    metrics = getSectionMetrics()
+    if metrics is not None and value is not None:
+        metrics.add(key, value)
+
+class RunMetrics(object):
+    '''
+    Writes a JSON record per processed section to <logfile>.metrics.json
+    and to the run history database ([files] RUN_HISTORY_DB in conf/globals.cfg).
+
+    The run history is a SQLite database with the table run_history, keyed by ML_JOBNET_NAME and JC_JOBID:
+        sqlite3 work/run_history.db "select action, section, duration, metrics from run_history where jobnet_name='...'"
+    '''
+    __metaclass__ = RunMetricsFactory
+
+    CREATE_TABLE_SQL = '''CREATE TABLE IF NOT EXISTS run_history (
+                              id          INTEGER PRIMARY KEY AUTOINCREMENT,
+                              jobnet_name TEXT,
+                              job_id      TEXT,
+                              run_id      TEXT,
+                              action      TEXT,
+                              section     TEXT,
+                              start_time  TEXT,
+                              end_time    TEXT,
+                              duration    REAL,
+                              status      TEXT,
+                              metrics     TEXT)'''
+    CREATE_INDEX_SQL = 'CREATE INDEX IF NOT EXISTS run_history_job ON run_history (jobnet_name, job_id)'
+    INSERT_SQL       = '''INSERT INTO run_history (jobnet_name, job_id, run_id, action, section, start_time, end_time, duration, status, metrics)
+                          VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'''
+
+    def __init__(self):
+        self.metricsFile = None
+        self.historyDb   = None
+        self.jobnetName  = ''
+        self.jobId       = ''
+        self.runId       = ''
+        self._lock       = threading.Lock()
+
+    #####################
+    # Private Functions #
+    #####################
+    def _writeMetricsFile(self, record):
+        with self._lock:
+            with open(self.metricsFile, 'a') as f:
+                f.write(json.dumps(record, default=str) + '\n')
+
+    def _writeHistory(self, record):
+        # sqlite3 is only needed when a section was processed, and a connection can not be shared between threads
+        import sqlite3
+        historyDirectory = os.path.dirname(self.historyDb)
+        if historyDirectory and not os.path.exists(historyDirectory):
+            os.makedirs(historyDirectory)
+        conn = sqlite3.connect(self.historyDb, timeout=30)
+        try:
+            conn.execute(self.CREATE_TABLE_SQL)
+            conn.execute(self.CREATE_INDEX_SQL)
+            conn.execute(self.INSERT_SQL, (self.jobnetName, self.jobId, self.runId, record['action'], record['section'],
+                                           record['start_time'], record['end_time'], record['duration'], record['status'],
+                                           json.dumps(record, default=str)))
+            conn.commit()
+        finally:
+            conn.close()
+
+    ####################
+    # Public Functions #
+    ####################
+    def configure(self, metricsFile, historyDb, jobnetName, jobId, runId):
+        self.metricsFile = metricsFile
+        self.historyDb   = historyDb
+        self.jobnetName  = jobnetName
+        self.jobId       = jobId
+        self.runId       = runId
+
+    def finishSection(self, metrics, status, result=None):
+        '''
+        Write the record of a processed section
+        '''
+        metrics.finish(status, result)
+        record = metrics.toDict()
+        record['jobnet_name'] = self.jobnetName
+        record['job_id']      = self.jobId
+        record['run_id']      = self.runId
+        # The metrics must never make an action fail
+        try:
+            if self.metricsFile:
+                self._writeMetricsFile(record)
+            if self.historyDb:
+                self._writeHistory(record)
+        except Exception, e:
+            logging.warn("The metrics of the section could not be written: %s" % (e))
@@ -0,0 +1,136 @@
+#!/usr/bin/env python2.7
+import logging
+
+from modules.base.exceptions  import MandatoryOptionMissing
+
+def convertValue(value):
+    '''
+    Convert the value into an int if possible (the way all _read*Option functions of EtlBase do)
+    '''
+    try:
+        return int(value)
+    except:
+        return value
+
+class SectionParameters(object):
+    '''
+    The options of one configuration section, resolved once
+
+    Created by EtlBase.getSectionParameters() for the actual section name (<environment>_<section> if it exists)
+    and reused until the configuration is changed (read, set, remove_section...).
+    The lookup of an option in the configuration (has_option, get with interpolation, int conversion)
+    is done once per option. The command line options are checked on every call, because pipeline steps
+    and etl.py --serve requests change them while the configuration stays the same.
+
+    Priority of a value: "command line" > [section] > [default] (getDefault only) > "default value"
+    '''
+    __slots__ = ('section', 'actualSection', '_config', '_options', '_defaultParameters', '_values', '_logged')
+
+    def __init__(self, config, options, section, actualSection, defaultParameters=None):
+        self.section            = section
+        self.actualSection      = actualSection
+        self._config            = config
+        self._options           = options
+        self._defaultParameters = defaultParameters
+        # option -> (has_option, value in the configuration, converted value)
+        self._values            = {}
+        self._logged            = set()
+
+    #####################
+    # Private Functions #
+    #####################
+    def _lookup(self, option):
+        if option not in self._values:
+            if self._config.has_option(self.actualSection, option):
+                value = self._config.get(self.actualSection, option)
+                self._values[option] = (True, value, convertValue(value))
+            else:
+                self._values[option] = (False, None, None)
+        return self._values[option]
+
+    def _log(self, option, source, msg):
+        # Each option is logged once per source instead of on every call
+        if (option, source) in self._logged:
+            return
+        self._logged.add((option, source))
+        logging.debug(msg)
+
+    ####################
+    # Public Functions #
+    ####################
+    def has(self, option):
+        return self._lookup(option)[0]
+
+    def get(self, option, defaultValue=None, logMessage=True, canOverride=True):
+        '''
+        Same as EtlBase._readOption(): an empty value in the configuration also returns the default value
+        '''
+        if canOverride and self._options.hasKey(option) and self._options.get(option) != None:
+            optionValue = self._options.get(option)
+            if logMessage:
+                self._log(option, 'command line', "The option '%s' set to '%s', via command line argument" % (option, optionValue))
+            return convertValue(optionValue)
+        (hasOption, value, convertedValue) = self._lookup(option)
+        if not hasOption or not value:
+            if logMessage:
+                self._log(option, 'default', "The option '%s' is set to the default value of '%s'" % (option, defaultValue))
+            return convertValue(defaultValue)
+        if logMessage:
+            self._log(option, 'config', "The option '%s' is set to the value of '%s', via configuration file section [%s]" % (option, value, self.actualSection))
+        return convertedValue
+
+    def getMandatory(self, option, logMessage=True):
+        '''
+        Same as EtlBase._readMandatoryOption(): the option must be in the configuration, the command line is not checked
+        '''
+        (hasOption, value, convertedValue) = self._lookup(option)
+        if not hasOption:
+            msg = "The mandatory option '%s' is missing from the section [%s]" % (option, self.actualSection)
+            raise MandatoryOptionMissing(msg)
+        if logMessage:
+            self._log(option, 'mandatory', "The option '%s' in [%s] is set to '%s'" % (option, self.actualSection, value))
+        return convertedValue
+
+    def getDefault(self, option, defaultValue=None):
+        '''
+        Same as EtlBase._readOptionDefault(): the option is read from [default] if it is not in this section
+        '''
+        if self.has(option) or self._defaultParameters is None:
+            return self.get(option, defaultValue)
+        return self._defaultParameters.get(option, defaultValue)
+
+    def getMandatoryDefault(self, option):
+        optionValue = self.getDefault(option, None)
+        if optionValue is None:
+            msg = "The mandatory option '%s' is missing from the section [%s]" % (option, self.section)
+            raise MandatoryOptionMissing(msg)
+        return optionValue
+
+    def getInt(self, option, defaultValue=None, checkDefault=True):
+        optionValue = self.getDefault(option, defaultValue) if checkDefault else self.get(option, defaultValue)
+        if optionValue is None:
+            return None
+        try:
+            return int(optionValue)
+        except (TypeError, ValueError):
+            raise ValueError("The option '%s' in [%s] must be an integer: '%s'" % (option, self.actualSection, optionValue))
+
+    def getBoolean(self, option, defaultValue=None, checkDefault=True):
+        '''
+        Same as EtlBase._readBooleanOption(): 'true'/'false' (any case), otherwise the default value
+        '''
+        booleanString = self.getDefault(option, defaultValue) if checkDefault else self.get(option, defaultValue)
+        if str(booleanString).strip().lower() == 'true':
+            return True
+        if str(booleanString).strip().lower() == 'false':
+            return False
+        return defaultValue
+
+    def getList(self, option, defaultValue='', checkDefault=True, delimiter=','):
+        '''
+        A list of the stripped, non-empty elements of a delimited value
+        '''
+        optionValue = self.getDefault(option, defaultValue) if checkDefault else self.get(option, defaultValue)
+        if optionValue is None:
+            return []
+        return [i.strip() for i in str(optionValue).split(delimiter) if i.strip()]
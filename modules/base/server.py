@@ -0,0 +1,204 @@
+#!/usr/bin/env python2.7
+import Queue
+import SocketServer
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import traceback
+import uuid
+
+from modules.base.constants   import *
+from modules.base.options     import Options
+from modules.base.pipeline    import Pipeline
+import modules.base.log_context as log_context
+import modules.base.parallel    as parallel
+
+###########################################################################
+# etl.py --serve : a resident daemon which runs actions on worker threads #
+# etl.py --client: a thin client which submits an action to the daemon   #
+#                                                                         #
+# Protocol (one JSON object per line over a Unix socket):                 #
+#   client -> server: {"args": ["--action=...", "--cfg=...", ...]}        #
+#   server -> client: {"log": "<log line>"} ... {"return_code": <rc>}     #
+###########################################################################
+
+def _sendMessage(wfile, message):
+    for key in message:
+        if isinstance(message[key], str):
+            message[key] = message[key].decode('utf-8', 'replace')
+    wfile.write(json.dumps(message) + '\n')
+    wfile.flush()
+
+class _Job(object):
+    '''
+    An action invocation submitted by a client
+    '''
+    def __init__(self, options):
+        self.jobId    = str(uuid.uuid4())
+        self.options  = options
+        self.messages = Queue.Queue()
+
+class RequestLogHandler(logging.Handler):
+    """
+    This class sends the log records of a request to the client of the request.
+    The records are found by the message queue of the request, which is kept in the thread context
+    (and therefore also used by the section worker threads of --parallelism).
+    """
+    def emit(self, record):
+        messages = log_context.getContext('messages')
+        if messages is None:
+            return
+        try:
+            messages.put(('log', self.format(record)))
+        except Exception:
+            self.handleError(record)
+
+class _RequestHandler(SocketServer.StreamRequestHandler):
+    '''
+    Receives one action invocation, hands it over to a worker and streams the logs and the return code back
+    '''
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            args    = json.loads(line)['args']
+            options = Options().parse([str(i) for i in args])
+        except (ValueError, KeyError, TypeError), e:
+            _sendMessage(self.wfile, {'log': "Invalid request: %s" % (e)})
+            _sendMessage(self.wfile, {'return_code': RC_INVALID_ACTION})
+            return
+        job = _Job(options)
+        logging.info("Request %s received: %s" % (job.jobId, args))
+        self.server.jobs.put(job)
+        connected = True
+        while True:
+            (kind, value) = job.messages.get()
+            if not connected:
+                if kind == 'return_code':
+                    break
+                continue
+            try:
+                _sendMessage(self.wfile, {kind: value})
+            except socket.error, e:
+                # the job cannot be cancelled, so keep reading its messages until it finishes
+                logging.warn("The client of request %s disconnected: %s" % (job.jobId, e))
+                connected = False
+            if kind == 'return_code':
+                break
+
+class EtlServer(SocketServer.ThreadingMixIn, SocketServer.UnixStreamServer):
+    '''
+    USAGE: etl.py --serve
+    Listens on a Unix socket and runs the submitted actions on a fixed number of worker threads.
+    The JVM and the pooled JDBC connections (see ConnectionPool in modules/base/jdbc.py)
+    stay open between requests.
+    '''
+    daemon_threads = True
+
+    def __init__(self, socketFile, registry, workers):
+        if os.path.exists(socketFile):
+            os.unlink(socketFile)
+        SocketServer.UnixStreamServer.__init__(self, socketFile, _RequestHandler)
+        # only the user running the daemon may submit actions
+        os.chmod(socketFile, 0600)
+        self.socketFile = socketFile
+        self.registry   = registry
+        self.jobs       = Queue.Queue()
+        self.workers    = []
+        for i in xrange(workers):
+            worker = threading.Thread(target=self._work, name="server-worker-%s" % (i + 1))
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+
+    #####################
+    # Private Functions #
+    #####################
+    def _work(self):
+        try:
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    break
+                self._runJob(job)
+        finally:
+            parallel.releaseThreadResources()
+
+    def _runJob(self, job):
+        log_context.restoreContext({'messages': job.messages})
+        Options().bind(job.options)
+        returnCode = RC_UNEXPECTED_ERROR
+        try:
+            if (job.options.get('pipeline') != None):
+                returnCode = Pipeline(self.registry).run(job.options.get('pipeline'))
+            elif not self.registry.hasAction(job.options.get('action')):
+                logging.error("%s is not a valid action." % (job.options.get('action')))
+                returnCode = RC_INVALID_ACTION
+            else:
+                returnCode = self.registry.runAction(job.options.get('action'))
+        except SystemExit, e:
+            # e.g. _validateOptions exits when a mandatory option is missing
+            returnCode = e.code if isinstance(e.code, int) else RC_ERROR
+        except Exception, e:
+            logging.error(e)
+            logging.error(traceback.format_exc())
+        finally:
+            logging.info("Request %s has finished. Return Code is %s" % (job.jobId, returnCode))
+            # The connections are validated (and expired) by the pool before the next request borrows them
+            parallel.releaseThreadConnections()
+            Options().bind(None)
+            log_context.restoreContext({})
+            job.messages.put(('return_code', returnCode))
+
+    ####################
+    # Public Functions #
+    ####################
+    def serveForever(self):
+        logging.info("Listening on '%s' with %s workers." % (self.socketFile, len(self.workers)))
+        try:
+            self.serve_forever()
+        finally:
+            logging.info("Shutting down.")
+            for worker in self.workers:
+                self.jobs.put(None)
+            for worker in self.workers:
+                worker.join()
+            parallel.closeAllConnections()
+            self.server_close()
+            if os.path.exists(self.socketFile):
+                os.unlink(self.socketFile)
+        return RC_NO_ERROR
+
+class EtlClient(object):
+    '''
+    USAGE: etl.py --client --action=<action> --cfg=<config> --section=<section_pattern> ...
+    Submits the action to the daemon started by etl.py --serve, prints its log and returns its return code
+    '''
+    def __init__(self, socketFile):
+        self.socketFile = socketFile
+
+    def submit(self, args):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.socketFile)
+        except socket.error, e:
+            print "The etl.py --serve daemon is not available on '%s': %s" % (self.socketFile, e)
+            return RC_SERVER_NOT_AVAILABLE
+        rfile = sock.makefile('r')
+        wfile = sock.makefile('w')
+        try:
+            _sendMessage(wfile, {'args': args})
+            for line in rfile:
+                message = json.loads(line)
+                if 'return_code' in message:
+                    return message['return_code']
+                print message['log'].encode('utf-8')
+                sys.stdout.flush()
+        finally:
+            rfile.close()
+            wfile.close()
+            sock.close()
+        print "The connection to the etl.py --serve daemon was closed unexpectedly."
+        return RC_SERVER_NOT_AVAILABLE
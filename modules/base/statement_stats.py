@@ -0,0 +1,176 @@
+#!/usr/bin/env python2.7
+import datetime
+import logging
+import re
+import threading
+
+from modules.base.constants   import METRIC_JDBC_STATEMENTS, METRIC_JDBC_SECONDS, METRIC_ROWS_FETCHED
+import modules.base.log_context as log_context
+import modules.base.run_metrics as run_metrics
+
+class StatementStatsFactory(type):
+    '''
+    '''
+    _instances = {}
+    def __call__(cls, *args, **kwargs):
+        if cls not in cls._instances:
+            cls._instances[cls] = super(StatementStatsFactory, cls).__call__(*args, **kwargs)
+        return cls._instances[cls]
+
+class StatementTiming(object):
+    '''
+    The timings of all executions of one statement fingerprint
+    '''
+    __slots__ = ('fingerprint', 'count', 'total', 'maximum', 'prepare', 'execute', 'fetch', 'rows', 'chars', 'histogram')
+
+    def __init__(self, fingerprint, buckets):
+        self.fingerprint = fingerprint
+        self.count       = 0
+        self.total       = 0.0
+        self.maximum     = 0.0
+        self.prepare     = 0.0
+        self.execute     = 0.0
+        self.fetch       = 0.0
+        self.rows        = 0
+        self.chars       = 0
+        # number of executions per latency bucket (see StatementStats.LATENCY_BUCKETS)
+        self.histogram   = [0] * (buckets + 1)
+
+class StatementStats(object):
+    '''
+    The latency of the JDBC statements of a run, per statement fingerprint
+
+    dbapi2.Cursor reports each statement when it is closed (or the cursor executes the next one):
+    the seconds spent to prepare, execute and fetch it, the rows fetched and the characters of the
+    fetched string values (only with COUNT_CHARS=true in [STATEMENT_STATS] of jdbc.cfg, 0 otherwise).
+    The fingerprint is the SQL text with literals replaced by '?', so the same
+    query with different dates or ids is counted once.
+    Statements slower than the threshold (SLOW_QUERY_THRESHOLD in [STATEMENT_STATS] of jdbc.cfg) are
+    written to the slow query log (<logfile>.slow_queries.log) with their full SQL text.
+    writeReport() writes the summary table (<logfile>.statements.txt) at the end of the run.
+    '''
+    __metaclass__ = StatementStatsFactory
+
+    # Upper bounds (seconds) of the latency histogram buckets; the last bucket has no upper bound
+    LATENCY_BUCKETS = (0.01, 0.1, 1.0, 10.0, 60.0, 600.0)
+    BUCKET_LABELS   = ('<10ms', '<100ms', '<1s', '<10s', '<1m', '<10m', '>=10m')
+
+    LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+    IN_LIST_PATTERN = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+    SPACE_PATTERN   = re.compile(r"\s+")
+
+    def __init__(self):
+        self.slowQueryThreshold = None
+        self.slowQueryFile      = None
+        self.countChars         = False
+        self._lock              = threading.Lock()
+        self._statements        = {}
+        self._fingerprints      = {}
+
+    #####################
+    # Private Functions #
+    #####################
+    def _getFingerprint(self, sql):
+        fingerprint = self._fingerprints.get(sql)
+        if fingerprint is None:
+            fingerprint = self.LITERAL_PATTERN.sub('?', sql)
+            fingerprint = self.IN_LIST_PATTERN.sub('(?)', fingerprint)
+            fingerprint = self.SPACE_PATTERN.sub(' ', fingerprint).strip()
+            if len(self._fingerprints) >= 1000:
+                # e.g. statements with generated table names
+                self._fingerprints.clear()
+            self._fingerprints[sql] = fingerprint
+        return fingerprint
+
+    def _getBucket(self, elapsed):
+        for (i, bound) in enumerate(self.LATENCY_BUCKETS):
+            if elapsed < bound:
+                return i
+        return len(self.LATENCY_BUCKETS)
+
+    def _writeSlowQuery(self, sql, elapsed, prepareTime, executeTime, fetchTime, rows, chars):
+        section = log_context.getContext('section')
+        logging.warn("Slow query: %.3f seconds (execute %.3f, fetch %.3f), %d rows: %s" % (elapsed, executeTime, fetchTime, rows, self._getFingerprint(sql)[:200]))
+        if not self.slowQueryFile:
+            return
+        try:
+            with self._lock:
+                with open(self.slowQueryFile, 'a') as f:
+                    f.write("# %s%s\n" % (datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'), " [%s]" % (section) if section else ''))
+                    f.write("# time: %.3f  prepare: %.3f  execute: %.3f  fetch: %.3f  rows: %d  chars: %d\n" % (elapsed, prepareTime, executeTime, fetchTime, rows, chars))
+                    f.write("%s;\n\n" % (sql.strip().encode('utf8') if isinstance(sql, unicode) else sql.strip()))
+        except (IOError, OSError), e:
+            logging.debug("The slow query log '%s' could not be written: %s" % (self.slowQueryFile, e))
+
+    ####################
+    # Public Functions #
+    ####################
+    def configure(self, slowQueryFile):
+        self.slowQueryFile = slowQueryFile
+
+    def setSlowQueryThreshold(self, seconds):
+        '''
+        Statements which take at least this number of seconds are written to the slow query log (None: no slow query log)
+        '''
+        self.slowQueryThreshold = seconds
+
+    def record(self, sql, prepareTime, executeTime, fetchTime, rows, chars):
+        '''
+        Called by dbapi2.Cursor for each executed statement (see dbapi2.set_statement_listener)
+        '''
+        elapsed     = prepareTime + executeTime + fetchTime
+        fingerprint = self._getFingerprint(sql)
+        with self._lock:
+            timing = self._statements.get(fingerprint)
+            if timing is None:
+                timing = self._statements[fingerprint] = StatementTiming(fingerprint, len(self.LATENCY_BUCKETS))
+            timing.count   += 1
+            timing.total   += elapsed
+            timing.maximum  = max(timing.maximum, elapsed)
+            timing.prepare += prepareTime
+            timing.execute += executeTime
+            timing.fetch   += fetchTime
+            timing.rows    += rows
+            timing.chars   += chars
+            timing.histogram[self._getBucket(elapsed)] += 1
+        run_metrics.add(METRIC_JDBC_STATEMENTS, 1)
+        run_metrics.add(METRIC_JDBC_SECONDS, elapsed)
+        run_metrics.add(METRIC_ROWS_FETCHED, rows)
+        if self.slowQueryThreshold is not None and elapsed >= self.slowQueryThreshold:
+            self._writeSlowQuery(sql, elapsed, prepareTime, executeTime, fetchTime, rows, chars)
+
+    def getStatements(self):
+        '''
+        Returns the StatementTimings, the statement with the highest total time first
+        '''
+        with self._lock:
+            statements = list(self._statements.values())
+        return sorted(statements, key=lambda i: i.total, reverse=True)
+
+    def writeReport(self, baseFilename, entries=10):
+        '''
+        Write the summary of all statements to <baseFilename>.statements.txt and log the slowest ones
+        '''
+        statements = self.getStatements()
+        if not statements:
+            return
+        header = "%8s %10s %10s %10s %10s %10s %10s %12s  %s" % ('count', 'total[s]', 'max[s]', 'prepare[s]', 'execute[s]', 'fetch[s]', 'rows', 'chars', 'statement')
+        lines  = []
+        for timing in statements:
+            lines.append("%8d %10.3f %10.3f %10.3f %10.3f %10.3f %10d %12d  %s" % (timing.count, timing.total, timing.maximum, timing.prepare, timing.execute,
+                                                                                 timing.fetch, timing.rows, timing.chars, timing.fingerprint[:200]))
+        summaryFile = "%s.statements.txt" % (baseFilename)
+        try:
+            with open(summaryFile, 'w') as f:
+                f.write("%s\n" % (header))
+                for (line, timing) in zip(lines, statements):
+                    f.write("%s\n" % (line.encode('utf8') if isinstance(line, unicode) else line))
+                    histogram = ', '.join(["%s: %d" % (label, count) for (label, count) in zip(self.BUCKET_LABELS, timing.histogram) if count])
+                    f.write("%8s %s\n" % ('', histogram))
+            logging.info("Statement summary = '%s'" % (summaryFile))
+        except (IOError, OSError), e:
+            logging.warn("The statement summary '%s' could not be written: %s" % (summaryFile, e))
+        logging.info("The %d statements with the highest total time:" % (min(entries, len(lines))))
+        logging.info(header)
+        for line in lines[:entries]:
+            logging.info(line)
@@ -2,23 +2,39 @@
 import csv
 import logging
 import os.path
+import re
 import shutil
 import uuid
 
 from datetime import datetime, timedelta
 
 # ETL Code
-from   modules.base.jdbc            import JDBC
+from   modules.base.jdbc            import JDBC, getStatementFetchSize
 from   modules.base.database        import Database
 from   modules.base.constants       import *
+from   modules.base.profiler        import Profiler
+import modules.base.etl_util        as etl_util
+import modules.base.run_metrics     as run_metrics
+from   modules.oracle.mysql_metadata import MySQLMetadataCache
 
 class MySQL(Database):
     '''
     A class for all MySQL specific actions
     '''
+    # DDL which changes the metadata in the MySQLMetadataCache
+    DDL_PATTERN = re.compile(r'\s*(CREATE|DROP|ALTER|RENAME|TRUNCATE)\b', re.IGNORECASE)
+
     def __init__(self):
         super(MySQL, self).__init__()
-        self.config.read('conf/modules/mysql.cfg')
+        with Profiler().phase('config'):
+            self.config.read('conf/modules/mysql.cfg')
+        cacheFile = None
+        if self.config.has_option(SECTION_FILES, MYSQL_METADATA_CACHE):
+            cacheFile = self.config.get(SECTION_FILES, MYSQL_METADATA_CACHE)
+        ttl = 3600
+        if self.config.has_option(SECTION_METADATA_CACHE, TTL):
+            ttl = self.config.getint(SECTION_METADATA_CACHE, TTL)
+        MySQLMetadataCache().configure(cacheFile, ttl)
 
     #####################
     # Private Functions #
@@ -114,29 +130,10 @@ class MySQL(Database):
 
     def getInformationSchemaColumns(self, database, schema, tablename):
         """
+        The rows of information_schema.columns of the table (from the MySQLMetadataCache)
+        The rows are immutable Rows shared with the cache (row['column_name'], row.as_dict() for a dictionary)
         """
-        select = """
-                 SELECT   table_catalog, table_schema, table_name, column_name, ordinal_position,
-                          column_default, is_nullable, data_type, character_maximum_length, character_octet_length,
-                          numeric_precision, numeric_scale, character_set_name, collation_name, column_type,
-                          column_key, extra, privileges, column_comment
-                 FROM     information_schema.columns
-                 WHERE    table_schema='%s'
-                          AND table_name='%s'
-                 ORDER BY ordinal_position
-                 """ % (schema, tablename)
-        resultSet = self.executeSql(database, select)
-        informationSchema = []
-        for row in resultSet:
-            info = {'table_catalog'         :row[0],  'table_schema'     :row[1], 'table_name'               :row[2],
-                    'column_name'           :row[3],  'ordinal_position' :row[4], 'column_default'           :row[5],
-                    'is_nullable'           :row[6],  'data_type'        :row[7],  'character_maximum_length':row[8],
-                    'character_octet_length':row[9],  'numeric_precision':row[10], 'numeric_scale'           :row[11],
-                    'character_set_name'    :row[12], 'collation_name'   :row[13], 'column_type'             :row[14],
-                    'column_key'            :row[15], 'extra'            :row[16], 'privileges'              :row[17],
-                    'column_comment'        :row[18]}
-            informationSchema.append(info)
-        return informationSchema
+        return list(MySQLMetadataCache().getColumns(self, database, schema, tablename))
 
     def getTableColumns(self, database, schema, tablename):
         """
@@ -155,15 +152,6 @@ class MySQL(Database):
             columnTypes[column['column_name']] = column['column_type']
         return columnTypes
 
-    def getTableDefinition(self, database, tablename):
-        descSql         = 'DESC %s' % tablename
-        tableDefinition = []
-        resultSet       = self.executeSql(database, descSql)
-        for row in resultSet:
-            rowInfo = {'field':row[0], 'type':row[1],'nullable':row[2],'primary_key':row[3],'default':row[4],'extra':row[5]}
-            tableDefinition.append(rowInfo)
-        return tableDefinition
-
     def extract(self, databaseName, extractInfo, fileInfo):
         """
         Extracts a table into a flatfile.
@@ -595,38 +583,29 @@ class MySQL(Database):
         return primaryKey
 
     def getTableDefinition(self, database, tablename):
-        descSql         = 'DESC %s' % tablename
+        '''
+        The same fields as DESC <table>, from the MySQLMetadataCache
+        '''
+        if '.' in tablename:
+            # a table of another schema
+            descSql         = 'DESC %s' % tablename
+            tableDefinition = []
+            resultSet       = self.executeSql(database, descSql)
+            for row in resultSet:
+                rowInfo = {'field':row[0], 'type':row[1],'nullable':row[2],'primary_key':row[3],'default':row[4],'extra':row[5]}
+                tableDefinition.append(rowInfo)
+            return tableDefinition
+        schema          = self._readDatabaseSection(database)[SCHEMA]
         tableDefinition = []
-        resultSet       = self.executeSql(database, descSql)
-        for row in resultSet:
-            rowInfo = {'field':row[0], 'type':row[1],'nullable':row[2],'primary_key':row[3],'default':row[4],'extra':row[5]}
+        for column in MySQLMetadataCache().getColumns(self, database, schema, tablename.strip('`')):
+            rowInfo = {'field':column['column_name'], 'type':column['column_type'], 'nullable':column['is_nullable'],
+                       'primary_key':column['column_key'], 'default':column['column_default'], 'extra':column['extra']}
             tableDefinition.append(rowInfo)
         return tableDefinition
 
-    def executeSql(self, databaseKey, sql, parameters=None, isolation=0,fetch=100):
+    def _executeCursor(self, databaseKey, sql, parameters=None, isolation=0, fetch=None, fetchStrategy=None, fetchSize=None):
         """
-        Execute a query and return the result set
-
-        Args:
-            databaseKey    :sample_order(e.g.)
-
-            isolation
-                0:'' (default isolation)
-                1:'READ UNCOMMITTED'
-                2:'READ COMMITTED'
-                3:'REPEATABLE READ'
-                4:'SERIALIZABLE'
-
-            fetchmany : The number of record to be fetched as one time
-
-        Note
-            Python will recognize DB value up to JDBC Option(tinyInt1isBit,zeroDateTimeBehavior)
-            Value(-128 - 127) for TINYINT(1) will be recognized by Python as follows
-
-            Value(0000-00-00 00:00:00) for Timestamp will be recognized by Python as follows
-                zeroDateTimeBehavior=exception(default): SQL error
-                zeroDateTimeBehavior=convertToNull     : None
-                zeroDateTimeBehavior=round             : 0001-01-01 00:00:00
+        Execute a query and return the open cursor (see executeSql for the arguments)
         """
         #get MySQL Information
         mysql_info  = self._readDatabaseSection(databaseKey)
@@ -638,6 +617,11 @@ class MySQL(Database):
 
         other      = '?tinyInt1isBit=false&zeroDateTimeBehavior=convertToNull'
 
+        databaseSection = "%s_%s" % (self.environment, databaseKey.replace('sample_','sample1_'))
+        (fetchStrategy, fetchSize) = self._getFetchStrategy(databaseSection, fetch, fetchStrategy, fetchSize)
+        if fetchStrategy == FETCH_CURSOR:
+            other += '&useCursorFetch=true'
+
         url = 'jdbc:mysql://%s:%s/%s%s' % (host, port, schema,other)
         logging.debug('JDBC URL=%s' % url)
         # Parameters not included
@@ -656,26 +640,97 @@ class MySQL(Database):
             if isolation==4:
                 isolation='SERIALIZABLE'
 
-            jdbc = JDBC(url, 'com.mysql.jdbc.Driver', username, password,isolation)
+            jdbc = self._connect(databaseSection, url, 'com.mysql.jdbc.Driver', username, password, isolation)
 
             # Execute SQL
-            cursor = jdbc.execute(sql, parameters)
+            return jdbc.execute(sql, parameters, getStatementFetchSize('mysql', fetchStrategy, fetchSize))
+
+        except Exception, msg:
+            logging.error(msg)
+            raise
 
-            result_list = []
+    def iterSql(self, databaseKey, sql, parameters=None, isolation=0, fetch=100, batch=False, fetchStrategy=None, fetchSize=None):
+        """
+        Execute a query and yield the records one by one (lists of up to fetch records with batch=True)
 
+        Only one fetchmany block is held in memory. The cursor (and the result set) is closed
+        when the loop ends, raises, or the generator is closed. Use closing() to close it
+        as soon as the loop is left with break:
+            with contextlib.closing(self.iterSql(databaseKey, sql)) as records:
+                for record in records:
+                    ...
+        """
+        cursor = self._executeCursor(databaseKey, sql, parameters, isolation, fetch, fetchStrategy, fetchSize)
+        try:
+            if (cursor._rs is None):
+                return
             #fetchmany start
             records = cursor.fetchmany(fetch)
             while records:
-                for record in records:
-                    result_list.append(record)
+                if batch:
+                    yield records
+                else:
+                    for record in records:
+                        yield record
                 records = cursor.fetchmany(fetch)
             #fetchmany end
-
+        except GeneratorExit:
+            raise
         except Exception, msg:
             logging.error(msg)
             raise
+        finally:
+            cursor.close()
 
-        return result_list
+    def executeSql(self, databaseKey, sql, parameters=None, isolation=0,fetch=100, columnar=False, fetchStrategy=None, fetchSize=None):
+        """
+        Execute a query and return the result set
+
+        Args:
+            databaseKey    :sample_order(e.g.)
+
+            isolation
+                0:'' (default isolation)
+                1:'READ UNCOMMITTED'
+                2:'READ COMMITTED'
+                3:'REPEATABLE READ'
+                4:'SERIALIZABLE'
+
+            fetchmany : The number of record to be fetched as one time
+
+            fetchStrategy : 'fixed', 'stream' or 'cursor' (see Database._getFetchStrategy)
+                            the default is fetch_strategy of the database section in mysql.cfg
+
+            fetchSize     : the fetch size of the driver, which wins over fetch_size of the database section
+                            and [FETCH] FETCH_SIZE in jdbc.cfg (see Database._getFetchStrategy)
+
+            columnar  : True: return a list of columns instead of a list of rows (see Cursor.fetch_columns)
+                        numeric columns are NumPy arrays if NumPy is installed
+
+            The whole result set is returned as a list; use iterSql() for large result sets
+
+        Note
+            Python will recognize DB value up to JDBC Option(tinyInt1isBit,zeroDateTimeBehavior)
+            Value(-128 - 127) for TINYINT(1) will be recognized by Python as follows
+
+            Value(0000-00-00 00:00:00) for Timestamp will be recognized by Python as follows
+                zeroDateTimeBehavior=exception(default): SQL error
+                zeroDateTimeBehavior=convertToNull     : None
+                zeroDateTimeBehavior=round             : 0001-01-01 00:00:00
+        """
+        if not columnar:
+            return list(self.iterSql(databaseKey, sql, parameters, isolation, fetch, fetchStrategy=fetchStrategy, fetchSize=fetchSize))
+
+        cursor = self._executeCursor(databaseKey, sql, parameters, isolation, fetch, fetchStrategy, fetchSize)
+        try:
+            if (cursor._rs is None):
+                return []
+            return cursor.fetchall_columns(fetch)
+        except Exception, msg:
+            logging.error(msg)
+            raise
+        finally:
+            cursor.close()
 
     def executeDDL(self,  databaseKey, sql,isolation=0):
         """
@@ -707,6 +762,7 @@ class MySQL(Database):
         password    = mysql_info['password']
 
         url = 'jdbc:mysql://%s:%s/%s' % (host, port, schema)
+        databaseSection = "%s_%s" % (self.environment, databaseKey.replace('sample_','sample1_'))
 
         jdbc = None
         try:
@@ -721,7 +777,7 @@ class MySQL(Database):
             if isolation==4:
                 isolation='SERIALIZABLE'
 
-            jdbc = JDBC(url, 'com.mysql.jdbc.Driver', username, password,isolation)
+            jdbc = self._connect(databaseSection, url, 'com.mysql.jdbc.Driver', username, password, isolation)
 
             # Execute SQL
             result=jdbc.execute(sql)
@@ -729,6 +785,8 @@ class MySQL(Database):
         except Exception, msg:
             logging.error(msg)
             raise
+        if self.DDL_PATTERN.match(sql):
+            MySQLMetadataCache().invalidate(databaseKey)
         return result
 
     def hasTable(self, databaseKey, table_name, parameters=None):
@@ -746,29 +804,9 @@ class MySQL(Database):
         #get MySQL Information
         mysql_info  = self._readDatabaseSection(databaseKey)
         schema      = mysql_info['schema']  # item etc.
-        host        = mysql_info['host']
-        port        = mysql_info['port']
-        username    = mysql_info['username']
-        password    = mysql_info['password']
-
-        hasTable    = True
-        url = 'jdbc:mysql://%s:%s/%s' % (host, port, schema)
-        logging.debug('JDBC URL=%s' % url)
-        # Parameters not included
 
-        sql  = "SHOW TABLES FROM `%s` LIKE '%s'" %  (schema,table_name)
-        logging.debug('SQL=%s' % sql)
-
-        jdbc = JDBC(url, 'com.mysql.jdbc.Driver', username, password)
-
-        # Execute SQL
-        cursor = jdbc.execute(sql, parameters)
-
-        record = cursor.fetchone()
-        if record is None:
-            hasTable   = False
-
-        return hasTable
+        # SHOW TABLES LIKE: '_' and '%' are wildcards
+        return len(MySQLMetadataCache().getTables(self, databaseKey, schema, table_name)) > 0
 
     def getTableList(self, databaseKey, tablePattern = None):
         """
@@ -780,27 +818,10 @@ class MySQL(Database):
         Returns:
              tableList
         """
-        tableList=[]
-
-        tablenameClause = ""
-        if (tablePattern):
-           tablenameClause = "AND table_name like '%s'\n" % (tablePattern)
-
         mysql_info  = self._readDatabaseSection(databaseKey)
         schema      = mysql_info['schema']  # item etc.
-        sql         = """
-                      SELECT table_name
-                      FROM   information_schema.tables
-                      WHERE  table_schema = '%s'
-                             %s
-                      """ % (schema, tablenameClause)
-
-        recordSet = self.executeSql(databaseKey, sql)
-        for rec in recordSet:
-            tablename      = rec[0].encode('utf8').strip()
-            tableList.append(tablename)
 
-        return tableList
+        return [tablename.encode('utf8').strip() for tablename in MySQLMetadataCache().getTables(self, databaseKey, schema, tablePattern)]
 
     def mysqlLoadData(self):
         '''
@@ -1033,6 +1054,12 @@ class MySQL(Database):
             sql = "SELECT CONCAT_WS('%s',%s) FROM %s %s" % (delimiter, columnPart, table, whereClause)
         return sql
 
+    def getExtractTableName(self, databaseKey, table):
+        '''
+        The table name used in the SQL of the JDBC extractor (the JDBC URL contains the schema)
+        '''
+        return table
+
     def createExtractCmd(self, database, table, columns, delimiter, outputFile, dateColumn=None, startDate=None, endDate=None, characterSet='utf8'):
         dbInfo = self._readDatabaseSection(database)
 
@@ -1062,6 +1089,10 @@ class MySQL(Database):
         else:
             msg = "Extract completed successfully."
             logLevel = 'debug'
+            # Record the size of the extract file (mysql -r writes one line per row)
+            if run_metrics.getSectionMetrics() is not None:
+                run_metrics.add(METRIC_BYTES_WRITTEN, os.path.getsize(parameters[WORK_FILE]))
+                run_metrics.add(METRIC_ROWS_EXTRACTED, etl_util.count_lines(parameters[WORK_FILE]))
             # Rename to target output file
             shutil.move(parameters[WORK_FILE], parameters[OUTPUT_FILE])
             logging.info("The extract file %s was created." % (parameters[OUTPUT_FILE]))
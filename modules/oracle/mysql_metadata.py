@@ -0,0 +1,211 @@
+#!/usr/bin/env python2.7
+import cPickle
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+
+from modules.r10_jdbc.dbapi2 import row_class
+
+class MySQLMetadataCacheFactory(type):
+    '''
+    '''
+    _instances = {}
+    def __call__(cls, *args, **kwargs):
+        if cls not in cls._instances:
+            cls._instances[cls] = super(MySQLMetadataCacheFactory, cls).__call__(*args, **kwargs)
+        return cls._instances[cls]
+
+class MySQLMetadataCache(object):
+    '''
+    The information_schema metadata (tables and columns) of MySQL schemas, shared by all sections of the process
+
+    All tables of a schema are loaded with one query on information_schema.tables and one on
+    information_schema.columns. A loaded schema is checked again after ttl seconds: its columns are
+    loaded again when a table was created, dropped or its CREATE_TIME/UPDATE_TIME changed.
+    MySQL.executeDDL invalidates the schema of the database key.
+    With configure(cacheFile) the schemas are also kept in a pickle file, so the next run only has
+    to check CREATE_TIME/UPDATE_TIME instead of loading all columns. A schema read from the file
+    is always checked once by the process (another process may have changed its tables), the TTL
+    only applies to the schemas checked by this process.
+
+    Key: (database key, schema)
+    '''
+    __metaclass__ = MySQLMetadataCacheFactory
+
+    TABLES_SQL  = """
+                  SELECT   table_name, table_type, create_time, update_time
+                  FROM     information_schema.tables
+                  WHERE    table_schema='%s'
+                  """
+    COLUMNS_SQL = """
+                  SELECT   table_catalog, table_schema, table_name, column_name, ordinal_position,
+                           column_default, is_nullable, data_type, character_maximum_length, character_octet_length,
+                           numeric_precision, numeric_scale, character_set_name, collation_name, column_type,
+                           column_key, extra, privileges, column_comment
+                  FROM     information_schema.columns
+                  WHERE    table_schema='%s'
+                  ORDER BY table_name, ordinal_position
+                  """
+    COLUMN_KEYS = ('table_catalog', 'table_schema', 'table_name', 'column_name', 'ordinal_position',
+                   'column_default', 'is_nullable', 'data_type', 'character_maximum_length', 'character_octet_length',
+                   'numeric_precision', 'numeric_scale', 'character_set_name', 'collation_name', 'column_type',
+                   'column_key', 'extra', 'privileges', 'column_comment')
+
+    def __init__(self):
+        self.ttl        = 3600
+        self._cacheFile = None
+        self._lock      = threading.Lock()
+        # (database key, schema) -> {'checked': time, 'tables': {table name: (table_type, create_time, update_time)},
+        #                            'columns': {table name: [information_schema.columns of the table]}}
+        self._schemas   = None
+        # the keys of the schemas checked by this process
+        self._checked   = set()
+
+    #####################
+    # Private Functions #
+    #####################
+    def _loadCacheFile(self):
+        self._schemas = {}
+        if not self._cacheFile or not os.path.isfile(self._cacheFile):
+            return
+        try:
+            with open(self._cacheFile, 'rb') as f:
+                self._schemas = cPickle.load(f)
+        except Exception, e:
+            logging.debug("The metadata cache '%s' could not be read: %s" % (self._cacheFile, e))
+
+    def _writeCacheFile(self):
+        '''
+        The cache file is replaced atomically, because several processes may write it at the same time
+        '''
+        if not self._cacheFile:
+            return
+        tmpFile = "%s.%s" % (self._cacheFile, str(uuid.uuid4()))
+        try:
+            cacheDirectory = os.path.dirname(self._cacheFile)
+            if cacheDirectory and not os.path.exists(cacheDirectory):
+                os.makedirs(cacheDirectory)
+            with open(tmpFile, 'wb') as f:
+                cPickle.dump(self._schemas, f, cPickle.HIGHEST_PROTOCOL)
+            os.rename(tmpFile, self._cacheFile)
+        except Exception, e:
+            logging.debug("The metadata cache '%s' could not be written: %s" % (self._cacheFile, e))
+            if os.path.exists(tmpFile):
+                os.unlink(tmpFile)
+
+    def _readTables(self, mysql, databaseKey, schema):
+        tables = {}
+        for row in mysql.iterSql(databaseKey, self.TABLES_SQL % (schema), fetch=1000):
+            tables[row[0]] = (row[1], self._toPython(row[2]), self._toPython(row[3]))
+        return tables
+
+    def _toPython(self, value):
+        # e.g. BIGINT columns are returned as java.lang.Long, which can not be pickled
+        if value is None or isinstance(value, (basestring, int, long, float, bool)):
+            return value
+        try:
+            return int(str(value))
+        except ValueError:
+            return unicode(value)
+
+    def _readColumns(self, mysql, databaseKey, schema):
+        # A Row per column instead of a dictionary: the column keys are shared by all rows
+        ColumnRow = row_class(self.COLUMN_KEYS)
+        toPython  = self._toPython
+        columns   = {}
+        for row in mysql.iterSql(databaseKey, self.COLUMNS_SQL % (schema), fetch=1000):
+            columns.setdefault(row[2], []).append(ColumnRow([toPython(value) for value in row]))
+        return columns
+
+    def _getSchema(self, mysql, databaseKey, schema):
+        key = (databaseKey, schema)
+        with self._lock:
+            if self._schemas is None:
+                self._loadCacheFile()
+            entry = self._schemas.get(key)
+            checkedHere = key in self._checked
+        if entry is not None and checkedHere and time.time() - entry['checked'] < self.ttl:
+            return entry
+
+        # Not loaded yet, read from the cache file or not checked within the TTL: one query on information_schema.tables
+        tables = self._readTables(mysql, databaseKey, schema)
+        if entry is not None and entry['tables'] == tables:
+            logging.debug("The metadata of %s (%s) is up to date." % (schema, databaseKey))
+            entry = {'checked': time.time(), 'tables': tables, 'columns': entry['columns']}
+        else:
+            logging.debug("Loading the metadata of all tables of %s (%s)." % (schema, databaseKey))
+            entry = {'checked': time.time(), 'tables': tables, 'columns': self._readColumns(mysql, databaseKey, schema)}
+        with self._lock:
+            self._schemas[key] = entry
+            self._checked.add(key)
+            self._writeCacheFile()
+        return entry
+
+    ####################
+    # Public Functions #
+    ####################
+    def configure(self, cacheFile=None, ttl=3600):
+        '''
+        Keep the metadata in cacheFile (None: only in memory). The metadata is checked again after ttl seconds
+        '''
+        with self._lock:
+            if (cacheFile or None, ttl) == (self._cacheFile, self.ttl):
+                return
+            self._cacheFile = cacheFile or None
+            self.ttl        = ttl
+            self._schemas   = None
+            self._checked   = set()
+
+    def invalidate(self, databaseKey, schema=None):
+        '''
+        Forget the metadata of the schemas of the database key (all schemas if schema is None)
+        '''
+        with self._lock:
+            if self._schemas is None:
+                return
+            invalidated = [key for key in self._schemas.keys() if key[0] == databaseKey and (schema is None or key[1] == schema)]
+            for key in invalidated:
+                del self._schemas[key]
+            if invalidated:
+                self._writeCacheFile()
+
+    def getColumns(self, mysql, databaseKey, schema, tablename):
+        '''
+        Returns the rows of information_schema.columns of the table as Rows (read by index or key), ordered by ordinal_position
+        '''
+        return self._getSchema(mysql, databaseKey, schema)['columns'].get(tablename, [])
+
+    def hasTable(self, mysql, databaseKey, schema, tablename):
+        return tablename in self._getSchema(mysql, databaseKey, schema)['tables']
+
+    def getTables(self, mysql, databaseKey, schema, tablePattern=None):
+        '''
+        Returns the sorted table names of the schema, which match the LIKE pattern if it is given.
+        The match is case sensitive, as the table names are on Linux (lower_case_table_names=0),
+        and \\_ / \\% match a literal _ / %
+        '''
+        tables = sorted(self._getSchema(mysql, databaseKey, schema)['tables'].keys())
+        if not tablePattern:
+            return tables
+        regex   = ''
+        escaped = False
+        for c in tablePattern:
+            if escaped:
+                regex  += re.escape(c)
+                escaped = False
+            elif c == '\\':
+                escaped = True
+            elif c == '%':
+                regex += '.*'
+            elif c == '_':
+                regex += '.'
+            else:
+                regex += re.escape(c)
+        if escaped:
+            # a trailing backslash matches itself, as in MySQL
+            regex += re.escape('\\')
+        pattern = re.compile('^%s$' % (regex), re.DOTALL)
+        return [table for table in tables if pattern.match(table)]
@@ -17,11 +17,15 @@
 # License along with JayDeBeApi.  If not, see
 # <http://www.gnu.org/licenses/>.
 
+import collections
 import datetime
+import decimal
 import exceptions
 import time
 import re
+import struct
 import sys
+import weakref
 
 _jdbc_connect = None
 
@@ -124,6 +128,74 @@ DATETIME = DBAPITypeObject("TIMESTAMP",)
 
 ROWID = DBAPITypeObject(())
 
+# Rows of a result set
+class Row(tuple):
+    """A row of a result set: a tuple whose values can also be read by column name
+    (row['COLUMN'], row.get('COLUMN'), row.COLUMN).
+    The column names are stored once in the class returned by row_class(),
+    each row only holds its values (no __dict__, no per-row dictionary).
+    """
+    __slots__ = ()
+    _fields = ()
+    _index = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, basestring):
+            return tuple.__getitem__(self, self._index[key])
+        return tuple.__getitem__(self, key)
+
+    def __getattr__(self, name):
+        try:
+            return tuple.__getitem__(self, self._index[name])
+        except KeyError:
+            raise AttributeError(name)
+
+    def __reduce__(self):
+        return (_make_row, (self._fields, tuple(self)))
+
+    def get(self, key, default=None):
+        index = self._index.get(key)
+        if index is None:
+            return default
+        return tuple.__getitem__(self, index)
+
+    def has_key(self, key):
+        return key in self._index
+
+    def keys(self):
+        return list(self._fields)
+
+    def values(self):
+        return list(self)
+
+    def items(self):
+        return zip(self._fields, self)
+
+    def as_dict(self):
+        return dict(zip(self._fields, self))
+
+# Row classes by column names, shared by all result sets with the same columns
+_row_classes = {}
+_ROW_CLASSES_MAX = 256
+
+def row_class(names):
+    """The Row class of a result set with these column names.
+    A column name which is used twice refers to the last column (like dict(zip(names, row))).
+    """
+    names = tuple(names)
+    cls = _row_classes.get(names)
+    if cls is None:
+        if len(_row_classes) >= _ROW_CLASSES_MAX:
+            # ad-hoc queries of a long running process (etl.py --serve)
+            _row_classes.clear()
+        index = dict((name, i) for (i, name) in enumerate(names))
+        cls = type('Row', (Row,), {'__slots__': (), '_fields': names, '_index': index})
+        cls = _row_classes.setdefault(names, cls)
+    return cls
+
+def _make_row(names, values):
+    return row_class(names)(values)
+
 # DB-API 2.0 Module Interface Exceptions
 class Error(exceptions.StandardError):
     pass
@@ -182,6 +254,24 @@ def TimeFromTicks(ticks):
 def TimestampFromTicks(ticks):
     return apply(Timestamp, time.localtime(ticks)[:6])
 
+# Called once per executed statement, see set_statement_listener()
+_statement_listener = None
+
+# Count the characters of the fetched string values for the listener
+_count_chars = False
+
+def set_statement_listener(listener, count_chars=False):
+    """listener(operation, prepare_time, execute_time, fetch_time, rows, chars)
+    is called when a cursor has finished a statement (closed, or the next statement
+    is executed): the seconds spent to prepare, execute and fetch it, the rows fetched
+    and, with count_chars, the characters of the fetched string values (0 otherwise:
+    counting costs a type check per value). None removes the listener.
+    """
+    global _statement_listener
+    global _count_chars
+    _statement_listener = listener
+    _count_chars = count_chars
+
 # DB-API 2.0 Module Interface connect constructor
 def connect(jclassname, *args):
     jconn = _jdbc_connect(jclassname, *args)
@@ -192,10 +282,100 @@ class Connection(object):
 
     jconn = None
 
+    # Max. number of prepared statements kept open per connection (0: no cache)
+    statement_cache_size = 32
+
     def __init__(self, jconn):
         self.jconn = jconn
+        # SQL text -> prepared statement, the most recently used one last
+        self._statements = collections.OrderedDict()
+        # ids of the cached statements which are used by an open cursor
+        self._statements_in_use = set()
+        # id of a cached statement -> the fetch size set on it
+        self._statement_fetch_sizes = {}
+        self._statement_cache_hits = 0
+        self._statement_cache_misses = 0
+        self._statement_cache_evictions = 0
+        # the cursors with an executed statement which is not closed yet
+        self._open_cursors = weakref.WeakSet()
+
+    #####################
+    # Private Functions #
+    #####################
+    def _prepare(self, operation):
+        """Returns (prepared statement, True if it is a cached statement).
+        A cached statement is used by one cursor at a time: while it is in use
+        (e.g. its result set is still read), an uncached statement is prepared.
+        """
+        prep = self._statements.get(operation)
+        if prep is not None and id(prep) not in self._statements_in_use:
+            self._statement_cache_hits += 1
+            # move to the end (most recently used)
+            del self._statements[operation]
+            self._statements[operation] = prep
+            self._statements_in_use.add(id(prep))
+            return (prep, True)
+        self._statement_cache_misses += 1
+        prep = self.jconn.prepareStatement(operation)
+        if self.statement_cache_size <= 0 or operation in self._statements:
+            return (prep, False)
+        while len(self._statements) >= self.statement_cache_size:
+            (evicted_operation, evicted) = self._statements.popitem(last=False)
+            self._statement_cache_evictions += 1
+            self._statement_fetch_sizes.pop(id(evicted), None)
+            if id(evicted) in self._statements_in_use:
+                # still used by a cursor, it is closed by the cursor
+                self._statements_in_use.discard(id(evicted))
+                continue
+            evicted.close()
+        self._statements[operation] = prep
+        self._statements_in_use.add(id(prep))
+        return (prep, True)
+
+    def _set_fetch_size(self, prep, fetch_size):
+        """Set the fetch size on the statement before it is executed (None: the driver default).
+        A cached statement keeps its fetch size, so it is only set when it changes.
+        """
+        if self._statement_fetch_sizes.get(id(prep)) == fetch_size:
+            return
+        prep.setFetchSize(fetch_size or 0)
+        if id(prep) in self._statements_in_use:
+            self._statement_fetch_sizes[id(prep)] = fetch_size
+
+    def _release(self, prep, cached):
+        """Called by the cursor when it does not use the statement any more"""
+        if cached and id(prep) in self._statements_in_use:
+            self._statements_in_use.discard(id(prep))
+            # The rows added by a failed executemany must not be sent with the next batch
+            prep.clearBatch()
+            prep.clearParameters()
+        else:
+            # not cached, or evicted while it was in use
+            prep.close()
+
+    ####################
+    # Public Functions #
+    ####################
+    def has_open_cursors(self):
+        """True while a cursor of the connection has a statement (e.g. a result set) which is not closed"""
+        return len(self._open_cursors) > 0
+
+    def statement_cache_info(self):
+        """Returns the hits, misses and evictions of the prepared statement cache"""
+        return {'hits': self._statement_cache_hits,
+                'misses': self._statement_cache_misses,
+                'evictions': self._statement_cache_evictions,
+                'size': len(self._statements)}
 
     def close(self):
+        for prep in self._statements.values():
+            try:
+                prep.close()
+            except Exception:
+                pass
+        self._statements.clear()
+        self._statements_in_use.clear()
+        self._statement_fetch_sizes.clear()
         self.jconn.close()
 
     def commit(self):
@@ -213,8 +393,23 @@ class Cursor(object):
     rowcount     = -1
     _meta        = None
     _prep        = None
+    _prep_cached = False
     _rs          = None
     _description = None
+    # Converter plan of the open result set, see _buildConverterPlan()
+    _columnCount = 0
+    _columnTypes = None
+    _columnNames = None
+    _converterPlan = None
+    _rowClass    = None
+    # Timings of the open statement, reported to the statement listener by _close_last()
+    _operation     = None
+    _prepare_time  = 0.0
+    _execute_time  = 0.0
+    _fetch_time    = 0.0
+    _rows_fetched  = 0
+    _chars_fetched = 0
+    _count_chars   = False
 
     def __init__(self, connection):
         self._connection = connection
@@ -228,20 +423,86 @@ class Cursor(object):
         if self._rs:
             self._rs.close()
 
+        if self._operation is not None:
+            self._report()
+
         if self._prep:
-            self._prep.close()
+            # a cached statement stays open for the next execute of the same SQL
+            self._connection._release(self._prep, self._prep_cached)
+        self._connection._open_cursors.discard(self)
 
+        self._prep        = None
+        self._prep_cached = False
         self._rs          = None
         self._meta        = None
         self._description = None
+        self._columnCount   = 0
+        self._columnTypes   = None
+        self._columnNames   = None
+        self._converterPlan = None
+        self._rowClass      = None
+
+    def _buildConverterPlan(self):
+        """Read the column count, SQL types and names of the result set once.
+        Each call of getColumnCount/getColumnType/getColumnName is a call into the JVM,
+        so they must not be done for every row.
+        _converterPlan: a list of (column index, converter or None)
+        _rowClass: the Row class of the result set (see row_class())
+        """
+        m = self._meta
+        self._columnCount   = m.getColumnCount()
+        self._columnTypes   = []
+        self._columnNames   = []
+        self._converterPlan = []
+        converters = _converters or {}
+        for col in range(1, self._columnCount + 1):
+            sqltype = m.getColumnType(col)
+            self._columnTypes.append(sqltype)
+            self._columnNames.append(m.getColumnName(col))
+            self._converterPlan.append((col, converters.get(sqltype)))
+        self._rowClass = row_class(self._columnNames)
+
+    def _start_statement(self, operation):
+        self._operation     = operation
+        self._prepare_time  = 0.0
+        self._execute_time  = 0.0
+        self._fetch_time    = 0.0
+        self._rows_fetched  = 0
+        self._chars_fetched = 0
+        # counting the characters costs a type check per value, so only when it was asked for
+        self._count_chars   = _statement_listener is not None and _count_chars
+
+    def _report(self):
+        operation = self._operation
+        self._operation = None
+        listener = _statement_listener
+        if listener is not None:
+            listener(operation, self._prepare_time, self._execute_time, self._fetch_time, self._rows_fetched, self._chars_fetched)
+
+    def _count_row_chars(self, row):
+        chars = 0
+        for v in row:
+            if isinstance(v, basestring):
+                chars += len(v)
+        self._chars_fetched += chars
 
     def _convertRowToHash(self,row):
-       newRow   = {}
-       rowIndex = 1
-       for value in row:
-           newRow[self._meta.getColumnName(rowIndex)] = value
-           rowIndex += 1
-       return newRow
+       return row.as_dict()
+
+    def _toColumnArray(self, sqltype, values, nulls):
+        """A NumPy array for numeric columns (a masked array if the column has NULL values),
+        the list itself for all other columns or when NumPy is not installed.
+        """
+        dtype = (_array_types or {}).get(sqltype)
+        if dtype is None:
+            return values
+        try:
+            import numpy
+        except ImportError:
+            return values
+        if True in nulls:
+            return numpy.ma.array([0 if v is None else v for v in values], dtype=dtype, mask=nulls)
+        return numpy.array(values, dtype=dtype)
 
     ####################
     # Public Functions #
@@ -281,17 +542,28 @@ class Cursor(object):
         for i in range(len(parameters)):
             prep_stmt.setObject(i + 1, parameters[i])
 
-    def execute(self, operation, parameters=None):
+    def execute(self, operation, parameters=None, fetch_size=None):
+        """fetch_size: the number of rows the driver fetches at a time (set once on the statement);
+        MySQL streams the rows one by one with -2147483648 (Integer.MIN_VALUE)
+        """
         if not parameters:
             parameters = ()
         self._close_last()
-        self._prep = self._connection.jconn.prepareStatement(operation)
+        self._start_statement(operation)
+        start = time.time()
+        (self._prep, self._prep_cached) = self._connection._prepare(operation)
+        self._connection._open_cursors.add(self)
+        self._connection._set_fetch_size(self._prep, fetch_size)
+        prepared = time.time()
+        self._prepare_time = prepared - start
         self._set_stmt_parms(self._prep, parameters)
         is_rs = self._prep.execute()
         self.update_count = self._prep.getUpdateCount()
         if is_rs:
             self._rs = self._prep.getResultSet()
             self._meta = self._rs.getMetaData()
+            self._buildConverterPlan()
+        self._execute_time = time.time() - prepared
         # self._prep.getWarnings() ???
     
     def executeInsert(self, sqlText, parameters=None):
@@ -299,75 +571,168 @@ class Cursor(object):
             parameters = ()
 
         self._close_last()
+        self._start_statement(sqlText)
+        start = time.time()
 
+        insertId = None
         stmt = self._connection.jconn.createStatement()
         stmt.executeUpdate(sqlText, stmt.RETURN_GENERATED_KEYS)
         rs = stmt.getGeneratedKeys()
         if rs.next():
            insertId = rs.getInt(1) 
         stmt.close()        
+        self._execute_time = time.time() - start
+        self._report()
         return insertId
  
     def executemany(self, operation, seq_of_parameters):
         self._close_last()
-        self._prep = self._connection.jconn.prepareStatement(operation)
+        self._start_statement(operation)
+        start = time.time()
+        (self._prep, self._prep_cached) = self._connection._prepare(operation)
+        self._connection._open_cursors.add(self)
+        prepared = time.time()
+        self._prepare_time = prepared - start
         for parameters in seq_of_parameters:
             self._set_stmt_parms(self._prep, parameters)
             self._prep.addBatch()
         update_counts = self._prep.executeBatch()
+        self._execute_time = time.time() - prepared
         # self._prep.getWarnings() ???
-        self.rowcount = sum(update_counts)
+        self.update_counts = list(update_counts)
+        # Statement.SUCCESS_NO_INFO (-2): the statement succeeded but the count is unknown
+        self.rowcount = sum([count for count in self.update_counts if count > 0])
         self._close_last()
 
-    def fetchone(self):
+    def _fetch_row(self):
         #raise if not rs
         if not self._rs.next():
             return None
+        getObject = self._rs.getObject
         row = []
-        for col in range(1, self._meta.getColumnCount() + 1):
-            sqltype = self._meta.getColumnType(col)
-            # print sqltype
+        for (col, converter) in self._converterPlan:
             # TODO: Oracle 11 will read a oracle.sql.TIMESTAMP
             # which can't be converted to string easyly
-            v = self._rs.getObject(col)
-            if v:
-                converter = _converters.get(sqltype)
-                if converter:
-                    v = converter(v)
+            v = getObject(col)
+            if converter is not None and v is not None:
+                v = converter(v)
             row.append(v)
-        return tuple(row)
+        self._rows_fetched += 1
+        if self._count_chars:
+            self._count_row_chars(row)
+        return self._rowClass(row)
+
+    def fetchone(self):
+        """The next row as a Row (a tuple which can also be read by column name), None at the end
+        """
+        start = time.time()
+        try:
+            return self._fetch_row()
+        finally:
+            self._fetch_time += time.time() - start
 
     def fetchmany(self, size=None, convertToHash=False):
         if size is None:
             size = self.arraysize
-        # TODO: handle SQLException if not supported by db
-        self._rs.setFetchSize(size)
+        # The fetch size of the driver is set once by execute(fetch_size=...)
         rows = []
         row = None
-        for i in xrange(size):
-            row = self.fetchone()
-            if row is None:
-                break
-            elif convertToHash:
-                rows.append(self._convertRowToHash(row))
-            else:
-                rows.append(row)
-        # reset fetch size
-        if row:
-            # TODO: handle SQLException if not supported by db
-            self._rs.setFetchSize(0)
+        start = time.time()
+        try:
+            for i in xrange(size):
+                row = self._fetch_row()
+                if row is None:
+                    break
+                elif convertToHash:
+                    rows.append(self._convertRowToHash(row))
+                else:
+                    rows.append(row)
+        finally:
+            self._fetch_time += time.time() - start
         return rows
 
-    def fetchall(self, convertToHash=False):
-        rows = []
+    def fetch_columns(self, size=None, convertToHash=False):
+        """Fetch up to size rows and return them column by column:
+        a list with one array per column (a dict column name -> array with convertToHash).
+        INTEGER/SMALLINT/BIGINT columns are read with getLong() and DOUBLE/FLOAT/DECIMAL/NUMERIC
+        columns with getDouble(), which return Python numbers without a converter, and are returned
+        as NumPy arrays. All other columns are returned as lists of the same values as fetchone().
+        Returns an empty list when there are no more rows.
+        """
+        if size is None:
+            size = self.arraysize
+        rs = self._rs
+        types   = _array_types or {}
+        plan    = []
+        columns = []
+        for (col, converter) in self._converterPlan:
+            sqltype = self._columnTypes[col - 1]
+            if sqltype in types:
+                getter = rs.getDouble if types[sqltype] == 'float64' else rs.getLong
+            else:
+                getter = None
+            plan.append((col, converter, getter, [], []))
+        wasNull = rs.wasNull
+        rowCount = 0
+        start = time.time()
+        while rowCount < size and rs.next():
+            rowCount += 1
+            for (col, converter, getter, values, nulls) in plan:
+                if getter is not None:
+                    v = getter(col)
+                    isNull = wasNull()
+                    values.append(None if isNull else v)
+                    nulls.append(isNull)
+                else:
+                    v = rs.getObject(col)
+                    if converter is not None and v is not None:
+                        v = converter(v)
+                    values.append(v)
+        self._fetch_time += time.time() - start
+        self._rows_fetched += rowCount
+        if self._count_chars:
+            for (col, converter, getter, values, nulls) in plan:
+                if getter is None:
+                    self._count_row_chars(values)
+        if rowCount == 0:
+            return []
+        for (col, converter, getter, values, nulls) in plan:
+            columns.append(self._toColumnArray(self._columnTypes[col - 1], values, nulls))
+        if convertToHash:
+            return dict(zip(self._columnNames, columns))
+        return columns
+
+    def fetchall_columns(self, size=None, convertToHash=False):
+        """Fetch all rows with fetch_columns(size) and concatenate the blocks
+        """
+        blocks = []
         while True:
-            row = self.fetchone()
-            if row is None:
+            block = self.fetch_columns(size)
+            if not block:
                 break
-            elif convertToHash:
-                rows.append(self._convertRowToHash(row))
-            else:
-                rows.append(row)
+            blocks.append(block)
+        columns = []
+        for index in range(self._columnCount):
+            parts = [block[index] for block in blocks]
+            columns.append(_concat_column(parts, self._columnTypes[index]))
+        if convertToHash:
+            return dict(zip(self._columnNames, columns))
+        return columns
+
+    def fetchall(self, convertToHash=False):
+        rows = []
+        start = time.time()
+        try:
+            while True:
+                row = self._fetch_row()
+                if row is None:
+                    break
+                elif convertToHash:
+                    rows.append(self._convertRowToHash(row))
+                else:
+                    rows.append(row)
+        finally:
+            self._fetch_time += time.time() - start
         return rows
 
     # optional nextset() unsupported
@@ -380,17 +745,36 @@ class Cursor(object):
     def setoutputsize(self, size, column):
         pass
 
+    def set_decimal_mode(self, mode):
+        """How the DECIMAL/NUMERIC columns of the open result set are returned by
+        fetchone(), fetchmany() and fetchall(), whatever the mode of set_decimal_mode() is
+        (e.g. 'string' to write the exact digits into a file)
+        """
+        if mode not in _DECIMAL_CONVERTERS:
+            raise ValueError("Unknown decimal mode '%s' (%s)" % (mode, ', '.join(sorted(_DECIMAL_CONVERTERS))))
+        if self._converterPlan is None:
+            return
+        decimal_types = [_types_map[i] for i in _DECIMAL_TYPES]
+        converter = _DECIMAL_CONVERTERS[mode]
+        self._converterPlan = [(col, converter if self._columnTypes[col - 1] in decimal_types else c)
+                               for (col, c) in self._converterPlan]
+
 def _to_datetime(java_val):
-    d = datetime.datetime.strptime(str(java_val)[:19], "%Y-%m-%d %H:%M:%S")
-    if not isinstance(java_val, basestring):
-        d = d.replace(microsecond=int(str(java_val.getNanos())[:6]))
-    return str(d)
-    # return str(java_val)
+    """java.sql.Timestamp -> 'YYYY-MM-DD HH:MM:SS[.ffffff]' (the same string as str(datetime))
+    Timestamp.toString() is 'YYYY-MM-DD HH:MM:SS.f' with 1 to 9 fraction digits,
+    so one call into the JVM and slicing is enough (no strptime, no getNanos()).
+    """
+    s = str(java_val)
+    if isinstance(java_val, basestring) or len(s) < 21:
+        return s[:19]
+    microseconds = s[20:26]
+    if microseconds.strip('0') == '':
+        return s[:19]
+    return '%s.%s' % (s[:19], microseconds.ljust(6, '0'))
 
 def _to_date(java_val):
-    d = datetime.datetime.strptime(str(java_val)[:10], "%Y-%m-%d")
-    return d.strftime("%Y-%m-%d")
-    # return str(java_val)
+    """java.sql.Date -> 'YYYY-MM-DD' (Date.toString() is already in this format)"""
+    return str(java_val)[:10]
 
 def _to_string(java_val):
     return str(java_val)
@@ -406,27 +790,213 @@ _to_double = _java_to_py('doubleValue')
 
 _to_int = _java_to_py('intValue')
 
+def _to_decimal(java_val):
+    """java.math.BigDecimal -> decimal.Decimal with all digits (doubleValue() keeps ~15 digits)"""
+    if isinstance(java_val, basestring):
+        return decimal.Decimal(java_val)
+    if isinstance(java_val, (int, long)):
+        return decimal.Decimal(java_val)
+    if isinstance(java_val, float):
+        return decimal.Decimal(repr(java_val))
+    return decimal.Decimal(java_val.toPlainString())
+
+def _to_plain_string(java_val):
+    """java.math.BigDecimal -> its digits as a string (no exponent), e.g. for extract files"""
+    if isinstance(java_val, basestring):
+        return java_val
+    if isinstance(java_val, (int, long, float)):
+        return repr(java_val)
+    return java_val.toPlainString()
+
+def _java_bytes(jarr):
+    """A Java byte[] as a str. The slice of a JPype byte array is copied in one
+    block (a str); older JPype versions return a sequence of signed bytes, which is
+    packed without a Python loop.
+    """
+    data = jarr[:]
+    if isinstance(data, str):
+        return data
+    return struct.pack('%db' % len(data), *data)
+
+def _to_bytes(java_val):
+    """BINARY/VARBINARY/LONGVARBINARY (byte[]) -> str, e.g. the 16 bytes of a binary(16) UUID"""
+    if isinstance(java_val, str):
+        return java_val
+    return _java_bytes(java_val)
+
+# BLOB/CLOB values up to this number of bytes/characters are returned as str/unicode,
+# larger ones as a LobStream, see set_lob_inline_size()
+_lob_inline_size = 1024 * 1024
+
+def set_lob_inline_size(size):
+    global _lob_inline_size
+    _lob_inline_size = size
+
+class LobStream(object):
+    """A large BLOB or CLOB value, read in chunks with read(size) or by iterating over it.
+    It must be read before the cursor is closed (some drivers only keep the LOB of the current row).
+    """
+    chunk_size = 1024 * 1024
+
+    def __init__(self, jlob, binary):
+        self._lob = jlob
+        self._binary = binary
+        self._position = 1
+        self.length = jlob.length()
+
+    def read(self, size=-1):
+        remaining = self.length - self._position + 1
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        if size <= 0:
+            return '' if self._binary else u''
+        if self._binary:
+            data = _java_bytes(self._lob.getBytes(self._position, size))
+        else:
+            data = self._lob.getSubString(self._position, size)
+        self._position += size
+        return data
+
+    def __iter__(self):
+        while True:
+            data = self.read(self.chunk_size)
+            if not data:
+                break
+            yield data
+
+    def close(self):
+        """Release the resources of the LOB (Blob.free() of JDBC 4)"""
+        try:
+            self._lob.free()
+        except Exception:
+            pass
+
+def _to_blob(java_val):
+    if isinstance(java_val, str):
+        return java_val
+    if java_val.length() > _lob_inline_size:
+        return LobStream(java_val, True)
+    return _java_bytes(java_val.getBytes(1, java_val.length()))
+
+def _to_clob(java_val):
+    if isinstance(java_val, basestring):
+        return java_val
+    if java_val.length() > _lob_inline_size:
+        return LobStream(java_val, False)
+    return java_val.getSubString(1, java_val.length())
+
+# Converters of DECIMAL/NUMERIC per decimal mode, see set_decimal_mode()
+_DECIMAL_CONVERTERS = {
+    'double': _to_double,
+    'decimal': _to_decimal,
+    'string': _to_plain_string,
+}
+
+_DECIMAL_TYPES = ('DECIMAL', 'NUMERIC')
+
+_decimal_mode = 'double'
+
+def set_decimal_mode(mode):
+    """How DECIMAL/NUMERIC values are returned by all cursors:
+    double : float (default, the precision of a double)
+    decimal: decimal.Decimal with all digits
+    string : the digits as a string
+    With decimal and string, fetch_columns() returns these columns as lists
+    instead of float64 arrays.
+    """
+    global _decimal_mode
+    if mode not in _DECIMAL_CONVERTERS:
+        raise ValueError("Unknown decimal mode '%s' (%s)" % (mode, ', '.join(sorted(_DECIMAL_CONVERTERS))))
+    _decimal_mode = mode
+    if _types_map is not None:
+        _apply_decimal_mode(_converters, _array_types, _types_map)
+
+def get_decimal_mode():
+    return _decimal_mode
+
+def _apply_decimal_mode(converters, array_types, types_map):
+    for i in _DECIMAL_TYPES:
+        const_val = types_map[i]
+        converters[const_val] = _DECIMAL_CONVERTERS[_decimal_mode]
+        if _decimal_mode == 'double':
+            array_types[const_val] = _ARRAY_TYPES[i]
+        else:
+            array_types.pop(const_val, None)
+
+def _concat_column(parts, sqltype):
+    """Concatenate the blocks of one column returned by fetch_columns()"""
+    if not parts:
+        return _empty_column(sqltype)
+    if isinstance(parts[0], list):
+        column = []
+        for part in parts:
+            column.extend(part)
+        return column
+    import numpy
+    if True in [isinstance(part, numpy.ma.MaskedArray) for part in parts]:
+        return numpy.ma.concatenate(parts)
+    return numpy.concatenate(parts)
+
+def _empty_column(sqltype):
+    dtype = (_array_types or {}).get(sqltype)
+    if dtype is None:
+        return []
+    try:
+        import numpy
+    except ImportError:
+        return []
+    return numpy.array([], dtype=dtype)
+
 def _init_converters(types_map):
     """Prepares the converters for conversion of java types to python
     objects.
     types_map: Mapping of java.sql.Types field name to java.sql.Types
     field constant value"""
     global _converters
-    _converters = {}
+    global _array_types
+    global _types_map
+    converters = {}
     for i in _DEFAULT_CONVERTERS:
         const_val = types_map[i]
-        _converters[const_val] = _DEFAULT_CONVERTERS[i]
+        converters[const_val] = _DEFAULT_CONVERTERS[i]
+    array_types = {}
+    for i in _ARRAY_TYPES:
+        array_types[types_map[i]] = _ARRAY_TYPES[i]
+    _apply_decimal_mode(converters, array_types, types_map)
+    _types_map = types_map
+    _array_types = array_types
+    _converters = converters
 
 # Mapping from java.sql.Types field to converter method
 _converters = None
 
+# Mapping from java.sql.Types field name to java.sql.Types field constant value
+_types_map = None
+
+# Mapping from java.sql.Types field to the NumPy dtype of fetch_columns()
+_array_types = None
+
+_ARRAY_TYPES = {
+    'INTEGER': 'int64',
+    'SMALLINT': 'int64',
+    'BIGINT': 'int64',
+    'DECIMAL': 'float64',
+    'NUMERIC': 'float64',
+    'DOUBLE': 'float64',
+    'FLOAT': 'float64',
+}
+
 _DEFAULT_CONVERTERS = {
     # see
     # http://download.oracle.com/javase/1.4.2/docs/api/java/sql/Types.html
     # for possible keys
     'TIMESTAMP': _to_datetime,
     'DATE': _to_date,
-    'BINARY': _to_string,
+    'BINARY': _to_bytes,
+    'VARBINARY': _to_bytes,
+    'LONGVARBINARY': _to_bytes,
+    'BLOB': _to_blob,
+    'CLOB': _to_clob,
     'DECIMAL': _to_double,
     'NUMERIC': _to_double,
     'DOUBLE': _to_double,
@@ -3,23 +3,44 @@ import codecs
 import logging
 import os.path
 import sys
+import threading
 import uuid
 from datetime import datetime, timedelta
 
-from modules.base.jdbc        import JDBC
+from modules.base.jdbc        import JDBC, getStatementFetchSize
 from modules.base.constants   import *
 from modules.base.exceptions  import ReleaseTableMissing
 from modules.base.database    import Database
 from modules.base.environment import Environment
+from modules.base.native_db   import NativeDB
+from modules.base.profiler    import Profiler
+from modules.r10_jdbc.dbapi2  import row_class
 import modules.base.etl_util as etl_util
 
 class TeradataDB(Database):
     '''
     This class is for all Teradata DB specific functionality
     '''
+    # Parsed .tera_<user>_pass files, shared by all TeradataDB/Fastload/TPT objects of the process
+    # Key: (password file path, ENV_ID, TDPID)  Value: ((mtime, size), variables, cleaned variables)
+    _teraPassCache = {}
+    _teraPassLock  = threading.Lock()
+
+    # Names of the fields of HELP TABLE returned by getTableDefinition (in the order of HELP TABLE)
+    HELP_TABLE_FIELDS = ('column_name'            , 'type'                 , 'comment'                   ,
+                         'nullable'               , 'format'               , 'title'                     ,
+                         'max_length'             , 'decimal_total_digits' , 'decimal_fractional_digits' ,
+                         'range_low'              , 'range_high'           , 'uppercase'                 ,
+                         'table_view'             , 'default_value'        , 'char_type'                 ,
+                         'idcol_type'             , 'udt_name'             , 'temporal'                  ,
+                         'column_dictionary_name' , 'column_sql_name'      , 'column_name_uescape'       ,
+                         'dictionary_title'       , 'sql_title'            , 'title_uescape'             ,
+                         'udt_dictionary_name'    , 'udt_sql_name'         , 'udt_name_uescape')
+
     def __init__(self):
         super(TeradataDB, self).__init__()
-        self.config.read(os.path.join(etl_util.get_app_root_path(), 'conf/modules/teradata.cfg'))
+        with Profiler().phase('config'):
+            self.config.read(os.path.join(etl_util.get_app_root_path(), 'conf/modules/teradata.cfg'))
 
         self.FAST_EXPORT_BTQ_TEMPLATE_FILENAME       = 'templates/teradata/fast_export/etl_api.btq.tmpl'
 
@@ -395,13 +416,10 @@ class TeradataDB(Database):
         '''
         Instanciate JDBC class
         '''
-        (rc, variables) = self._parseTeraPass(user)
-        user     = variables['USER_LOGON'].replace("\n", "").replace("\"", "")
-        password = variables['PASSWORD'].replace("\n", "").replace("\"", "")
+        (user, password, logonUser) = self.getTeraPassCredentials(user)
 
         envJdbcSection  = "%s_%s" % (self.environment, SECTION_JDBC)
 
-        username = variables['USER_LOGON'].replace("\n", "").replace("\"", "")
         connect  = self.config.get(envJdbcSection, CONNECT)
         driver   = self.config.get(envJdbcSection, DRIVER)
         logging.info('user : %s' % user)
@@ -410,9 +428,10 @@ class TeradataDB(Database):
 
     def _closeAllJDBC(self):
         '''
-        Close all JDBC connections (only for current thread)
+        Give back all JDBC (and native driver) connections of the current thread to the pool
         '''
         JDBC()
+        NativeDB()
 
     def _getColumnNames(self, databaseName, tableName, rolename):
         '''
@@ -463,26 +482,11 @@ class TeradataDB(Database):
 
         return cleanFields
 
-    def _parseTeraPass(self, user):
+    def _readTeraPassFile(self, fullFilePath, tdpId):
         '''
-        Parse the environment variables in the teradata password directory
+        Read the variables of a teradata password file
         '''
-        variables      = {}
-        teradataPasswordDirectory = self.config.get(SECTION_DIRECTORIES , PASSWORD_TERADATA_DIRECTORY)
-        tdpId                     = self.config.get(SECTION_TERADATA , TDPID)
-
-
-        # Open the password file
-        filename     = ".tera_%s_pass" % (str(user).lower())
-        fullFilePath = "%s/%s" % (teradataPasswordDirectory, filename)
-
-        # Fix for Windows development
-        if os.name == 'nt':
-            # Scratching my functional programming itch
-            cygPath = ['C:\\', 'cygwin64'] + filter(lambda a: a != '', fullFilePath.split('/'))
-            fullFilePath = os.path.join(*cygPath)
-
-        #logging.debug("tera pass file is: %s" % fullFilePath)
+        variables    = {}
         passwordFile = open(fullFilePath, 'r')
         for line in passwordFile:
             if (line.find(TERA_PASS_USER_LOGON) == 0):
@@ -499,7 +503,60 @@ class TeradataDB(Database):
                line         = line.replace('${PASSWORD}'  , variables[TERA_PASS_PASSWORD])
                logonUserVal = line.split('=')[1]
                variables[TERA_PASS_LOGON_USER] = logonUserVal
-        return (RC_NO_ERROR, variables)
+        passwordFile.close()
+        return variables
+
+    def _getTeraPass(self, user):
+        '''
+        Returns the (variables, cleaned variables) of the teradata password file of the user.
+        The file is parsed once and read again only when it is modified
+        '''
+        teradataPasswordDirectory = self.config.get(SECTION_DIRECTORIES , PASSWORD_TERADATA_DIRECTORY)
+        tdpId                     = self.config.get(SECTION_TERADATA , TDPID)
+
+        # Open the password file
+        filename     = ".tera_%s_pass" % (str(user).lower())
+        fullFilePath = "%s/%s" % (teradataPasswordDirectory, filename)
+
+        # Fix for Windows development
+        if os.name == 'nt':
+            # Scratching my functional programming itch
+            cygPath = ['C:\\', 'cygwin64'] + filter(lambda a: a != '', fullFilePath.split('/'))
+            fullFilePath = os.path.join(*cygPath)
+
+        key = (fullFilePath, self.environmentId, tdpId)
+        try:
+            stat    = os.stat(fullFilePath)
+            fileKey = (stat.st_mtime, stat.st_size)
+        except OSError:
+            # open() raises the error for a missing file
+            fileKey = None
+        with TeradataDB._teraPassLock:
+            cached = TeradataDB._teraPassCache.get(key)
+        if cached is None or fileKey is None or cached[0] != fileKey:
+            variables = self._readTeraPassFile(fullFilePath, tdpId)
+            cleanVariables = {}
+            for (name, value) in variables.iteritems():
+                cleanVariables[name] = value.replace("\n", "").replace("\"", "")
+            cached = (fileKey, variables, cleanVariables)
+            with TeradataDB._teraPassLock:
+                TeradataDB._teraPassCache[key] = cached
+        return (cached[1], cached[2])
+
+    def _parseTeraPass(self, user):
+        '''
+        Parse the environment variables in the teradata password directory
+        '''
+        (variables, cleanVariables) = self._getTeraPass(user)
+        # a copy, so the cached variables can not be changed by the caller
+        return (RC_NO_ERROR, dict(variables))
+
+    def getTeraPassCredentials(self, user):
+        '''
+        Returns (username, password, logon string) of the user without line feeds and double quotes
+        '''
+        (variables, cleanVariables) = self._getTeraPass(user)
+        return (cleanVariables.get(TERA_PASS_USER_LOGON), cleanVariables.get(TERA_PASS_PASSWORD), cleanVariables.get(TERA_PASS_LOGON_USER))
 
     ####################
     # Public Functions #
@@ -540,7 +597,7 @@ class TeradataDB(Database):
                  order by 1
                  """ % (actualDB)
         logging.info(select)
-        resultSet = self.executeSql(logicalDB, select)
+        resultSet = self.iterSql(logicalDB, select)
 
         # Format the results
         dataSet       = {}
@@ -783,19 +840,14 @@ class TeradataDB(Database):
         '''
         actualSchema         = self._getActualTeradataSchema(schema)
         tableDefSql          = 'HELP TABLE %s.%s' % (actualSchema, tablename)
-        tableDefinition      = self.executeSql(schema, tableDefSql, '')
+        with Profiler().phase('help table'):
+            tableDefinition  = self.executeSql(schema, tableDefSql, '')
+        # One Row per column: the field names are shared by all rows instead of a dictionary per column
+        HelpTableRow         = row_class(self.HELP_TABLE_FIELDS)
+        fieldCount           = len(self.HELP_TABLE_FIELDS)
         cleanTableDefinition = []
         for row in tableDefinition:
-            defn = {'column_name':row[0]             , 'type':row[1].strip()         , 'comment':row[2]                   ,
-                    'nullable':row[3]                , 'format':row[4]               , 'title':row[5]                     ,
-                    'max_length':row[6]              , 'decimal_total_digits':row[7] , 'decimal_fractional_digits':row[8] ,
-                    'range_low':row[9]               , 'range_high':row[10]          , 'uppercase':row[11]                ,
-                    'table_view':row[12]             , 'default_value': row[13]      , 'char_type':row[14]                ,
-                    'idcol_type':row[15]             , 'udt_name':row[16]            , 'temporal': row[17]                ,
-                    'column_dictionary_name':row[18] , 'column_sql_name':row[19]     , 'column_name_uescape':row[20]      ,
-                    'dictionary_title':row[21]       , 'sql_title': row[22]          , 'title_uescape':row[23]            ,
-                    'udt_dictionary_name':row[24]    , 'udt_sql_name': row[25]       , 'udt_name_uescape':row[26]}
-            cleanTableDefinition.append(defn)
+            cleanTableDefinition.append(HelpTableRow(row[:1] + (row[1].strip(),) + row[2:fieldCount]))
 
         return cleanTableDefinition
 
@@ -821,10 +873,12 @@ class TeradataDB(Database):
         logging.debug("Unique Primary Index of %s.%s is %s" % (envDbName, table, primaryIndex))
         return primaryIndex
 
-    def executeSql(self, dbName, sql, parameters=None, isolation=0, fetch=100, convertToHash=False):
+    def _executeCursor(self, dbName, sql, parameters=None, isolation=0, fetch=None, fetchStrategy=None, fetchSize=None):
         """
-        The following ways are used for improving performance
-            -fetchmany
+        Executes a query through JDBC and returns the open cursor
+
+            -fetch, fetchStrategy, fetchSize: see Database._getFetchStrategy
+                fetch_strategy/fetch_size can be set in [<environment>_jdbc] of teradata.cfg
 
             -isolation='READ UNCOMMITTED'
                 '': use default
@@ -832,12 +886,10 @@ class TeradataDB(Database):
                 'SERIALIZABLE'
         """
         #TODO: replace with _getJDBC()
-        (rc, variables) = self._parseTeraPass(dbName)
+        (username, password, logonUser) = self.getTeraPassCredentials(dbName)
         envJdbcSection  = "%s_%s" % (self.environment, SECTION_JDBC)
         url             = self.config.get(envJdbcSection, CONNECT)
         driver          = self.config.get(envJdbcSection, DRIVER)
-        username        = variables['USER_LOGON'].replace("\n", "").replace("\"", "")
-        password        = variables['PASSWORD'].replace("\n", "").replace("\"", "")
         #logging.debug('JDBC URL=%s' % url)
         # Parameters not included
         logging.debug('SQL=\n%s' % sql)
@@ -854,29 +906,81 @@ class TeradataDB(Database):
             if isolation==4:
                 isolation='SERIALIZABLE'
 
-            jdbc = JDBC(url, driver, username, password,isolation)
+            (fetchStrategy, fetchSize) = self._getFetchStrategy(envJdbcSection, fetch, fetchStrategy, fetchSize)
+
+            jdbc = self._connect(envJdbcSection, url, driver, username, password, isolation)
 
             # Get Database Cursor
-            cursor = jdbc.execute(sql, parameters)
+            return jdbc.execute(sql, parameters, getStatementFetchSize(driver, fetchStrategy, fetchSize))
 
-            # Execute SQL
-            result_list = []
+        except Exception, msg:
+            logging.error(msg)
+            raise
 
-            # Retrieve the result set
-            if (cursor._rs is not None):
-                records = cursor.fetchmany(fetch, convertToHash)
-                while records:
+    def iterSql(self, dbName, sql, parameters=None, isolation=0, fetch=100, convertToHash=False, batch=False, fetchStrategy=None, fetchSize=None):
+        """
+        Executes a query and yields the records one by one (lists of up to fetch records with batch=True)
+
+        Only one fetchmany block is held in memory. The cursor (and the result set) is closed
+        when the loop ends, raises, or the generator is closed. Use closing() to close it
+        as soon as the loop is left with break:
+            with contextlib.closing(self.iterSql(database, sql)) as records:
+                for record in records:
+                    ...
+        """
+        cursor = self._executeCursor(dbName, sql, parameters, isolation, fetch, fetchStrategy, fetchSize)
+        try:
+            if (cursor._rs is None):
+                return
+            records = cursor.fetchmany(fetch, convertToHash)
+            while records:
+                if batch:
+                    yield records
+                else:
                     for record in records:
-                        result_list.append(record)
-                    records = cursor.fetchmany(fetch, convertToHash)
-
+                        yield record
+                records = cursor.fetchmany(fetch, convertToHash)
+        except GeneratorExit:
+            raise
+        except Exception, msg:
+            logging.error(msg)
+            raise
+        finally:
             # Close Database Cursor
             cursor.close()
 
+    def executeSql(self, dbName, sql, parameters=None, isolation=0, fetch=100, convertToHash=False, columnar=False, fetchStrategy=None, fetchSize=None):
+        """
+        The following ways are used for improving performance
+            -fetchmany
+
+            -fetchStrategy, fetchSize: see Database._getFetchStrategy (Teradata only supports 'fixed')
+
+            -columnar=True
+                the result is returned column by column (see Cursor.fetch_columns):
+                a list of columns (a dict column name -> column with convertToHash),
+                numeric columns are NumPy arrays if NumPy is installed
+
+            -isolation='READ UNCOMMITTED'
+                '': use default
+                'READ UNCOMMITTED'
+                'SERIALIZABLE'
+
+        The whole result set is returned as a list; use iterSql() for large result sets
+        """
+        if not columnar:
+            return list(self.iterSql(dbName, sql, parameters, isolation, fetch, convertToHash, fetchStrategy=fetchStrategy, fetchSize=fetchSize))
+
+        cursor = self._executeCursor(dbName, sql, parameters, isolation, fetch, fetchStrategy, fetchSize)
+        try:
+            if (cursor._rs is None):
+                return []
+            return cursor.fetchall_columns(fetch, convertToHash)
         except Exception, msg:
             logging.error(msg)
             raise
-        return result_list
+        finally:
+            cursor.close()
 
     def executeDDL(self, dbName, sql,isolation=0):
         """
@@ -892,12 +996,10 @@ class TeradataDB(Database):
         Raises:
             Exception: database connection error
         """
-        (rc, variables) = self._parseTeraPass(dbName)
+        (username, password, logonUser) = self.getTeraPassCredentials(dbName)
         envJdbcSection  = "%s_%s" % (self.environment, SECTION_JDBC)
         url             = self.config.get(envJdbcSection, CONNECT)
         driver          = self.config.get(envJdbcSection, DRIVER)
-        username        = variables['USER_LOGON'].replace("\n", "").replace("\"", "")
-        password        = variables['PASSWORD'].replace("\n", "").replace("\"", "")
         logging.debug('JDBC URL=%s' % url)
         # Parameters not included
         logging.debug('SQL=%s' % sql)
@@ -914,7 +1016,7 @@ class TeradataDB(Database):
                 isolation='SERIALIZABLE'
             if isolation==4:
                 isolation='SERIALIZABLE'
-            jdbc = JDBC(url, driver, username, password,isolation)
+            jdbc = self._connect(envJdbcSection, url, driver, username, password, isolation)
 
             # Execute SQL
             result = jdbc.execute(sql, None)
@@ -928,12 +1030,10 @@ class TeradataDB(Database):
         '''
         Inserts data and returns the id of the last inserted record
         '''
-        (rc, variables) = self._parseTeraPass(dbName)
+        (username, password, logonUser) = self.getTeraPassCredentials(dbName)
         envJdbcSection  = "%s_%s" % (self.environment, SECTION_JDBC)
         url             = self.config.get(envJdbcSection, CONNECT)
         driver          = self.config.get(envJdbcSection, DRIVER)
-        username        = variables['USER_LOGON'].replace("\n", "").replace("\"", "")
-        password        = variables['PASSWORD'].replace("\n", "").replace("\"", "")
         logging.debug('JDBC URL=%s' % url)
 
         # Parameters not included
@@ -944,6 +1044,30 @@ class TeradataDB(Database):
 
         return lastGeneratedID
 
+    def executeMany(self, dbName, sql, rows, batchSize=1000, autoCommit=False):
+        '''
+        Executes a parameterized statement (INSERT/UPDATE/DELETE with ? markers) for all rows,
+        batchSize rows per round-trip (see JDBC.bulkInsert).
+        Returns a list of (rows sent, rows updated) per batch
+        '''
+        (username, password, logonUser) = self.getTeraPassCredentials(dbName)
+        envJdbcSection  = "%s_%s" % (self.environment, SECTION_JDBC)
+        url             = self.config.get(envJdbcSection, CONNECT)
+        driver          = self.config.get(envJdbcSection, DRIVER)
+
+        # Parameters not included
+        logging.debug('SQL=\n%s' % sql)
+        try:
+            jdbc        = JDBC(url, driver, username, password)
+            batchCounts = jdbc.bulkInsert(sql, rows, batchSize, autoCommit)
+        except Exception, msg:
+            logging.error(msg)
+            raise
+        totalSent    = sum([batch[0] for batch in batchCounts])
+        totalUpdated = sum([batch[1] for batch in batchCounts])
+        logging.info("%d rows sent in %d batches, %d rows updated" % (totalSent, len(batchCounts), totalUpdated))
+        return batchCounts
+
     def insertFromTemp(self, database, tmpTable, table, primaryKey, mode=DEFAULT_MODE):
         '''
         Inserts data from the tmpTable into table, via its primary key
@@ -1043,7 +1167,7 @@ class TeradataDB(Database):
 
         #execute sql
         #logging.info(sql)
-        recordSet = self.executeSql(TERADATA_READ_USER,sql,'')
+        recordSet = self.iterSql(TERADATA_READ_USER,sql,'')
 
         for rec in recordSet:
             dbname      = rec[0].encode('utf8').strip()
@@ -1077,7 +1201,7 @@ class TeradataDB(Database):
 
         # Process Results
         tableList = []
-        recordSet = self.executeSql(account,sql,'')
+        recordSet = self.iterSql(account,sql,'')
 
         for rec in recordSet:
             tablename      = rec[0].encode('utf8').strip()
@@ -1105,16 +1229,14 @@ class TeradataDB(Database):
 
         # Create JDBC object
         if account:
-            (rc, variables) = self._parseTeraPass(account)
+            (username, password, logonUser) = self.getTeraPassCredentials(account)
         else:
-            (rc, variables) = self._parseTeraPass(schema)
+            (username, password, logonUser) = self.getTeraPassCredentials(schema)
 
         envJdbcSection  = "%s_%s" % (self.environment, SECTION_JDBC)
         url             = self.config.get(envJdbcSection, CONNECT)
         driver          = self.config.get(envJdbcSection, DRIVER)
-        username        = variables['USER_LOGON'].replace("\n", "").replace("\"", "")
-        password        = variables['PASSWORD'].replace("\n", "").replace("\"", "")
-        jdbc            = JDBC(url, driver, username, password)
+        jdbc            = self._connect(envJdbcSection, url, driver, username, password)
         logging.debug('JDBC URL=%s' % url)
 
         # Query data dictionary if table exists
@@ -1159,7 +1281,8 @@ class TeradataDB(Database):
 
             # Get Definition
             tableDefSql = 'HELP TABLE %s.%s' % (actual_schema, table_teradata)
-            tableDefinitionTera = self.executeSql(schema_teradata, tableDefSql, '')
+            with Profiler().phase('help table'):
+                tableDefinitionTera = self.executeSql(schema_teradata, tableDefSql, '')
 
             # Get clobCount
             for definition_tera in tableDefinitionTera:
@@ -1261,9 +1384,7 @@ class TeradataDB(Database):
         return returncode
 
     def getTeradataLogonInfo(self, database):
-        teraPassInfo = self._parseTeraPass(database)[1]
-        username = teraPassInfo[TERA_PASS_USER_LOGON].replace('"','').replace('\n','')
-        password = teraPassInfo[TERA_PASS_PASSWORD].replace('"','').replace('\n','')
+        (username, password, logonUser) = self.getTeraPassCredentials(database)
         tdpid = self.config.get(SECTION_TERADATA , TDPID)
         return username, password, tdpid
 
@@ -1323,10 +1444,16 @@ class TeradataDB(Database):
             return RC_DELETE_SKIPPED
         return self.deleteTable(database, table)
 
+    def getExtractTableName(self, database, table):
+        '''
+        The table name used in the SQL of the JDBC extractor
+        '''
+        return "%s.%s" % (self._getActualTeradataSchema(database), table)
+
     def getBackupTables(self, database):
         envDbName = self._getActualTeradataSchema(database)
         sql = "SELECT tablename FROM dbc.tablesV WHERE databasename = '%s' AND REGEXP_SIMILAR(tablename, '.*_[0-9]{8}$', 'i') = 1" % envDbName
-        res = self.executeSql(database, sql)
+        res = self.iterSql(database, sql)
         tables = [row[0].encode('utf8').strip() for row in res]
         logging.info("Got backup tables: %s" % tables)
         return tables
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from modules.base.constants    import *
 from modules.base.environment  import Environment
 from modules.teradata.db       import TeradataDB
+import modules.base.run_metrics as run_metrics
 
 class Fastload(TeradataDB):
     '''
@@ -126,6 +127,11 @@ class Fastload(TeradataDB):
         for line in stderr:
             logging.info(line)
 
+        # Record the row counts in the metrics of the section
+        run_metrics.add(METRIC_ROWS_READ, results.get('total_records_read'))
+        run_metrics.add(METRIC_ROWS_LOADED, results.get('total_inserts_applied'))
+        run_metrics.add(ET_COUNT, results.get(ET_COUNT))
+        run_metrics.add(UV_COUNT, results.get(UV_COUNT))
         return results
 
     def createFastloadControlFile(self, characterSet, targetInfo, fileToLoad, tableDefinition,clobCount,tableDefinitionSorted, columnsToLoad):
@@ -369,9 +375,7 @@ class Fastload(TeradataDB):
         parameters[DATABASE] = database
         parameters[ENV_DBNAME] = self.environmentId + database
         parameters[TABLE] = table
-        teraPassInfo = self._parseTeraPass(database)[1]
-        parameters[USERNAME] = teraPassInfo[TERA_PASS_USER_LOGON].replace('"','').replace('\n','')
-        parameters[PASSWORD] = teraPassInfo[TERA_PASS_PASSWORD].replace('"','').replace('\n','')
+        (parameters[USERNAME], parameters[PASSWORD], logonUser) = self.getTeraPassCredentials(database)
         parameters[JOBNAME]  = '%s_%s_%s' % (database, table, str(uuid.uuid4()).replace('-',''))
         parameters[TMP_TABLE] = table
         parameters[CURRENT_DATETIME] = datetime.today().strftime('%Y%m%d%H%M')
@@ -5,6 +5,7 @@ from datetime import datetime, timedelta
 
 from modules.base.constants    import *
 from modules.teradata.db       import TeradataDB
+import modules.base.run_metrics as run_metrics
 
 class TPT(TeradataDB):
     '''
@@ -97,6 +98,11 @@ class TPT(TeradataDB):
                 insertCount = int(line.split(':')[-1].strip())
                 logging.info("The insert count is %s" % (insertCount))
                 continue
+        # Record the row counts in the metrics of the section
+        run_metrics.add(METRIC_ROWS_LOADED, insertCount)
+        run_metrics.add(METRIC_ROWS_DELETED, deleteCount)
+        run_metrics.add(ET_COUNT, etCount)
+        run_metrics.add(UV_COUNT, uvCount)
         if etCount is None or uvCount is None:
             logging.error("et/uv count not found!")
             if insertCount is None or deleteCount is None:
@@ -124,9 +130,7 @@ class TPT(TeradataDB):
         parameters[DATABASE] = database
         parameters[ENV_DBNAME] = self.environmentId + database
         parameters[TABLE] = table
-        teraPassInfo = self._parseTeraPass(database)[1]
-        parameters[USERNAME] = teraPassInfo[TERA_PASS_USER_LOGON].replace('"','').replace('\n','')
-        parameters[PASSWORD] = teraPassInfo[TERA_PASS_PASSWORD].replace('"','').replace('\n','')
+        (parameters[USERNAME], parameters[PASSWORD], logonUser) = self.getTeraPassCredentials(database)
         parameters[JOBNAME]  = '%s_%s_%s' % (database, table, str(uuid.uuid4()).replace('-',''))
         parameters[TMP_TABLE] = table
         parameters[CURRENT_DATETIME] = datetime.today().strftime('%Y%m%d%H%M')